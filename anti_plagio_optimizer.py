@@ -7,23 +7,31 @@ Sistema inteligente de detección y parafraseo anti-Turnitin
 Integra: Análisis de plagio + Generación de ecuaciones + Parafraseo ético
 """
 
+import os
 import sys
 import json
 import re
+import heapq
+from collections import Counter
 from datetime import datetime
 from pathlib import Path
 
+import perfilado
+import segmentacion
+from indice_df import IndiceDF, tokenizar
+
 class AntiPlagioOptimizer:
     
-    def __init__(self, texto_trabajo):
+    def __init__(self, texto_trabajo, indice_df=None):
         self.texto = texto_trabajo
         self.frases = self._dividir_frases()
         self.resultados = []
+        self.indice_df = IndiceDF(indice_df) if isinstance(indice_df, (str, os.PathLike)) else indice_df
+        self.ecuaciones = {}
         
     def _dividir_frases(self):
         """Divide el texto en frases individuales"""
-        frases = re.split(r'[.!?]+', self.texto)
-        return [f.strip() for f in frases if f.strip()]
+        return segmentacion.frases(self.texto)
     
     def generar_ecuacion_busqueda(self, frase):
         """
@@ -32,7 +40,16 @@ class AntiPlagioOptimizer:
         
         Formato: 
         (palabra_clave1 OR palabra_clave2) AND (contexto1 OR contexto2)
+        
+        Con índice DF las palabras se ordenan por TF-IDF; sin él se usa
+        la heurística de longitud de palabra.
         """
+        if frase in self.ecuaciones:
+            return self.ecuaciones[frase]
+        
+        if self.indice_df is not None:
+            return self.generar_ecuaciones_documento([frase])[0]
+        
         palabras = frase.split()
         
         # Palabras clave principales (4-5 palabras más significativas)
@@ -44,6 +61,35 @@ class AntiPlagioOptimizer:
         ecuacion = f"({' OR '.join(palabras_clave)}) AND ({' OR '.join(palabras_contexto)})"
         return ecuacion
     
+    def generar_ecuaciones_documento(self, frases=None, k=4, k_contexto=3):
+        """
+        Genera las ecuaciones de todas las frases en una sola pasada:
+        tokeniza una vez, consulta el IDF de todo el vocabulario en bloque
+        y toma el top-k TF-IDF de cada frase (el resto del ranking es contexto).
+        Una frase sin términos indexables ("Sí.") tiene ecuación vacía.
+        """
+        frases = self.frases if frases is None else frases
+        if self.indice_df is None:
+            return [self.generar_ecuacion_busqueda(f) for f in frases]
+        
+        terminos_por_frase = [Counter(tokenizar(f)) for f in frases]
+        vocabulario = set().union(*terminos_por_frase) if terminos_por_frase else set()
+        idf = self.indice_df.idf(vocabulario)
+        
+        ecuaciones = []
+        for frase, tf in zip(frases, terminos_por_frase):
+            ranking = heapq.nlargest(k + k_contexto, tf, key=lambda t: (tf[t] * idf[t], t))
+            palabras_clave, palabras_contexto = ranking[:k], ranking[k:]
+            
+            ecuacion = f"({' OR '.join(palabras_clave)})" if palabras_clave else ""
+            if palabras_contexto:
+                ecuacion += f" AND ({' OR '.join(palabras_contexto)})"
+            
+            self.ecuaciones[frase] = ecuacion
+            ecuaciones.append(ecuacion)
+        
+        return ecuaciones
+    
     def analizar_plagio_frase(self, frase_num, frase):
         """
         Analiza una frase para detectar:
@@ -179,26 +225,37 @@ class AntiPlagioOptimizer:
 
 # --- MAIN ---
 if __name__ == "__main__":
+    perfilado.activar_desde_argv()
     if len(sys.argv) < 2:
-        print("Uso: python anti_plagio_optimizer.py <archivo_txt>")
+        print("Uso: python anti_plagio_optimizer.py <archivo_txt> [indice_df.sqlite] [--profile [perfil.json]]")
         sys.exit(1)
     
     archivo = sys.argv[1]
     with open(archivo, 'r', encoding='utf-8') as f:
         texto = f.read()
     
-    optimizer = AntiPlagioOptimizer(texto)
+    ruta_indice = sys.argv[2] if len(sys.argv) > 2 else None
+    if ruta_indice and not Path(ruta_indice).exists():
+        print(f"Error: El índice DF no existe: {ruta_indice}")
+        sys.exit(1)
     
-    # Analizar cada frase
-    for i, frase in enumerate(optimizer.frases):
-        optimizer.analizar_plagio_frase(i, frase)
+    optimizer = AntiPlagioOptimizer(texto, ruta_indice)
+    
+    # Ecuaciones de búsqueda de todo el documento en una pasada
+    with perfilado.etapa('ecuaciones', frases=len(optimizer.frases)):
+        optimizer.generar_ecuaciones_documento()
     
-    # Generar reporte
-    reporte = optimizer.generar_reporte()
+    # Analizar cada frase
+    with perfilado.etapa('escaneo_heuristico') as etapa:
+        for i, frase in enumerate(optimizer.frases):
+            optimizer.analizar_plagio_frase(i, frase)
+        etapa.items = len(optimizer.frases)
     
-    # Guardar en JSON
-    ruta_json = archivo.replace('.txt', '_anti_plagio_reporte.json')
-    optimizer.guardar_reporte_json(ruta_json)
+    # Generar reporte y guardarlo en JSON
+    with perfilado.etapa('informe'):
+        reporte = optimizer.generar_reporte()
+        ruta_json = archivo.replace('.txt', '_anti_plagio_reporte.json')
+        optimizer.guardar_reporte_json(ruta_json)
     
     # Mostrar resumen
     print("\n" + "="*60)
@@ -0,0 +1,165 @@
+"""
+Streaming WordprocessingML writer for the APA 7 generator.
+
+Paragraphs are serialized straight into word/document.xml inside the output
+zip as they are produced, instead of building a python-docx element tree.
+Every other part (styles, settings, theme, section properties) is copied
+from the styled base template, so the result renders exactly like the
+python-docx output.
+"""
+
+import io
+import re
+import zipfile
+from functools import lru_cache
+from xml.sax.saxutils import escape
+
+from docx.image.image import Image
+
+REL_IMAGE = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships/image'
+EMU_PER_TWIP = 635
+
+PAGE_BREAK_XML = '<w:p><w:r><w:br w:type="page"/></w:r></w:p>'
+
+PICTURE_XML = (
+    '<w:p><w:pPr><w:jc w:val="center"/></w:pPr><w:r><w:drawing>'
+    '<wp:inline xmlns:a="http://schemas.openxmlformats.org/drawingml/2006/main" '
+    'xmlns:pic="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<wp:extent cx="{cx}" cy="{cy}"/><wp:docPr id="{shape_id}" name="Picture {shape_id}"/>'
+    '<wp:cNvGraphicFramePr><a:graphicFrameLocks noChangeAspect="1"/></wp:cNvGraphicFramePr>'
+    '<a:graphic><a:graphicData uri="http://schemas.openxmlformats.org/drawingml/2006/picture">'
+    '<pic:pic><pic:nvPicPr><pic:cNvPr id="0" name="{filename}"/><pic:cNvPicPr/></pic:nvPicPr>'
+    '<pic:blipFill><a:blip r:embed="{rid}"/><a:stretch><a:fillRect/></a:stretch></pic:blipFill>'
+    '<pic:spPr><a:xfrm><a:off x="0" y="0"/><a:ext cx="{cx}" cy="{cy}"/></a:xfrm>'
+    '<a:prstGeom prst="rect"/></pic:spPr></pic:pic></a:graphicData></a:graphic>'
+    '</wp:inline></w:drawing></w:r></w:p>'
+)
+
+
+@lru_cache(maxsize=None)
+def paragraph_properties_xml(align=None, first_line_indent=None, left_indent=None, double_spacing=False):
+    """<w:pPr> for a combination of paragraph formats (indents in EMU), in schema order"""
+    parts = []
+    if double_spacing:
+        parts.append('<w:spacing w:line="480" w:lineRule="auto"/>')
+    if first_line_indent is not None or left_indent is not None:
+        attrs = ''
+        if first_line_indent is not None:
+            attrs += f' w:firstLine="{int(first_line_indent) // EMU_PER_TWIP}"'
+        if left_indent is not None:
+            attrs += f' w:left="{int(left_indent) // EMU_PER_TWIP}"'
+        parts.append(f'<w:ind{attrs}/>')
+    if align:
+        parts.append(f'<w:jc w:val="{align}"/>')
+    return f"<w:pPr>{''.join(parts)}</w:pPr>" if parts else ''
+
+
+@lru_cache(maxsize=None)
+def run_properties_xml(bold=False, italic=False):
+    parts = ('<w:b/>' if bold else '') + ('<w:i/>' if italic else '')
+    return f'<w:rPr>{parts}</w:rPr>' if parts else ''
+
+
+def run_content_xml(text):
+    """Run content as python-docx writes it: tabs and newlines become <w:tab/> and <w:br/>"""
+    xml = []
+    for piece in re.split(r'(\t|\r\n|\n|\r)', text):
+        if piece == '\t':
+            xml.append('<w:tab/>')
+        elif piece in ('\n', '\r', '\r\n'):
+            xml.append('<w:br/>')
+        elif piece:
+            space = ' xml:space="preserve"' if piece != piece.strip() else ''
+            xml.append(f'<w:t{space}>{escape(piece)}</w:t>')
+    return ''.join(xml)
+
+
+def paragraph_xml(text=None, align=None, bold=False, italic=False, first_line_indent=None, left_indent=None, double_spacing=False):
+    ppr = paragraph_properties_xml(align, first_line_indent, left_indent, double_spacing)
+    if text is None:
+        return f'<w:p>{ppr}</w:p>' if ppr else '<w:p/>'
+    return f'<w:p>{ppr}<w:r>{run_properties_xml(bold, italic)}{run_content_xml(text)}</w:r></w:p>'
+
+
+class StreamingDocxWriter:
+    """Same interface as the python-docx writer in generate_apa7_doc_UNIMINUTO.py"""
+
+    def __init__(self, base_template, output_path):
+        self._base = zipfile.ZipFile(io.BytesIO(base_template))
+        document_xml = self._base.read('word/document.xml').decode('utf-8')
+        body_start = document_xml.index('<w:body>') + len('<w:body>')
+        sect_start = document_xml.rindex('<w:sectPr')
+        self._head = document_xml[:body_start]
+        self._tail = document_xml[sect_start:]
+
+        rels = self._base.read('word/_rels/document.xml.rels').decode('utf-8')
+        self._rels = rels
+        self._next_rid = max(int(n) for n in re.findall(r'Id="rId(\d+)"', rels)) + 1
+        self._next_shape_id = 1
+        self._images = {}  # sha1 -> (rId, part name, blob, content type)
+
+        self.output_path = output_path
+        self._zip = zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED)
+        self._stream = io.TextIOWrapper(self._zip.open('word/document.xml', 'w'), encoding='utf-8')
+        self._stream.write(self._head)
+
+    def write_xml(self, xml):
+        self._stream.write(xml)
+
+    def paragraph(self, text=None, **formats):
+        self._stream.write(paragraph_xml(text, **formats))
+
+    def page_break(self):
+        self._stream.write(PAGE_BREAK_XML)
+
+    def image_relationship(self, image):
+        """rId of an image part, adding the part only once per distinct image"""
+        if image.sha1 not in self._images:
+            rid = f'rId{self._next_rid}'
+            self._next_rid += 1
+            partname = f'media/image{len(self._images) + 1}.{image.ext}'
+            self._images[image.sha1] = (rid, partname, image.blob, image.content_type)
+        return self._images[image.sha1][0]
+
+    def picture(self, image_path, width):
+        image = Image.from_file(image_path)
+        cx, cy = image.scaled_dimensions(width, None)
+        shape_id = self._next_shape_id
+        self._next_shape_id += 1
+        self._stream.write(PICTURE_XML.format(
+            cx=int(cx), cy=int(cy), shape_id=shape_id,
+            filename=escape(image.filename, {'"': '&quot;'}), rid=self.image_relationship(image)))
+
+    def _content_types(self):
+        types = self._base.read('[Content_Types].xml').decode('utf-8')
+        for _, partname, _, content_type in self._images.values():
+            ext = partname.rsplit('.', 1)[1]
+            if f'Extension="{ext}"' not in types:
+                types = types.replace('</Types>', f'<Default Extension="{ext}" ContentType="{content_type}"/></Types>')
+        return types
+
+    def close(self):
+        self._stream.write(self._tail)
+        self._stream.close()
+
+        rels = ''.join(
+            f'<Relationship Id="{rid}" Type="{REL_IMAGE}" Target="{partname}"/>'
+            for rid, partname, _, _ in self._images.values())
+        self._zip.writestr('word/_rels/document.xml.rels', self._rels.replace('</Relationships>', rels + '</Relationships>'))
+        self._zip.writestr('[Content_Types].xml', self._content_types())
+        for _, partname, blob, _ in self._images.values():
+            self._zip.writestr(f'word/{partname}', blob)
+
+        skip = {'word/document.xml', 'word/_rels/document.xml.rels', '[Content_Types].xml'}
+        for info in self._base.infolist():
+            if info.filename not in skip:
+                self._zip.writestr(info, self._base.read(info.filename))
+        self._zip.close()
+
+    def abort(self):
+        """Closes and discards a partially written document"""
+        try:
+            self._stream.close()
+            self._zip.close()
+        except Exception:
+            pass
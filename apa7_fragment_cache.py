@@ -0,0 +1,115 @@
+"""
+On-disk cache of rendered document blocks for incremental APA 7 rebuilds.
+
+Each block of a document (cover, every "## " section, references) is keyed
+by a fingerprint of everything it is rendered from. A block whose
+fingerprint is cached is replayed from its stored WordprocessingML instead
+of being rendered again, so editing one section only re-renders that one.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import time
+
+from apa7_docx_stream import PAGE_BREAK_XML, paragraph_xml
+
+FRAGMENT_CACHE_PATH = os.getenv("APA7_FRAGMENT_CACHE") or os.path.expanduser("~/.cache/pinokio-academic-pipeline/apa7_fragments.sqlite")
+MAX_FRAGMENTS = 2000
+# Bump whenever the rendering of a block changes, to invalidate old fragments
+RENDER_VERSION = 1
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS fragments (
+    fingerprint TEXT PRIMARY KEY,
+    parts TEXT NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS fragments_lru ON fragments (last_used);
+"""
+
+
+def fingerprint(*inputs):
+    data = json.dumps([RENDER_VERSION, *inputs], ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class FragmentRecorder:
+    """
+    Writer that records a block instead of writing a document
+
+    parts is a list of XML strings and [image_path, width] pictures; pictures
+    are kept symbolic because their rId and shape id depend on the document.
+    """
+
+    def __init__(self):
+        self.parts = []
+
+    def paragraph(self, text=None, **formats):
+        self.parts.append(paragraph_xml(text, **formats))
+
+    def page_break(self):
+        self.parts.append(PAGE_BREAK_XML)
+
+    def picture(self, image_path, width):
+        self.parts.append([image_path, int(width)])
+
+
+def replay(writer, parts):
+    for part in parts:
+        if isinstance(part, str):
+            writer.write_xml(part)
+        else:
+            writer.picture(part[0], part[1])
+
+
+class FragmentCache:
+
+    def __init__(self, path=FRAGMENT_CACHE_PATH, max_fragments=MAX_FRAGMENTS):
+        folder = os.path.dirname(path)
+        if folder:
+            os.makedirs(folder, exist_ok=True)
+        self.max_fragments = max_fragments
+        # Batch workers share the cache: wait for each other's writes
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.executescript(SCHEMA)
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        row = self.conn.execute("SELECT parts FROM fragments WHERE fingerprint = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        parts = json.loads(row[0])
+        # A picture whose processed image was purged from its cache cannot be replayed
+        if any(not isinstance(p, str) and not os.path.exists(p[0]) for p in parts):
+            return None
+        with self.conn:
+            self.conn.execute("UPDATE fragments SET last_used = ? WHERE fingerprint = ?", (time.time(), key))
+        return parts
+
+    def put(self, key, parts):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO fragments VALUES (?, ?, ?)",
+                              (key, json.dumps(parts, ensure_ascii=False), time.time()))
+            extra = self.conn.execute("SELECT COUNT(*) FROM fragments").fetchone()[0] - self.max_fragments
+            if extra > 0:
+                self.conn.execute(
+                    "DELETE FROM fragments WHERE fingerprint IN (SELECT fingerprint FROM fragments ORDER BY last_used LIMIT ?)", (extra,))
+
+    def render(self, writer, key, render):
+        """Writes a block to writer from the cache, rendering and storing it on a miss"""
+        parts = self.get(key)
+        if parts is None:
+            self.misses += 1
+            recorder = FragmentRecorder()
+            render(recorder)
+            parts = recorder.parts
+            self.put(key, parts)
+        else:
+            self.hits += 1
+        replay(writer, parts)
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,110 @@
+"""
+Figure preprocessing for the APA 7 generator.
+
+Images are downsampled to the width they are rendered at (at IMAGE_DPI),
+auto-rotated, stripped of metadata and recompressed before being embedded.
+Results are cached on disk under the SHA-256 of the source bytes plus the
+settings, so the same figure used by many documents is processed once and
+every document embeds the same bytes.
+
+Pillow is optional: without it the original file is embedded unchanged.
+"""
+
+import hashlib
+import io
+import os
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+IMAGE_CACHE_DIR = os.getenv("APA7_IMAGE_CACHE") or os.path.expanduser("~/.cache/pinokio-academic-pipeline/apa7_images")
+IMAGE_DPI = 200
+JPEG_QUALITY = 85
+EMU_PER_INCH = 914400
+
+# Processed path per (source path, mtime, width, dpi), for repeated figures within one process
+_memo = {}
+
+
+def _file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _recompress(path, target_px):
+    """Returns (bytes, extension) of the processed image, or None if the original is already smaller"""
+    with Image.open(path) as img:
+        source_format = img.format
+        img = ImageOps.exif_transpose(img)
+        if img.width > target_px:
+            height = max(1, round(img.height * target_px / img.width))
+            img = img.resize((target_px, height), Image.LANCZOS)
+
+        buffer = io.BytesIO()
+        has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+        # Photos go to JPEG; diagrams, screenshots and anything transparent stay lossless
+        if source_format == 'JPEG' and not has_alpha:
+            img.convert('RGB').save(buffer, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+            ext = 'jpg'
+        else:
+            if img.mode not in ('1', 'L', 'LA', 'P', 'RGB', 'RGBA'):
+                img = img.convert('RGBA' if has_alpha else 'RGB')
+            img.save(buffer, 'PNG', optimize=True)
+            ext = 'png'
+
+    data = buffer.getvalue()
+    if data and len(data) < os.path.getsize(path):
+        return data, ext
+    return None
+
+
+def prepare_image(image_path, width_emu, dpi=IMAGE_DPI, cache_dir=IMAGE_CACHE_DIR):
+    """
+    Path of the image to embed for a figure rendered width_emu wide
+
+    Falls back to the original path when Pillow is missing, dpi is 0, the
+    file cannot be decoded or processing would not make it smaller.
+    """
+    if Image is None or not dpi:
+        return image_path
+
+    memo_key = (os.path.abspath(image_path), os.path.getmtime(image_path), int(width_emu), dpi)
+    if memo_key in _memo:
+        return _memo[memo_key]
+
+    target_px = max(1, round(int(width_emu) / EMU_PER_INCH * dpi))
+    key = hashlib.sha256(f"{_file_sha256(image_path)}:{target_px}:{JPEG_QUALITY}".encode()).hexdigest()
+    os.makedirs(cache_dir, exist_ok=True)
+
+    result = image_path
+    for ext in ('png', 'jpg', 'orig'):
+        cached = os.path.join(cache_dir, f"{key}.{ext}")
+        if os.path.exists(cached):
+            result = image_path if ext == 'orig' else cached
+            break
+    else:
+        try:
+            processed = _recompress(image_path, target_px)
+        except Exception as e:
+            print(f"Aviso: no se pudo optimizar la imagen {image_path}: {e}")
+            processed = None
+
+        if processed is None:
+            # Marker so the original is not re-examined on every run
+            data, ext = b'', 'orig'
+        else:
+            data, ext = processed
+            result = os.path.join(cache_dir, f"{key}.{ext}")
+        # Atomic publish: parallel batch workers may process the same figure
+        tmp = os.path.join(cache_dir, f"{key}.{os.getpid()}.tmp")
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, os.path.join(cache_dir, f"{key}.{ext}"))
+
+    _memo[memo_key] = result
+    return result
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""
+Benchmarks de las rutas críticas del pipeline sobre corpus sintéticos
+
+Genera de forma determinista trabajos académicos en español (.txt, .docx
+y .pdf) de 1 a 500 páginas y mide:
+    extract_text, remove_bibliography, segmentación NLTK, troceado de
+    perform_full_analysis, pase hacia delante de un modelo diminuto con
+    pesos aleatorios, escaneo de AntiPlagioOptimizer y renderizado de
+    create_apa7_uniminuto_document.
+
+Los resultados se guardan en JSON; con --comparar se contrastan con una
+ejecución anterior y el proceso termina con código 1 si algún caso supera
+su umbral de regresión.
+
+Uso:
+    python benchmark_pipeline.py --paginas 1 10 100 --salida bench.json
+    python benchmark_pipeline.py --comparar bench_base.json
+"""
+
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import perfilado
+
+PAGINAS = (1, 10, 100, 500)
+PALABRAS_POR_PAGINA = 300  # APA 7 a doble espacio
+SEMILLA = 20240601
+REPETICIONES = 3
+UMBRAL_REGRESION = 1.25    # 25 % más lento que la base = regresión
+MIN_DIFERENCIA_S = 0.005   # por debajo de esto la diferencia es ruido
+# Casos más ruidosos (E/S, subprocesos) toleran más variación
+UMBRALES = {'extract_text': 1.5, 'apa7': 1.4}
+CARPETA_CORPUS = os.getenv("BENCHMARK_CORPUS") or os.path.join(tempfile.gettempdir(), "pinokio_benchmark_corpus")
+
+# --- Corpus sintético ---
+
+VOCABULARIO = (
+    "análisis proceso datos sistema información estudio resultado método investigación "
+    "modelo desarrollo estructura enfoque teoría variable población muestra contexto "
+    "aprendizaje estudiantes docentes evaluación calidad impacto tecnología educación "
+    "software entrada salida computador usuario diseño implementación evidencia marco "
+    "social cultural económico significativo relevante importante aspecto elemento factor"
+).split()
+CONECTORES = "de la el en los las del con por para que se una un su entre sobre desde como".split()
+FRASES_HECHAS = ("es importante señalar que", "cabe destacar que", "por lo tanto", "se puede observar que",
+                 "en conclusión", "según García et al. (2019)", "p. ej. en el caso del Dr. Pérez")
+
+
+def _frase(rng):
+    palabras = []
+    if rng.random() < 0.15:
+        palabras.extend(rng.choice(FRASES_HECHAS).split())
+    for _ in range(rng.randint(12, 30)):
+        palabras.append(rng.choice(VOCABULARIO) if rng.random() < 0.55 else rng.choice(CONECTORES))
+    if rng.random() < 0.3:
+        palabras.insert(rng.randint(1, len(palabras) - 1), rng.choice(VOCABULARIO) + ",")
+    texto = " ".join(palabras)
+    return texto[0].upper() + texto[1:] + rng.choice(".....?")
+
+
+def texto_sintetico(paginas, semilla=SEMILLA):
+    """Trabajo en el formato de contenido del generador APA 7, con referencias al final"""
+    rng = random.Random(semilla * 1000 + paginas)
+    objetivo = paginas * PALABRAS_POR_PAGINA
+    lineas = ["## Introducción"]
+    palabras = 0
+    seccion = 0
+    while palabras < objetivo:
+        if palabras > objetivo * 0.1 and seccion == 0:
+            lineas.append("## Desarrollo")
+            seccion = 1
+        elif seccion >= 1 and palabras > objetivo * 0.9 and seccion < 99:
+            lineas.append("## Conclusiones")
+            seccion = 99
+        elif seccion >= 1 and seccion < 99 and rng.random() < 0.08:
+            lineas.append(f"### Apartado {seccion}")
+            seccion += 1
+        parrafo = " ".join(_frase(rng) for _ in range(rng.randint(4, 7)))
+        palabras += len(parrafo.split())
+        lineas.append(parrafo)
+    lineas.append("Referencias")
+    for i in range(max(3, paginas // 2)):
+        lineas.append(f"Autor{i}, A. ({2000 + i % 25}). Título de la obra {i}. Editorial Académica.")
+    return "\n".join(lineas) + "\n"
+
+
+def _pdf_texto(texto):
+    return texto.encode('cp1252', 'replace').replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)')
+
+
+def escribir_pdf(texto, ruta, lineas_por_pagina=46, ancho=95):
+    """PDF mínimo de texto (Helvetica, WinAnsi) sin dependencias externas"""
+    import textwrap
+    renglones = []
+    for linea in texto.splitlines():
+        renglones.extend(textwrap.wrap(linea, ancho) or [''])
+    paginas = [renglones[i:i + lineas_por_pagina] for i in range(0, len(renglones), lineas_por_pagina)] or [[]]
+
+    objetos = [None, None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>"]
+    ids_paginas = []
+    for pagina in paginas:
+        flujo = b"BT /F1 11 Tf 14 TL 72 740 Td " + b" ".join(b"(" + _pdf_texto(r) + b") Tj T*" for r in pagina) + b" ET"
+        objetos.append(b"<< /Length %d >>\nstream\n" % len(flujo) + flujo + b"\nendstream")
+        objetos.append(b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+                       b"/Resources << /Font << /F1 3 0 R >> >> /Contents %d 0 R >>" % len(objetos))
+        ids_paginas.append(len(objetos))
+    objetos[0] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    objetos[1] = b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % i for i in ids_paginas) + b"] /Count %d >>" % len(ids_paginas)
+
+    salida = bytearray(b"%PDF-1.4\n")
+    desplazamientos = []
+    for numero, cuerpo in enumerate(objetos, 1):
+        desplazamientos.append(len(salida))
+        salida += b"%d 0 obj\n" % numero + cuerpo + b"\nendobj\n"
+    xref = len(salida)
+    salida += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objetos) + 1)
+    salida += b"".join(b"%010d 00000 n \n" % d for d in desplazamientos)
+    salida += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objetos) + 1, xref)
+    Path(ruta).write_bytes(salida)
+
+
+def generar_corpus(paginas, carpeta=CARPETA_CORPUS):
+    """Escribe (si no existen) las tres versiones del trabajo de `paginas` páginas"""
+    carpeta = Path(carpeta)
+    carpeta.mkdir(parents=True, exist_ok=True)
+    texto = texto_sintetico(paginas)
+    rutas = {ext: carpeta / f"trabajo_{paginas:03d}p_{SEMILLA}.{ext}" for ext in ('txt', 'docx', 'pdf')}
+    if not rutas['txt'].exists():
+        rutas['txt'].write_text(texto, encoding='utf-8')
+    if not rutas['docx'].exists():
+        import docx
+        documento = docx.Document()
+        for linea in texto.splitlines():
+            documento.add_paragraph(linea)
+        documento.save(rutas['docx'])
+    if not rutas['pdf'].exists():
+        escribir_pdf(texto, rutas['pdf'])
+    return texto, rutas
+
+
+# --- Modelo y tokenizador de prueba ---
+
+class TokenizadorSimulado:
+    """Tokenizador determinista (~1.3 tokens por palabra) con la interfaz que usa el pipeline"""
+
+    def __init__(self, vocabulario=1000):
+        import re
+        import zlib
+        self._crc = zlib.crc32
+        self.vocabulario = vocabulario
+        self._patron = re.compile(r'\w{1,6}|[^\w\s]')
+
+    def encode(self, texto, truncation=False, max_length=512):
+        ids = [5 + (self._crc(t.encode('utf-8')) % (self.vocabulario - 5)) for t in self._patron.findall(texto)]
+        return [0] + (ids[:max_length - 2] if truncation else ids) + [2]
+
+    def __call__(self, textos, max_length=512):
+        import torch
+        lotes = [self.encode(t, truncation=True, max_length=max_length) for t in textos]
+        largo = max(len(l) for l in lotes)
+        input_ids = torch.tensor([l + [1] * (largo - len(l)) for l in lotes])
+        attention_mask = torch.tensor([[1] * len(l) + [0] * (largo - len(l)) for l in lotes])
+        return {'input_ids': input_ids, 'attention_mask': attention_mask}
+
+
+def modelo_diminuto():
+    """DesklibAIDetectionModel con una RoBERTa de 2 capas y pesos aleatorios (sin descargas)"""
+    import torch
+    from transformers import RobertaConfig
+    from detectores.modelos import DesklibAIDetectionModel
+    torch.manual_seed(SEMILLA)
+    config = RobertaConfig(vocab_size=1000, hidden_size=64, num_hidden_layers=2, num_attention_heads=2,
+                           intermediate_size=128, max_position_embeddings=520, pad_token_id=1)
+    return DesklibAIDetectionModel(config).eval()
+
+
+# --- Medición ---
+
+def medir(funcion, repeticiones=REPETICIONES):
+    tiempos = []
+    resultado = None
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        resultado = funcion()
+        tiempos.append(time.perf_counter() - inicio)
+    return {'mediana_s': round(statistics.median(tiempos), 6), 'min_s': round(min(tiempos), 6), 'n': repeticiones}, resultado
+
+
+def ejecutar_benchmarks(paginas=PAGINAS, repeticiones=REPETICIONES, carpeta=CARPETA_CORPUS):
+    casos = {}
+
+    def caso(nombre, funcion, reps=None, **extra):
+        try:
+            with perfilado.etapa('caso', caso=nombre):
+                medida, resultado = medir(funcion, reps or repeticiones)
+        except (ImportError, LookupError, OSError) as e:
+            casos[nombre] = {'omitido': f"{type(e).__name__}: {e}".splitlines()[0]}
+            print(f"  - {nombre}: omitido ({casos[nombre]['omitido']})")
+            return None
+        casos[nombre] = {**medida, **extra}
+        print(f"  ✓ {nombre}: {medida['mediana_s'] * 1000:.1f} ms")
+        return resultado
+
+    for n in paginas:
+        print(f"\n[{n} páginas]")
+        texto, rutas = generar_corpus(n, carpeta)
+        # Los casos grandes se repiten menos
+        reps = 1 if n >= 500 else repeticiones
+
+        try:
+            from local_checker import extract_text, remove_bibliography
+        except ImportError as e:
+            extract_text = remove_bibliography = None
+            casos[f"extract_text.p{n}"] = {'omitido': str(e)}
+        if extract_text:
+            for ext, ruta in rutas.items():
+                caso(f"extract_text.{ext}.p{n}", lambda r=ruta: extract_text(str(r)), reps, paginas=n)
+            cuerpo = caso(f"remove_bibliography.p{n}", lambda: remove_bibliography(texto), reps, paginas=n)
+        else:
+            cuerpo = texto
+        cuerpo = cuerpo or texto
+
+        def segmentar():
+            import segmentacion
+            return [cuerpo[a:b] for a, b in segmentacion.segmentar(cuerpo, memo=False)]
+        frases = caso(f"segmentacion.p{n}", segmentar, reps, paginas=n)
+
+        def trocear():
+            import segmentacion
+            return segmentacion.trozos(frases, TokenizadorSimulado())
+        trozos = caso(f"chunking.p{n}", trocear, reps, paginas=n) if frases else None
+
+        if trozos:
+            try:
+                import torch
+                modelo = modelo_diminuto()
+                tokenizador = TokenizadorSimulado()
+            except (ImportError, OSError) as e:
+                casos[f"forward_diminuto.p{n}"] = {'omitido': f"{type(e).__name__}: {e}"}
+                print(f"  - forward_diminuto.p{n}: omitido")
+            else:
+                def inferir():
+                    with torch.no_grad():
+                        for i in range(0, len(trozos), 8):
+                            torch.sigmoid(modelo(**tokenizador(trozos[i:i + 8]))['logits'])
+                caso(f"forward_diminuto.p{n}", inferir, reps, paginas=n, trozos=len(trozos))
+
+        def escanear():
+            from anti_plagio_optimizer import AntiPlagioOptimizer
+            optimizer = AntiPlagioOptimizer(cuerpo)
+            optimizer.generar_ecuaciones_documento()
+            for i, frase in enumerate(optimizer.frases):
+                optimizer.analizar_plagio_frase(i, frase)
+            return optimizer.generar_reporte()
+        caso(f"anti_plagio.p{n}", escanear, reps, paginas=n)
+
+        with tempfile.TemporaryDirectory() as tmp:
+            from generate_apa7_doc_UNIMINUTO import build_base_template, create_apa7_uniminuto_document
+            plantilla = build_base_template()
+            for escritor in ('docx', 'stream'):
+                salida = os.path.join(tmp, f"{escritor}.docx")
+                caso(f"apa7.{escritor}.p{n}",
+                     lambda e=escritor, s=salida: create_apa7_uniminuto_document(
+                         str(rutas['txt']), s, base_template=plantilla, writer=e, metadata={'date': '1 de Enero de 2025'}),
+                     reps, paginas=n)
+    return casos
+
+
+def comparar(actual, base):
+    """Devuelve la lista de casos que empeoraron más que su umbral"""
+    regresiones = []
+    for nombre, medida in sorted(actual.items()):
+        previa = base.get(nombre)
+        if not previa or 'mediana_s' not in medida or 'mediana_s' not in previa:
+            continue
+        umbral = next((u for prefijo, u in UMBRALES.items() if nombre.startswith(prefijo)), UMBRAL_REGRESION)
+        razon = medida['mediana_s'] / previa['mediana_s'] if previa['mediana_s'] else 1.0
+        peor = razon > umbral and medida['mediana_s'] - previa['mediana_s'] > MIN_DIFERENCIA_S
+        marca = "✗" if peor else "✓"
+        print(f"{marca} {nombre:40s} {previa['mediana_s'] * 1000:10.1f} ms → {medida['mediana_s'] * 1000:10.1f} ms  (x{razon:.2f}, umbral x{umbral})")
+        if peor:
+            regresiones.append(nombre)
+    return regresiones
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Benchmarks del pipeline sobre corpus sintéticos deterministas.')
+    parser.add_argument('--paginas', type=int, nargs='+', default=list(PAGINAS))
+    parser.add_argument('--repeticiones', type=int, default=REPETICIONES)
+    parser.add_argument('--corpus', default=CARPETA_CORPUS, help='Carpeta donde se generan (una vez) los trabajos sintéticos')
+    parser.add_argument('--salida', default='benchmark_resultados.json')
+    parser.add_argument('--comparar', metavar='BASE', help='Resultados previos contra los que detectar regresiones')
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    casos = ejecutar_benchmarks(args.paginas, args.repeticiones, args.corpus)
+    resultados = {
+        'fecha': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'entorno': {'python': platform.python_version(), 'plataforma': platform.platform(), 'cpus': os.cpu_count()},
+        'semilla': SEMILLA,
+        'umbral_regresion': UMBRAL_REGRESION,
+        'umbrales': UMBRALES,
+        'casos': casos,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(resultados, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Resultados en {args.salida}")
+
+    if args.comparar:
+        with open(args.comparar, 'r', encoding='utf-8') as f:
+            base = json.load(f)['casos']
+        print(f"\nComparación con {args.comparar}:")
+        regresiones = comparar(casos, base)
+        if regresiones:
+            print(f"\n✗ {len(regresiones)} regresiones: {', '.join(regresiones)}")
+            sys.exit(1)
+        print("\n✓ Sin regresiones")
+
+
+if __name__ == "__main__":
+    main()
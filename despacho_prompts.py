@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+"""
+Despacho concurrente de prompts a un backend intercambiable
+
+Backends:
+- BackendHTTP: cualquier endpoint compatible con OpenAI (/chat/completions),
+  incluido un servidor local.
+- BackendComet: el flujo de gemini_sender.py (portapapeles + AppleScript);
+  controla una interfaz gráfica, así que admite un solo envío a la vez y
+  no devuelve respuesta.
+
+Cada respuesta se escribe en <salida>/<nnnn>_<nombre>.respuesta.txt (nnnn
+es el orden del prompt, así dos prompts con el mismo nombre en carpetas
+distintas no se pisan) y las latencias en <salida>/metricas.json.
+
+Uso:
+    python despacho_prompts.py carpeta_prompts/ --salida respuestas/ --max-en-vuelo 8
+    python despacho_prompts.py cola.txt --cola --salida respuestas/
+    ls prompts/*.txt | python despacho_prompts.py - --salida respuestas/
+"""
+
+import json
+import os
+import random
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from pathlib import Path
+
+import perfilado
+
+URL_BASE = os.getenv("OPENAI_BASE_URL") or "http://localhost:8000/v1"
+API_KEY = os.getenv("OPENAI_API_KEY") or ""
+MODELO = os.getenv("LLM_MODELO") or "gemini-2.0-flash"
+MAX_EN_VUELO = 4
+TIMEOUT = 300
+MAX_REINTENTOS = 4
+ESPERA_BASE = 1.0   # segundos; se duplica en cada reintento
+ESTADOS_REINTENTABLES = {429, 500, 502, 503, 504}
+
+
+class BackendHTTP:
+    """Endpoint compatible con OpenAI; urllib abre una conexión por petición, así que es seguro entre hilos"""
+
+    nombre = 'http'
+    max_concurrentes = None
+
+    def __init__(self, url_base=URL_BASE, modelo=MODELO, api_key=API_KEY, timeout=TIMEOUT, max_reintentos=MAX_REINTENTOS):
+        self.url = url_base.rstrip('/') + '/chat/completions'
+        self.modelo = modelo
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_reintentos = max_reintentos
+
+    def _peticion(self, texto):
+        cuerpo = json.dumps({
+            'model': self.modelo,
+            'messages': [{'role': 'user', 'content': texto}],
+        }).encode('utf-8')
+        cabeceras = {'Content-Type': 'application/json'}
+        if self.api_key:
+            cabeceras['Authorization'] = f'Bearer {self.api_key}'
+        return urllib.request.Request(self.url, data=cuerpo, headers=cabeceras, method='POST')
+
+    def enviar(self, texto):
+        """Devuelve el texto de la respuesta; reintenta 429/5xx y errores de red"""
+        reintentos = 0
+        while True:
+            try:
+                with urllib.request.urlopen(self._peticion(texto), timeout=self.timeout) as respuesta:
+                    datos = json.load(respuesta)
+                return datos['choices'][0]['message']['content']
+            except (urllib.error.URLError, TimeoutError, ConnectionError) as e:
+                estado = getattr(e, 'code', None)
+                if (estado is not None and estado not in ESTADOS_REINTENTABLES) or reintentos >= self.max_reintentos:
+                    raise
+                espera = None
+                if estado is not None:
+                    try:
+                        espera = float(e.headers.get('Retry-After'))
+                    except (TypeError, ValueError):
+                        espera = None
+                if espera is None:
+                    espera = ESPERA_BASE * 2 ** reintentos * (1 + random.random() * 0.25)
+                time.sleep(espera)
+                reintentos += 1
+
+
+class BackendComet:
+    """Envío por la interfaz de Comet.app (macOS); la respuesta se copia a mano"""
+
+    nombre = 'comet'
+    max_concurrentes = 1
+
+    def enviar(self, texto):
+        from gemini_sender import send_text_to_comet
+        if not send_text_to_comet(texto):
+            raise RuntimeError("falló el envío a Comet.app")
+        return None
+
+
+BACKENDS = {'http': BackendHTTP, 'comet': BackendComet}
+
+
+def archivos_de_prompts(origen, cola=False):
+    """
+    Itera los archivos de prompts de una carpeta (*.txt, en orden), de un
+    archivo de cola con una ruta por línea, o de la entrada estándar ('-')
+
+    Un archivo .txt es un solo prompt salvo con cola=True; cualquier otra
+    extensión se lee siempre como cola.
+    """
+    if origen == '-':
+        for linea in sys.stdin:
+            if linea.strip():
+                yield Path(linea.strip())
+        return
+    ruta = Path(origen)
+    if ruta.is_dir():
+        yield from sorted(ruta.glob('*.txt'))
+    elif ruta.suffix == '.txt' and not cola:
+        yield ruta
+    else:
+        with open(ruta, 'r', encoding='utf-8') as f:
+            for linea in f:
+                if linea.strip():
+                    yield Path(linea.strip())
+
+
+def _percentil(valores, p):
+    valores = sorted(valores)
+    return round(valores[min(len(valores) - 1, int(len(valores) * p))] * 1000, 1) if valores else None
+
+
+def _procesar(backend, indice, trabajo, carpeta_salida):
+    """Envía un prompt y guarda su respuesta; nunca lanza, devuelve su métrica"""
+    nombre, texto = trabajo
+    metrica = {'prompt': nombre, 'caracteres': len(texto)}
+    inicio = time.perf_counter()
+    try:
+        with perfilado.etapa('peticion', backend=backend.nombre, prompt=nombre) as etapa:
+            etapa.items = len(texto)
+            respuesta = backend.enviar(texto)
+        metrica['ok'] = True
+        if respuesta is not None:
+            destino = carpeta_salida / f"{indice:04d}_{Path(nombre).stem}.respuesta.txt"
+            destino.write_text(respuesta, encoding='utf-8')
+            metrica['respuesta'] = str(destino)
+    except Exception as e:
+        metrica['ok'] = False
+        metrica['error'] = str(e)
+    metrica['latencia_ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+    return metrica
+
+
+def despachar(trabajos, backend, carpeta_salida, max_en_vuelo=MAX_EN_VUELO):
+    """
+    Envía (nombre, texto) de forma concurrente con como máximo max_en_vuelo
+    peticiones abiertas; consume trabajos de forma perezosa
+
+    Returns:
+        Lista de métricas por prompt, en orden de finalización
+    """
+    carpeta_salida = Path(carpeta_salida)
+    carpeta_salida.mkdir(parents=True, exist_ok=True)
+    if backend.max_concurrentes:
+        max_en_vuelo = min(max_en_vuelo, backend.max_concurrentes)
+
+    metricas = []
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=max_en_vuelo) as pool:
+        en_vuelo = set()
+        for indice, trabajo in enumerate(trabajos, 1):
+            if len(en_vuelo) >= max_en_vuelo:
+                listos, en_vuelo = wait(en_vuelo, return_when=FIRST_COMPLETED)
+                metricas.extend(_informar(f.result()) for f in listos)
+            en_vuelo.add(pool.submit(_procesar, backend, indice, trabajo, carpeta_salida))
+        for futuro in en_vuelo:
+            metricas.append(_informar(futuro.result()))
+    duracion = time.perf_counter() - inicio
+
+    latencias = [m['latencia_ms'] / 1000 for m in metricas if m['ok']]
+    resumen = {
+        'backend': backend.nombre,
+        'total': len(metricas),
+        'fallidos': sum(not m['ok'] for m in metricas),
+        'max_en_vuelo': max_en_vuelo,
+        'duracion_s': round(duracion, 3),
+        'p50_ms': _percentil(latencias, 0.5),
+        'p95_ms': _percentil(latencias, 0.95),
+        'prompts': metricas,
+    }
+    with open(carpeta_salida / 'metricas.json', 'w', encoding='utf-8') as f:
+        json.dump(resumen, f, indent=2, ensure_ascii=False)
+    return metricas
+
+
+def _informar(metrica):
+    if metrica['ok']:
+        print(f"✓ {metrica['prompt']} ({metrica['latencia_ms']} ms)")
+    else:
+        print(f"✗ {metrica['prompt']}: {metrica['error']}", file=sys.stderr)
+    return metrica
+
+
+def leer_prompts(archivos):
+    """(nombre, texto) por archivo, omitiendo los vacíos o inexistentes"""
+    for archivo in archivos:
+        try:
+            texto = archivo.read_text(encoding='utf-8').strip()
+        except OSError as e:
+            print(f"✗ No se pudo leer {archivo}: {e}", file=sys.stderr)
+            continue
+        if texto:
+            yield str(archivo), texto
+        else:
+            print(f"✗ Prompt vacío: {archivo}", file=sys.stderr)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Envía muchos prompts de forma concurrente a un modelo.')
+    parser.add_argument('origen', help="Carpeta con *.txt, un prompt .txt, archivo de cola (una ruta por línea) o '-' para leer rutas de stdin")
+    parser.add_argument('--cola', action='store_true', help='Lee el origen como cola aunque sea un .txt')
+    parser.add_argument('--salida', default='respuestas', help='Carpeta para las respuestas y metricas.json')
+    parser.add_argument('--backend', choices=sorted(BACKENDS), default='http')
+    parser.add_argument('--url', default=URL_BASE, help='URL base compatible con OpenAI (por defecto $OPENAI_BASE_URL)')
+    parser.add_argument('--modelo', default=MODELO)
+    parser.add_argument('--max-en-vuelo', type=int, default=MAX_EN_VUELO, help='Peticiones simultáneas como máximo')
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    backend = BackendHTTP(args.url, args.modelo) if args.backend == 'http' else BackendComet()
+    metricas = despachar(leer_prompts(archivos_de_prompts(args.origen, args.cola)), backend, args.salida, args.max_en_vuelo)
+    fallidos = sum(not m['ok'] for m in metricas)
+    print(f"\n{len(metricas) - fallidos}/{len(metricas)} prompts enviados. Métricas en {Path(args.salida) / 'metricas.json'}")
+    sys.exit(1 if fallidos or not metricas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Detectores de texto generado por IA
+
+Cada modelo vive en su propio entorno de Python (torch, transformers y sus
+dependencias). Este módulo solo usa la biblioteca estándar para poder
+importarse desde cualquiera de ellos; el código de los modelos está en
+detectores/modelos.py.
+
+Los procesos de los modelos se lanzan con -m desde el intérprete de su
+entorno (comando()), de modo que Python reutiliza el bytecode en
+__pycache__; para compilarlo por adelantado:
+
+    /ruta/al/entorno/bin/python -m compileall -q detectores
+"""
+
+import os
+
+MODELOS = {
+    'desklib': "desklib/ai-text-detector-v1.01",
+    'superannotate': "SuperAnnotate/ai-detector",
+}
+
+# Intérprete del entorno de cada modelo
+PYTHON_MODELOS = {
+    'desklib': os.getenv("DESKLIB_PYTHON") or "/Volumes/MainDrive/miniforge3/envs/desklib-detector/bin/python",
+    'superannotate': os.getenv("SA_PYTHON") or "/Volumes/MainDrive/miniforge3/envs/sa-detector/bin/python",
+}
+
+CARPETA_REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def comando(modulo, nombre, python=None):
+    """Línea de comandos para ejecutar detectores.<modulo> con el modelo `nombre` en su entorno"""
+    return [python or PYTHON_MODELOS[nombre], '-m', f'detectores.{modulo}', nombre]
+
+
+def entorno():
+    """Variables de entorno para que el intérprete del modelo encuentre este paquete"""
+    rutas = [CARPETA_REPO, os.getenv("PYTHONPATH")]
+    return dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, rutas)), TOKENIZERS_PARALLELISM='false')
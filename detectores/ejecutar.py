@@ -0,0 +1,56 @@
+"""
+Ejecución de un detector en un proceso de un solo uso (sin servidor)
+
+    echo '["texto 1", "texto 2"]' | python -m detectores.ejecutar superannotate
+
+Lee de stdin una lista JSON de textos y escribe en stdout la lista JSON de
+puntuaciones (0-100). Si el modelo falla, el error sale por stderr y el
+código de salida es 1. Los tiempos de carga y de forward se escriben en
+stderr como líneas PERFIL para perfilado.registrar_salida_hijo.
+
+No escribe ningún archivo, así que varias ejecuciones pueden correr a la
+vez en el mismo directorio.
+"""
+
+import json
+import sys
+import time
+
+from detectores import MODELOS
+
+MAX_LOTE = 16  # textos por forward; acota la memoria con trozos de 512 tokens
+
+
+def _perfil(etapa, inicio, **extra):
+    datos = dict(etapa=etapa, duracion_s=time.perf_counter() - inicio, **extra)
+    print("PERFIL " + json.dumps(datos), file=sys.stderr)
+
+
+def ejecutar(nombre, textos):
+    # Los avisos de las bibliotecas no deben mezclarse con la salida JSON
+    salida, sys.stdout = sys.stdout, sys.stderr
+    from detectores.modelos import cargar, puntuar_lote
+
+    inicio = time.perf_counter()
+    detector = cargar(nombre)
+    _perfil("carga_modelo", inicio, modelo=MODELOS[nombre])
+
+    inicio = time.perf_counter()
+    puntuaciones = []
+    for i in range(0, len(textos), MAX_LOTE):
+        puntuaciones.extend(puntuar_lote(detector, textos[i:i + MAX_LOTE]))
+    _perfil("forward", inicio, items=len(textos), modelo=MODELOS[nombre])
+
+    salida.write(json.dumps(puntuaciones) + "\n")
+    salida.flush()
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2 or sys.argv[1] not in MODELOS:
+        print(f"Uso: python -m detectores.ejecutar <{'|'.join(MODELOS)}> < textos.json", file=sys.stderr)
+        sys.exit(2)
+    try:
+        ejecutar(sys.argv[1], json.load(sys.stdin))
+    except Exception as e:
+        print(f"ERROR: {type(e).__name__}: {e}", file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,92 @@
+"""
+Carga de los detectores y puntuación por lotes
+
+Solo se importa dentro del entorno de cada modelo.
+"""
+
+import torch
+import torch.nn as nn
+from transformers import AutoTokenizer, AutoModel, AutoConfig, PreTrainedModel
+
+from detectores import MODELOS
+
+MAX_LONGITUD = 512
+
+
+class DesklibAIDetectionModel(PreTrainedModel):
+    config_class = AutoConfig
+
+    def __init__(self, config):
+        super().__init__(config)
+        self.model = AutoModel.from_config(config)
+        self.classifier = nn.Linear(config.hidden_size, 1)
+        self.init_weights()
+
+    def forward(self, input_ids, attention_mask=None, labels=None, **kwargs):
+        outputs = self.model(input_ids, attention_mask=attention_mask)
+        last_hidden_state = outputs[0]
+        input_mask_expanded = attention_mask.unsqueeze(-1).expand(last_hidden_state.size()).float()
+        sum_embeddings = torch.sum(last_hidden_state * input_mask_expanded, dim=1)
+        sum_mask = torch.clamp(input_mask_expanded.sum(dim=1), min=1e-9)
+        pooled_output = sum_embeddings / sum_mask
+        logits = self.classifier(pooled_output)
+        return {"logits": logits}
+
+
+class DetectorDesklib:
+
+    def __init__(self, model_id=MODELOS['desklib']):
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        config = AutoConfig.from_pretrained(model_id)
+        self.modelo = DesklibAIDetectionModel.from_pretrained(model_id, config=config)
+        self.modelo.eval()
+
+    def puntuar(self, textos):
+        # El pooling ignora el relleno, así que basta con rellenar hasta el más largo del lote
+        entradas = self.tokenizer(textos, return_tensors="pt", truncation=True, max_length=MAX_LONGITUD, padding=True)
+        with torch.no_grad():
+            probabilidades = torch.sigmoid(self.modelo(**entradas)["logits"]).squeeze(1)
+        return [p * 100 for p in probabilidades.tolist()]
+
+
+class DetectorSuperAnnotate:
+
+    def __init__(self, model_id=MODELOS['superannotate']):
+        from generated_text_detector.utils.model.roberta_classifier import RobertaClassifier
+        from generated_text_detector.utils.preprocessing import preprocessing_text
+        self.preprocesar = preprocessing_text
+        self.modelo = RobertaClassifier.from_pretrained(model_id)
+        self.tokenizer = AutoTokenizer.from_pretrained(model_id)
+        self.modelo.eval()
+
+    def puntuar(self, textos):
+        tokens = self.tokenizer(
+            [self.preprocesar(t) for t in textos],
+            add_special_tokens=True,
+            max_length=MAX_LONGITUD,
+            padding='longest',
+            truncation=True,
+            return_token_type_ids=True,
+            return_tensors="pt"
+        )
+        with torch.no_grad():
+            _, logits = self.modelo(**tokens)
+            probabilidades = torch.sigmoid(logits).squeeze(1)
+        return [p * 100 for p in probabilidades.tolist()]
+
+
+DETECTORES = {'desklib': DetectorDesklib, 'superannotate': DetectorSuperAnnotate}
+
+
+def cargar(nombre):
+    return DETECTORES[nombre]()
+
+
+def puntuar_lote(detector, textos):
+    """Puntúa en un solo forward; los textos vacíos puntúan 0.0 sin pasar por el modelo"""
+    indices = [i for i, t in enumerate(textos) if t.strip()]
+    puntuaciones = [0.0] * len(textos)
+    if indices:
+        for i, p in zip(indices, detector.puntuar([textos[i] for i in indices])):
+            puntuaciones[i] = p
+    return puntuaciones
@@ -0,0 +1,54 @@
+"""
+Proceso que mantiene un detector cargado para servidor_detectores.py
+
+    python -m detectores.trabajador desklib
+
+Protocolo de líneas JSON: tras cargar el modelo escribe {"listo": true}
+en stdout y por cada {"textos": [...]} que lee de stdin responde
+{"puntuaciones": [...]} o {"error": "..."}.
+"""
+
+import json
+import sys
+import time
+
+
+def _responder(salida, datos):
+    salida.write(json.dumps(datos) + "\n")
+    salida.flush()
+
+
+def servir(nombre, entrada=None, salida=None):
+    entrada = entrada or sys.stdin
+    salida = salida or sys.stdout
+    # Los avisos de las bibliotecas no deben mezclarse con el protocolo
+    sys.stdout = sys.stderr
+
+    inicio = time.perf_counter()
+    try:
+        from detectores.modelos import cargar, puntuar_lote
+        detector = cargar(nombre)
+    except Exception as e:
+        _responder(salida, {'error': f"{type(e).__name__}: {e}"})
+        return 1
+    _responder(salida, {'listo': True, 'carga_s': round(time.perf_counter() - inicio, 3)})
+
+    for linea in entrada:
+        if not linea.strip():
+            continue
+        inicio = time.perf_counter()
+        try:
+            textos = json.loads(linea)['textos']
+            respuesta = {'puntuaciones': puntuar_lote(detector, textos)}
+        except Exception as e:
+            respuesta = {'error': f"{type(e).__name__}: {e}"}
+        respuesta['forward_s'] = round(time.perf_counter() - inicio, 6)
+        _responder(salida, respuesta)
+    return 0
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        print("Uso: python -m detectores.trabajador <desklib|superannotate>", file=sys.stderr)
+        sys.exit(1)
+    sys.exit(servir(sys.argv[1]))
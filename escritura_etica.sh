@@ -1,5 +1,6 @@
 #!/bin/bash
 # Helper para escritura académica ética con IA
+# Uso: ./escritura_etica.sh [trabajo.txt [opciones de pipeline_escritura.py]]
 
 echo "====================================="
 echo "  ESCRITURA ACADÉMICA ÉTICA CON IA"
@@ -13,3 +14,10 @@ echo "4. ¿Documentaste qué IA usaste y cómo?"
 echo ""
 echo ""
 echo "Checklist de ética verificado. Continuando..."
+
+# Con un trabajo como argumento, ejecuta la revisión completa
+# (extracción, detectores, informe y documento APA 7) con caché de artefactos
+if [ $# -gt 0 ]; then
+    echo ""
+    python3 "$(dirname "$0")/pipeline_escritura.py" "$@"
+fi
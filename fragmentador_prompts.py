@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+Divide un documento largo en prompts que caben en la ventana de contexto
+
+Los cortes caen en límites de frase (segmentacion.py) y se
+prefieren los límites de sección; cada fragmento repite las últimas frases
+del anterior (solapamiento) para no perder el hilo. Los prompts se envían
+en lote con despacho_prompts.py.
+
+Uso:
+    python fragmentador_prompts.py tesis.txt --plantilla plantilla.txt --max-tokens 8000 --salida respuestas/
+    python fragmentador_prompts.py tesis.docx --solo-fragmentar prompts/
+"""
+
+import math
+import os
+import re
+import sys
+from functools import lru_cache
+from pathlib import Path
+
+import perfilado
+import segmentacion
+
+CARACTERES_POR_TOKEN = 3.5   # aproximación para español
+MAX_TOKENS_CONTEXTO = 8000
+RESERVA_RESPUESTA = 2000     # tokens que se dejan libres para la respuesta
+SOLAPAMIENTO = 150           # tokens del fragmento anterior que se repiten
+
+PLANTILLA_POR_DEFECTO = (
+    "Fragmento {indice} de {total} del documento \"{documento}\".\n"
+    "Analiza solo este fragmento; el inicio puede repetir el final del anterior.\n\n"
+    "{fragmento}"
+)
+
+PATRON_SECCION = re.compile(r'^\s*(#{1,6}\s+\S|\d+(\.\d+)*\.?\s+[A-ZÁÉÍÓÚÑ])')
+
+
+def estimar_tokens(texto):
+    return math.ceil(len(texto) / CARACTERES_POR_TOKEN)
+
+
+@lru_cache(maxsize=32)
+def _leer_plantilla(ruta, modificado):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def cargar_plantilla(ruta=None):
+    """Plantilla con {fragmento}, {indice}, {total} y {documento}; se lee una vez mientras no cambie"""
+    if not ruta:
+        return PLANTILLA_POR_DEFECTO
+    return _leer_plantilla(os.path.abspath(ruta), os.path.getmtime(ruta))
+
+
+def es_titulo(linea):
+    return len(linea) <= 120 and bool(PATRON_SECCION.match(linea))
+
+
+def dividir_frases(parrafo):
+    return segmentacion.frases(parrafo)
+
+
+def unidades(texto):
+    """
+    Itera (frase, inicia_seccion) sobre todo el documento; los títulos
+    (Markdown o numerados) abren sección y se tratan como una frase más
+    """
+    for bloque in re.split(r'\n\s*\n', texto):
+        lineas = [l.strip() for l in bloque.splitlines() if l.strip()]
+        parrafo = []
+        for linea in lineas + [None]:
+            if linea is not None and not es_titulo(linea):
+                parrafo.append(linea)
+                continue
+            if parrafo:
+                for frase in dividir_frases(' '.join(parrafo)):
+                    yield frase, False
+                parrafo = []
+            if linea is not None:
+                yield linea, True
+
+
+def _partir_frase(frase, presupuesto):
+    """Trocea por palabras una frase que por sí sola excede el presupuesto"""
+    trozo = []
+    for palabra in frase.split():
+        if trozo and estimar_tokens(' '.join(trozo + [palabra])) > presupuesto:
+            yield ' '.join(trozo)
+            trozo = []
+        trozo.append(palabra)
+    if trozo:
+        yield ' '.join(trozo)
+
+
+def fragmentar(texto, presupuesto, solapamiento=SOLAPAMIENTO):
+    """
+    Divide el texto en fragmentos de como máximo `presupuesto` tokens
+
+    Un fragmento se cierra antes de tiempo en un inicio de sección si ya
+    ocupa al menos la mitad del presupuesto.
+    """
+    if solapamiento >= presupuesto // 2:
+        solapamiento = presupuesto // 4
+
+    fragmentos = []
+    actual, tokens, nuevas = [], 0, 0
+
+    def cerrar():
+        nonlocal actual, tokens, nuevas
+        fragmentos.append('\n'.join(actual))
+        # Las últimas frases pasan al siguiente fragmento como contexto
+        arrastre, usados = [], 0
+        for frase in reversed(actual):
+            coste = estimar_tokens(frase)
+            if usados + coste > solapamiento:
+                break
+            arrastre.insert(0, frase)
+            usados += coste
+        actual, tokens, nuevas = arrastre, usados, 0
+
+    for frase, inicia_seccion in unidades(texto):
+        piezas = [frase] if estimar_tokens(frase) <= presupuesto else list(_partir_frase(frase, presupuesto))
+        for pieza in piezas:
+            coste = estimar_tokens(pieza)
+            if nuevas and (tokens + coste > presupuesto or (inicia_seccion and tokens >= presupuesto // 2)):
+                cerrar()
+            while actual and tokens + coste > presupuesto:
+                tokens -= estimar_tokens(actual.pop(0))
+            actual.append(pieza)
+            tokens += coste
+            nuevas += 1
+            inicia_seccion = False
+    if nuevas:
+        fragmentos.append('\n'.join(actual))
+    return fragmentos
+
+
+def construir_prompts(texto, nombre_documento, plantilla=None, max_tokens=MAX_TOKENS_CONTEXTO,
+                      reserva=RESERVA_RESPUESTA, solapamiento=SOLAPAMIENTO):
+    """Devuelve [(nombre, prompt)] listos para despacho_prompts.despachar"""
+    plantilla = cargar_plantilla(plantilla)
+    vacia = plantilla.format(fragmento='', indice=9999, total=9999, documento=nombre_documento)
+    presupuesto = max_tokens - reserva - estimar_tokens(vacia)
+    if presupuesto < 100:
+        raise ValueError(f"La plantilla y la reserva dejan solo {presupuesto} tokens por fragmento")
+
+    fragmentos = fragmentar(texto, presupuesto, solapamiento)
+    base = Path(nombre_documento).stem
+    return [
+        (f"{base}.parte-{i:03d}.txt",
+         plantilla.format(fragmento=fragmento, indice=i, total=len(fragmentos), documento=nombre_documento))
+        for i, fragmento in enumerate(fragmentos, 1)
+    ]
+
+
+def leer_documento(ruta):
+    if Path(ruta).suffix.lower() == '.docx':
+        import docx
+        return '\n'.join(p.text for p in docx.Document(ruta).paragraphs)
+    with open(ruta, 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def main():
+    import argparse
+    from despacho_prompts import BackendComet, BackendHTTP, MAX_EN_VUELO, URL_BASE, MODELO, despachar
+
+    parser = argparse.ArgumentParser(description='Divide un documento en prompts que caben en el contexto del modelo y los envía en lote.')
+    parser.add_argument('documento', help='Archivo .txt, .md o .docx')
+    parser.add_argument('--plantilla', help='Plantilla con {fragmento}, {indice}, {total} y {documento}')
+    parser.add_argument('--max-tokens', type=int, default=MAX_TOKENS_CONTEXTO, help='Ventana de contexto del modelo')
+    parser.add_argument('--reserva', type=int, default=RESERVA_RESPUESTA, help='Tokens reservados para la respuesta')
+    parser.add_argument('--solapamiento', type=int, default=SOLAPAMIENTO, help='Tokens repetidos entre fragmentos')
+    parser.add_argument('--solo-fragmentar', metavar='CARPETA', help='Escribe los prompts en CARPETA sin enviarlos')
+    parser.add_argument('--salida', default='respuestas')
+    parser.add_argument('--backend', choices=('http', 'comet'), default='http')
+    parser.add_argument('--url', default=URL_BASE)
+    parser.add_argument('--modelo', default=MODELO)
+    parser.add_argument('--max-en-vuelo', type=int, default=MAX_EN_VUELO)
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    try:
+        with perfilado.etapa('extraccion', archivo=Path(args.documento).name):
+            texto = leer_documento(args.documento)
+        with perfilado.etapa('fragmentacion') as etapa:
+            prompts = construir_prompts(texto, Path(args.documento).name, args.plantilla,
+                                        args.max_tokens, args.reserva, args.solapamiento)
+            etapa.items = len(prompts)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"✗ Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+    print(f"✓ {len(prompts)} fragmentos de ≤ {args.max_tokens - args.reserva} tokens (≈{estimar_tokens(texto)} tokens en total)")
+
+    if args.solo_fragmentar:
+        carpeta = Path(args.solo_fragmentar)
+        carpeta.mkdir(parents=True, exist_ok=True)
+        for nombre, prompt in prompts:
+            (carpeta / nombre).write_text(prompt, encoding='utf-8')
+        print(f"✓ Prompts escritos en {carpeta}")
+        return
+
+    backend = BackendHTTP(args.url, args.modelo) if args.backend == 'http' else BackendComet()
+    metricas = despachar(prompts, backend, args.salida, args.max_en_vuelo)
+    fallidos = sum(not m['ok'] for m in metricas)
+    print(f"\n{len(metricas) - fallidos}/{len(metricas)} fragmentos enviados.")
+    sys.exit(1 if fallidos else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -5,6 +5,8 @@ Script simple para enviar un prompt a Comet.app en macOS.
 Uso:
     python gemini_sender.py --prompt-file ruta/al/prompt.txt
 
+Para enviar muchos prompts a la vez (o a un endpoint HTTP) ver despacho_prompts.py.
+
 El script:
 1. Lee el prompt desde un archivo.
 2. Lo coloca en el portapapeles.
@@ -18,6 +20,12 @@ import sys
 import time
 from pathlib import Path
 
+import perfilado
+
+# Pausas para que la interfaz de Comet procese cada paso (segundos)
+PAUSA_PORTAPAPELES = 0.5
+PAUSA_ENTRE_PASOS = 1.0
+
 def put_on_clipboard(text: str) -> bool:
     try:
         process = subprocess.Popen(
@@ -48,7 +56,33 @@ def run_applescript(script: str) -> bool:
         print(f"✗ Error inesperado con AppleScript: {e}", file=sys.stderr)
         return False
 
-def send_prompt_to_comet(prompt_file_path: str) -> bool:
+def send_text_to_comet(prompt_text: str) -> bool:
+    """Pega un texto en una pestaña nueva de Comet.app y lo envía (backend 'comet' de despacho_prompts.py)"""
+    print("\n⚙️  Colocando prompt en el portapapeles...")
+    if not put_on_clipboard(prompt_text):
+        return False
+    print("✓ Prompt en el portapapeles")
+    time.sleep(PAUSA_PORTAPAPELES)
+
+    sequence = [
+        ("Activando Comet.app...", 'tell application "/Applications/Comet.app" to activate'),
+        ("Creando nueva pestaña...", 'tell application "System Events" to keystroke "t" using command down'),
+        ("Activando campo de entrada...", 'tell application "System Events" to keystroke "a" using {option down}'),
+        ("Pegando prompt...", 'tell application "System Events" to keystroke "v" using command down'),
+        ("Enviando prompt...", 'tell application "System Events" to keystroke return')
+    ]
+
+    for msg, cmd in sequence:
+        print(f"⚙️  {msg}")
+        if not run_applescript(cmd):
+            print(f"✗ Falló en el paso: {msg}", file=sys.stderr)
+            return False
+        time.sleep(PAUSA_ENTRE_PASOS) # Pequeña pausa entre comandos
+
+    return True
+
+def send_prompt_to_comet(prompt_file_path: str, backend=None) -> bool:
+    """Envía el prompt de un archivo; con un backend de despacho_prompts.py en lugar de Comet.app"""
     try:
         prompt_path = Path(prompt_file_path)
         if not prompt_path.exists():
@@ -64,26 +98,20 @@ def send_prompt_to_comet(prompt_file_path: str) -> bool:
 
         print(f"✓ Prompt cargado: {len(prompt_text)} caracteres")
 
-        print("\n⚙️  Colocando prompt en el portapapeles...")
-        if not put_on_clipboard(prompt_text):
+        from fragmentador_prompts import MAX_TOKENS_CONTEXTO, estimar_tokens
+        if estimar_tokens(prompt_text) > MAX_TOKENS_CONTEXTO:
+            print(f"⚠️  El prompt ocupa ≈{estimar_tokens(prompt_text)} tokens y puede exceder el contexto del modelo; "
+                  f"divídelo con: python fragmentador_prompts.py {prompt_file_path}", file=sys.stderr)
+
+        if backend is not None:
+            print(f"\n⚙️  Enviando prompt al backend '{backend.nombre}'...")
+            respuesta = backend.enviar(prompt_text)
+            print("\n✓ Respuesta recibida:\n")
+            print(respuesta)
+            return True
+
+        if not send_text_to_comet(prompt_text):
             return False
-        print("✓ Prompt en el portapapeles")
-        time.sleep(0.5)
-
-        sequence = [
-            ("Activando Comet.app...", 'tell application "/Applications/Comet.app" to activate'),
-            ("Creando nueva pestaña...", 'tell application "System Events" to keystroke "t" using command down'),
-            ("Activando campo de entrada...", 'tell application "System Events" to keystroke "a" using {option down}'),
-            ("Pegando prompt...", 'tell application "System Events" to keystroke "v" using command down'),
-            ("Enviando prompt...", 'tell application "System Events" to keystroke return')
-        ]
-
-        for msg, cmd in sequence:
-            print(f"⚙️  {msg}")
-            if not run_applescript(cmd):
-                print(f"✗ Falló en el paso: {msg}", file=sys.stderr)
-                return False
-            time.sleep(1) # Pequeña pausa entre comandos
 
         print("\n✓ Prompt enviado a Comet.app exitosamente.")
         print("Ahora, por favor, espera la respuesta en Comet, cópiala y pégala en el chat.")
@@ -105,13 +133,28 @@ def main():
         metavar='PATH',
         help='Ruta al archivo de texto con el prompt.'
     )
+    parser.add_argument(
+        '--backend',
+        choices=('comet', 'http'),
+        default='comet',
+        help="comet: Comet.app vía AppleScript; http: endpoint compatible con OpenAI ($OPENAI_BASE_URL)."
+    )
+    perfilado.agregar_argumentos(parser)
     args = parser.parse_args()
+    perfilado.activar_desde_args(args)
 
     print("=" * 50)
     print("  Script de Envío de Prompt para Comet.app")
     print("=" * 50)
 
-    if send_prompt_to_comet(args.prompt_file):
+    backend = None
+    if args.backend == 'http':
+        from despacho_prompts import BackendHTTP
+        backend = BackendHTTP()
+
+    with perfilado.etapa('envio', backend=args.backend):
+        enviado = send_prompt_to_comet(args.prompt_file, backend)
+    if enviado:
         sys.exit(0)
     else:
         sys.exit(1)
@@ -1,14 +1,80 @@
 import os
+import re
+import io
+import json
 import argparse
+from datetime import date
+from concurrent.futures import ProcessPoolExecutor
 from docx import Document
 from docx.shared import Pt, Inches
 from docx.oxml.ns import qn
 from docx.enum.text import WD_PARAGRAPH_ALIGNMENT
+from apa7_images import IMAGE_DPI, prepare_image
+from apa7_fragment_cache import FragmentCache, fingerprint
+import perfilado
+
+# Cover page fields; any of them can be overridden per document via metadata
+DEFAULT_METADATA = {
+    'title_line_1': "Diagrama de Flujo",
+    'title_line_2': "Procesos de Entrada y Salida de Datos en el Computador",
+    'author': "Gerardo Castillo Martinez",
+    'university': "Universidad Minuto de Dios",
+    'program': "Introducción a la Ingeniería de Software",
+    'professor': "James Gabriel Jaramillo Zambrano",
+    'date': None,  # None = today's date in Spanish
+}
+
+SPANISH_MONTHS = {
+    "January": "Enero", "February": "Febrero", "March": "Marzo", "April": "Abril",
+    "May": "Mayo", "June": "Junio", "July": "Julio", "August": "Agosto",
+    "September": "Septiembre", "October": "Octubre", "November": "Noviembre", "December": "Diciembre",
+}
+
+# "## " headings with special handling; every other section is rendered as is
+INTRO_SECTION = "Introducción"
+IMAGE_SECTION = "Desarrollo"
+HEADING_PATTERN = re.compile(r'^(#{1,6})\s+(.*)$')
+MANIFEST_REQUIRED_KEYS = ('content_file', 'output_path')
+
+# Base template bytes inherited by each batch worker process
+_worker_template = None
 
 def set_double_spacing(paragraph):
     paragraph.paragraph_format.line_spacing = 2.0
 
-def create_apa7_uniminuto_document(content_file, output_path, image_path=None, bibliography_file=None):
+def spanish_date(day):
+    text = day.strftime("%d de %B de %Y")
+    for english, spanish in SPANISH_MONTHS.items():
+        text = text.replace(english, spanish)
+    return text
+
+def parse_content(lines):
+    """
+    Single pass over the content lines (any iterable, e.g. an open file) yielding:
+        ('section', title)          for "## Title"
+        ('heading', level, title)   for "### Title" (3) and "#### Title" (4 or deeper)
+        ('paragraph', text)         for any other non-empty line, without ** markers
+    Lines before the first section (e.g. a "# Title" line) are skipped.
+    """
+    in_section = False
+    for raw in lines:
+        line = raw.strip()
+        if not line:
+            continue
+        match = HEADING_PATTERN.match(line)
+        level = len(match.group(1)) if match else 0
+        if level == 2:
+            in_section = True
+            yield ('section', match.group(2).strip())
+        elif not in_section:
+            continue
+        elif level >= 3:
+            yield ('heading', min(level, 4), match.group(2).replace('**', '').strip())
+        else:
+            yield ('paragraph', line.replace('**', ''))
+
+def build_base_template():
+    """Builds the styled empty document (margins, default font) once and returns it as .docx bytes"""
     doc = Document()
 
     # Margins
@@ -25,180 +91,281 @@ def create_apa7_uniminuto_document(content_file, output_path, image_path=None, b
     font.size = Pt(11)
     style.element.rPr.rFonts.set(qn('w:eastAsia'), 'Arial')
 
-    # Read content
-    try:
-        with open(content_file, 'r', encoding='utf-8') as f:
-            lines = f.readlines()
-    except FileNotFoundError:
-        print(f"Error: No se pudo encontrar el archivo de contenido en: {content_file}")
-        return
-    except Exception as e:
-        print(f"Error al leer el archivo de contenido: {e}")
-        return
+    buffer = io.BytesIO()
+    doc.save(buffer)
+    return buffer.getvalue()
 
-    # Cover Page
-    title_line_1 = "Diagrama de Flujo"
-    title_line_2 = "Procesos de Entrada y Salida de Datos en el Computador"
-    
-    doc.add_paragraph().add_run("\n\n\n\n\n")
-    titulo1 = doc.add_paragraph(title_line_1)
-    titulo1.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    titulo1.runs[0].bold = True
-    set_double_spacing(titulo1)
-    
-    titulo2 = doc.add_paragraph(title_line_2)
-    titulo2.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    titulo2.runs[0].bold = True
-    set_double_spacing(titulo2)
-    
-    doc.add_paragraph().add_run("\n\n\n\n") # 4 enters
+class PythonDocxWriter:
+    """Writes through python-docx; StreamingDocxWriter (apa7_docx_stream.py) has the same interface"""
 
-    autor = doc.add_paragraph("Gerardo Castillo Martinez")
-    autor.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    set_double_spacing(autor)
-    
-    uni = doc.add_paragraph("Universidad Minuto de Dios")
-    uni.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    set_double_spacing(uni)
+    ALIGNMENTS = {'center': WD_PARAGRAPH_ALIGNMENT.CENTER, 'left': WD_PARAGRAPH_ALIGNMENT.LEFT}
 
-    prog = doc.add_paragraph("Introducción a la Ingeniería de Software")
-    prog.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    set_double_spacing(prog)
+    def __init__(self, base_template, output_path):
+        # Clone the pre-styled template instead of restyling a blank document
+        self.doc = Document(io.BytesIO(base_template))
+        self.output_path = output_path
 
-    prof = doc.add_paragraph("James Gabriel Jaramillo Zambrano")
-    prof.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    set_double_spacing(prof)
-
-    from datetime import date
-    today = date.today()
-    fecha_actual = today.strftime("%d de %B de %Y").replace("January", "Enero").replace("February", "Febrero").replace("March", "Marzo").replace("April", "Abril").replace("May", "Mayo").replace("June", "Junio").replace("July", "Julio").replace("August", "Agosto").replace("September", "Septiembre").replace("October", "Octubre").replace("November", "Noviembre").replace("December", "Diciembre")
-    fecha = doc.add_paragraph(fecha_actual)
-    fecha.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-    set_double_spacing(fecha)
-
-    doc.add_page_break()
-
-    # Process Body
-    body_lines = [line.strip() for line in lines if line.strip()]
-    
-    # Find sections
-    intro_start = -1
-    dev_start = -1
-    conc_start = -1
-    
-    for i, line in enumerate(body_lines):
-        if line == "## Introducción":
-            intro_start = i
-        elif line == "## Desarrollo":
-            dev_start = i
-        elif line == "## Conclusiones":
-            conc_start = i
-
-    # --- Introduction ---
-    if intro_start != -1:
-        intro_title = doc.add_paragraph("Procesos de Entrada y Salida de Datos en el Computador")
-        intro_title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        intro_title.runs[0].bold = True
-        set_double_spacing(intro_title)
-        doc.add_paragraph()
-        
-        intro_end = dev_start if dev_start != -1 else conc_start if conc_start != -1 else len(body_lines)
-        for i in range(intro_start + 1, intro_end):
-            p = doc.add_paragraph()
-            p.paragraph_format.first_line_indent = Inches(0.5)
+    def paragraph(self, text=None, align=None, bold=False, italic=False, first_line_indent=None, left_indent=None, double_spacing=False):
+        p = self.doc.add_paragraph()
+        if align:
+            p.alignment = self.ALIGNMENTS[align]
+        if first_line_indent is not None:
+            p.paragraph_format.first_line_indent = first_line_indent
+        if left_indent is not None:
+            p.paragraph_format.left_indent = left_indent
+        if double_spacing:
             set_double_spacing(p)
-            p.add_run(body_lines[i])
-
-    # --- Development ---
-    if dev_start != -1:
-        doc.add_page_break()
-        dev_title = doc.add_paragraph("Desarrollo")
-        dev_title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        dev_title.runs[0].bold = True
-        set_double_spacing(dev_title)
-        doc.add_paragraph()
-        
-        if image_path and os.path.exists(image_path):
-            doc.add_picture(image_path, width=Inches(6))
-            last_paragraph = doc.paragraphs[-1]
-            last_paragraph.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-            doc.add_paragraph()
-            
-        dev_end = conc_start if conc_start != -1 else len(body_lines)
-        for i in range(dev_start + 1, dev_end):
-            line = body_lines[i]
-            if line.startswith('### '):
-                title = line.replace('### ', '').strip()
-                p = doc.add_paragraph()
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                runner = p.add_run(title)
-                runner.bold = True
-                set_double_spacing(p)
-            elif line.startswith('#### '):
-                title = line.replace('#### ', '').strip()
-                p = doc.add_paragraph()
-                p.alignment = WD_PARAGRAPH_ALIGNMENT.LEFT
-                runner = p.add_run(title)
+        if text is not None:
+            runner = p.add_run(text)
+            if bold:
                 runner.bold = True
+            if italic:
                 runner.italic = True
-                set_double_spacing(p)
-            else:
-                p = doc.add_paragraph()
-                p.paragraph_format.first_line_indent = Inches(0.5)
-                set_double_spacing(p)
-                p.add_run(line.replace('**', ''))
-
-    # --- Conclusions ---
-    if conc_start != -1:
-        doc.add_page_break()
-        conc_title = doc.add_paragraph("Conclusiones")
-        conc_title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        conc_title.runs[0].bold = True
-        set_double_spacing(conc_title)
-        doc.add_paragraph()
-        
-        for i in range(conc_start + 1, len(body_lines)):
-            p = doc.add_paragraph()
-            p.paragraph_format.first_line_indent = Inches(0.5)
-            set_double_spacing(p)
-            p.add_run(body_lines[i])
+
+    def page_break(self):
+        self.doc.add_page_break()
+
+    def picture(self, image_path, width):
+        p = self.doc.add_paragraph()
+        p.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
+        p.add_run().add_picture(image_path, width=width)
+
+    def close(self):
+        self.doc.save(self.output_path)
+
+    def abort(self):
+        pass
+
+def make_writer(kind, base_template, output_path):
+    if kind == 'stream':
+        from apa7_docx_stream import StreamingDocxWriter
+        return StreamingDocxWriter(base_template, output_path)
+    return PythonDocxWriter(base_template, output_path)
+
+def group_sections(events):
+    """Groups the parse_content events by section, buffering one section at a time"""
+    title, body = None, []
+    for event in events:
+        if event[0] == 'section':
+            if title is not None:
+                yield title, body
+            title, body = event[1], []
+        else:
+            body.append(event)
+    if title is not None:
+        yield title, body
+
+def read_bibliography(bibliography_file):
+    with open(bibliography_file, 'r', encoding='utf-8') as f:
+        bibliography_content = f.read()
+    # Split by <div class="csl-entry"> to process each entry
+    entries = bibliography_content.split('<div class="csl-entry">')
+    # Remove </div> and any leading/trailing whitespace
+    return [entry.replace('</div>', '').strip() for entry in entries if entry.strip()]
+
+def render_cover(writer, meta):
+    writer.paragraph("\n\n\n\n\n")
+    writer.paragraph(meta['title_line_1'], align='center', bold=True, double_spacing=True)
+    writer.paragraph(meta['title_line_2'], align='center', bold=True, double_spacing=True)
+    writer.paragraph("\n\n\n\n") # 4 enters
+
+    for field in ('author', 'university', 'program', 'professor', 'date'):
+        writer.paragraph(meta[field], align='center', double_spacing=True)
+
+    writer.page_break()
+
+def render_section(writer, heading, body, page_break, image=None):
+    if page_break:
+        writer.page_break()
+    writer.paragraph(heading, align='center', bold=True, double_spacing=True)
+    writer.paragraph()
+    if image:
+        # Downsampled, recompressed copy from the shared image cache
+        image_path, image_dpi = image
+        with perfilado.etapa('imagen', dpi=image_dpi):
+            prepared = prepare_image(image_path, Inches(6), image_dpi)
+        writer.picture(prepared, width=Inches(6))
+        writer.paragraph()
+
+    for event in body:
+        if event[0] == 'heading':
+            _, level, title = event
+            writer.paragraph(title, align='left', bold=True, italic=level >= 4, double_spacing=True)
+        else:
+            writer.paragraph(event[1], first_line_indent=Inches(0.5), double_spacing=True)
+
+def render_references(writer, entries):
+    writer.page_break()
+    writer.paragraph("Referencias", align='center', bold=True, double_spacing=True)
+    for entry in entries:
+        # Hanging indent, double spacing
+        writer.paragraph(entry, first_line_indent=Inches(0.5), left_indent=Inches(0.5), double_spacing=True)
+
+def document_blocks(lines, meta, image_path=None, bibliography_file=None, image_dpi=IMAGE_DPI):
+    """
+    Yields (inputs, render) for the cover, every section and the references;
+    inputs holds everything the block is rendered from (its fingerprint)
+    """
+    cover = {**meta, 'date': meta['date'] or spanish_date(date.today())}
+    yield ('cover', cover), lambda writer: render_cover(writer, cover)
+
+    image = None
+    if image_path and os.path.exists(image_path):
+        stat = os.stat(image_path)
+        image = (os.path.abspath(image_path), image_dpi, stat.st_mtime_ns, stat.st_size)
+
+    # Body: consumed section by section straight from the content stream
+    for index, (title, body) in enumerate(group_sections(parse_content(lines))):
+        # APA: the introduction is headed by the paper title, not by "Introducción"
+        heading = meta['title_line_2'] if title == INTRO_SECTION else title
+        section_image = image if title == IMAGE_SECTION else None
+        yield (('section', heading, index > 0, body, section_image),
+               lambda writer, h=heading, b=body, p=index > 0, i=section_image: render_section(writer, h, b, p, i and i[:2]))
 
     # Add Bibliography if provided
     if bibliography_file and os.path.exists(bibliography_file):
-        doc.add_page_break()
-        references_title = doc.add_paragraph("Referencias")
-        references_title.alignment = WD_PARAGRAPH_ALIGNMENT.CENTER
-        references_title.runs[0].bold = True
-        set_double_spacing(references_title)
-        
-        with open(bibliography_file, 'r', encoding='utf-8') as f:
-            bibliography_content = f.read()
-            # Split by <div class="csl-entry"> to process each entry
-            entries = bibliography_content.split('<div class="csl-entry">')
-            for entry in entries:
-                if entry.strip():
-                    # Remove </div> and any leading/trailing whitespace
-                    clean_entry = entry.replace('</div>', '').strip()
-                    p = doc.add_paragraph()
-                    p.paragraph_format.first_line_indent = Inches(0.5) # Hanging indent
-                    p.paragraph_format.left_indent = Inches(0.5)
-                    p.paragraph_format.line_spacing = 2.0 # Double spacing
-                    p.add_run(clean_entry)
-
-    # Save document
+        entries = read_bibliography(bibliography_file)
+        yield ('references', entries), lambda writer: render_references(writer, entries)
+
+def render_document(writer, lines, meta, image_path=None, bibliography_file=None, image_dpi=IMAGE_DPI, fragment_cache=None):
+    """With a FragmentCache, unchanged blocks are replayed from their cached XML"""
+    with perfilado.etapa('renderizado', writer=type(writer).__name__) as stage:
+        stage.items = 0
+        for inputs, render in document_blocks(lines, meta, image_path, bibliography_file, image_dpi):
+            if fragment_cache is None:
+                render(writer)
+            else:
+                fragment_cache.render(writer, fingerprint(*inputs), render)
+            stage.items += 1
+
+def create_apa7_uniminuto_document(content_file, output_path, image_path=None, bibliography_file=None, metadata=None, base_template=None, writer='docx', image_dpi=IMAGE_DPI, incremental=False):
+    """
+    writer='stream' serializes the XML directly to the zip (faster and lighter on long documents);
+    image_dpi=0 embeds the figure without downsampling;
+    incremental=True reuses the cached XML of unchanged blocks (implies writer='stream')
+    """
+    meta = {**DEFAULT_METADATA, **(metadata or {})}
+    if incremental:
+        writer = 'stream'
+
+    # Render and save document; the content file is read lazily while rendering
     try:
-        doc.save(output_path)
+        content = open(content_file, 'r', encoding='utf-8')
+    except FileNotFoundError:
+        print(f"Error: No se pudo encontrar el archivo de contenido en: {content_file}")
+        return None
+    except Exception as e:
+        print(f"Error al leer el archivo de contenido: {e}")
+        return None
+
+    fragment_cache = FragmentCache() if incremental else None
+    out = None
+    try:
+        with content:
+            out = make_writer(writer, base_template or build_base_template(), output_path)
+            render_document(out, content, meta, image_path, bibliography_file, image_dpi, fragment_cache)
+        with perfilado.etapa('guardar_docx', archivo=os.path.basename(output_path)):
+            out.close()
+        if fragment_cache is not None:
+            print(f"Bloques reutilizados: {fragment_cache.hits}, regenerados: {fragment_cache.misses}")
         print(f"Documento final generado con éxito en: {output_path}")
+        return output_path
+    except Exception as e:
+        if out is not None:
+            out.abort()
+            if writer == 'stream' and os.path.exists(output_path):
+                os.remove(output_path)
+        print(f"Error al generar el documento: {e}")
+        return None
+    finally:
+        if fragment_cache is not None:
+            fragment_cache.close()
+
+def _init_batch_worker(base_template):
+    global _worker_template
+    _worker_template = base_template
+
+def _run_batch_job(job):
+    # One failed job must not discard the results of the others in pool.map
+    try:
+        return create_apa7_uniminuto_document(
+            job['content_file'], job['output_path'], job.get('image_path'),
+            job.get('bibliography_file'), job.get('metadata'), _worker_template,
+            job.get('writer', 'docx'), job.get('image_dpi', IMAGE_DPI), job.get('incremental', False))
     except Exception as e:
-        print(f"Error al guardar el documento: {e}")
+        print(f"Error al generar {job.get('output_path')}: {e}")
+        return None
+
+def load_manifest(manifest_path):
+    """
+    Reads a batch manifest:
+        {"defaults": {...metadata...},
+         "jobs": [{"content_file", "output_path", "image_path"?, "bibliography_file"?, "metadata"?}]}
+    Relative paths are resolved against the manifest's directory. Raises
+    ValueError if a job lacks content_file or output_path.
+    """
+    with open(manifest_path, 'r', encoding='utf-8') as f:
+        manifest = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(manifest_path))
+    defaults = manifest.get('defaults', {})
+    jobs = []
+    for number, entry in enumerate(manifest.get('jobs', []), 1):
+        missing = [key for key in MANIFEST_REQUIRED_KEYS if not entry.get(key)]
+        if missing:
+            raise ValueError(f"{manifest_path}: el trabajo {number} no tiene {', '.join(missing)}")
+        job = dict(entry)
+        for key in ('content_file', 'output_path', 'image_path', 'bibliography_file'):
+            if job.get(key):
+                job[key] = os.path.join(base_dir, job[key])
+        job['metadata'] = {**defaults, **entry.get('metadata', {})}
+        jobs.append(job)
+    return jobs
+
+def create_apa7_documents_batch(manifest_path, workers=None, writer='docx', image_dpi=IMAGE_DPI, incremental=False):
+    """Renders every job of a manifest in a process pool sharing one base template"""
+    jobs = load_manifest(manifest_path)
+    for job in jobs:
+        job.setdefault('writer', writer)
+        job.setdefault('image_dpi', image_dpi)
+        job.setdefault('incremental', incremental)
+    base_template = build_base_template()
+
+    # Worker processes are not profiled; the batch shows up as a single stage
+    with perfilado.etapa('lote', workers=workers) as stage:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_batch_worker, initargs=(base_template,)) as pool:
+            results = list(pool.map(_run_batch_job, jobs))
+        stage.items = len(jobs)
+
+    failed = [job['output_path'] for job, result in zip(jobs, results) if result is None]
+    print(f"Lote completado: {len(jobs) - len(failed)}/{len(jobs)} documentos generados.")
+    for path in failed:
+        print(f"Error: No se generó {path}")
+    return results
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Genera un documento .docx en formato APA 7 Uniminuto a partir de un archivo de texto.')
-    parser.add_argument('--content_file', required=True, help='Ruta al archivo .txt con el contenido del ensayo.')
-    parser.add_argument('--output_path', required=True, help='Ruta donde se guardará el archivo .docx final.')
+    parser.add_argument('--content_file', required=False, help='Ruta al archivo .txt con el contenido del ensayo.')
+    parser.add_argument('--output_path', required=False, help='Ruta donde se guardará el archivo .docx final.')
     parser.add_argument('--image_path', required=False, help='Ruta a la imagen del diagrama de flujo.')
-    parser.add_argument('--bibliography_file', required=True, help='Ruta al archivo .txt con la bibliografía formateada en APA 7.')
+    parser.add_argument('--bibliography_file', required=False, help='Ruta al archivo .txt con la bibliografía formateada en APA 7.')
+    parser.add_argument('--manifest', required=False, help='Manifiesto JSON para generar muchos documentos en lote.')
+    parser.add_argument('--workers', type=int, default=None, help='Procesos paralelos en modo lote (por defecto, uno por CPU).')
+    parser.add_argument('--image_dpi', type=int, default=IMAGE_DPI, help='Resolución a la que se reduce la imagen (0 = insertar la original).')
+    parser.add_argument('--incremental', action='store_true', help='Reutiliza las secciones sin cambios de la generación anterior (usa --writer stream).')
+    parser.add_argument('--writer', choices=('docx', 'stream'), default='docx', help='docx: python-docx; stream: escribe el XML directamente (documentos largos).')
+    perfilado.agregar_argumentos(parser)
     
     args = parser.parse_args()
+    perfilado.activar_desde_args(args)
     
-    create_apa7_uniminuto_document(args.content_file, args.output_path, args.image_path, args.bibliography_file)
\ No newline at end of file
+    if args.manifest:
+        try:
+            create_apa7_documents_batch(args.manifest, args.workers, args.writer, args.image_dpi, args.incremental)
+        except ValueError as e:
+            parser.error(str(e))
+    elif not (args.content_file and args.output_path and args.bibliography_file):
+        parser.error('se requieren --content_file, --output_path y --bibliography_file (o --manifest)')
+    else:
+        create_apa7_uniminuto_document(args.content_file, args.output_path, args.image_path, args.bibliography_file,
+                                       writer=args.writer, image_dpi=args.image_dpi, incremental=args.incremental)
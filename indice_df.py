@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+ÍNDICE DF (frecuencia documental) sobre un corpus local
+Alimenta la selección de palabras clave TF-IDF de anti_plagio_optimizer.py
+
+Uso:
+    python indice_df.py <carpeta_corpus> <indice_df.sqlite>
+
+El índice es una tabla SQLite (termino -> nº de documentos) sin rowid,
+que se consulta bajo demanda: nunca se carga entera en memoria y
+nunca se accede a la red.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import sys
+from collections import Counter
+
+import perfilado
+
+EXTENSIONES_CORPUS = ('.txt', '.md')
+LOTE_CONSULTA = 500
+
+PATRON_PALABRA = re.compile(r'[^\W\d_]{3,}')
+
+STOPWORDS_ES = frozenset("""
+a al algo algunas algunos ante antes aquel aquella aquellas aquellos aqui así aun
+bajo bien cada casi como con contra cual cuales cuando cuya cuyo de del desde
+donde dos el ella ellas ello ellos en entre era eran es esa esas ese eso esos esta
+estaba estado estan estar estas este esto estos fue fueron ha haber había han has
+hasta hay la las le les lo los mas más me mi mientras muy ni no nos nosotros o
+otra otras otro otros para pero poco por porque que qué se sea según ser si sí
+sido siempre sin sino sobre son su sus tal también tan tanto te tiene tienen
+todo todos tu tus un una unas uno unos usted ya yo cual cuales será serán puede
+pueden debe deben cómo dónde forma parte través mismo misma mismos mismas
+""".split())
+
+
+def tokenizar(texto):
+    """Devuelve los términos normalizados (minúsculas, sin stopwords) de un texto"""
+    return [t for t in PATRON_PALABRA.findall(texto.lower()) if t not in STOPWORDS_ES]
+
+
+def _archivos_corpus(carpeta):
+    for raiz, _, archivos in os.walk(carpeta):
+        for nombre in sorted(archivos):
+            if nombre.lower().endswith(EXTENSIONES_CORPUS):
+                yield os.path.join(raiz, nombre)
+
+
+def construir_indice(carpeta_corpus, ruta_indice):
+    """
+    Recorre el corpus local y guarda la frecuencia documental de cada término
+
+    Args:
+        carpeta_corpus: Carpeta con documentos .txt/.md
+        ruta_indice: Archivo SQLite de salida (se reemplaza si existe)
+    """
+    df = Counter()
+    n_documentos = 0
+    for ruta in _archivos_corpus(carpeta_corpus):
+        with open(ruta, 'r', encoding='utf-8', errors='ignore') as f:
+            df.update(set(tokenizar(f.read())))
+        n_documentos += 1
+
+    if os.path.exists(ruta_indice):
+        os.remove(ruta_indice)
+
+    conn = sqlite3.connect(ruta_indice)
+    with conn:
+        conn.execute("CREATE TABLE df (termino TEXT PRIMARY KEY, df INTEGER NOT NULL) WITHOUT ROWID")
+        conn.execute("CREATE TABLE meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL)")
+        conn.executemany("INSERT INTO df VALUES (?, ?)", sorted(df.items()))
+        conn.execute("INSERT INTO meta VALUES ('n_documentos', ?)", (str(n_documentos),))
+    conn.execute("VACUUM")
+    conn.close()
+
+    return n_documentos, len(df)
+
+
+class IndiceDF:
+    """Acceso perezoso de solo lectura a un índice creado con construir_indice()"""
+
+    def __init__(self, ruta_indice):
+        self.ruta = ruta_indice
+        self._conn = None
+        self._n_documentos = None
+        self._cache = {}
+
+    def _conexion(self):
+        if self._conn is None:
+            self._conn = sqlite3.connect(f"file:{self.ruta}?mode=ro", uri=True)
+            fila = self._conn.execute("SELECT valor FROM meta WHERE clave = 'n_documentos'").fetchone()
+            self._n_documentos = int(fila[0]) if fila else 0
+        return self._conn
+
+    @property
+    def n_documentos(self):
+        self._conexion()
+        return self._n_documentos
+
+    def frecuencias(self, terminos):
+        """Devuelve {termino: df} consultando solo los términos aún no vistos"""
+        pendientes = [t for t in set(terminos) if t not in self._cache]
+        if pendientes:
+            conn = self._conexion()
+            for i in range(0, len(pendientes), LOTE_CONSULTA):
+                lote = pendientes[i:i + LOTE_CONSULTA]
+                marcas = ','.join('?' * len(lote))
+                encontrados = dict(conn.execute(f"SELECT termino, df FROM df WHERE termino IN ({marcas})", lote))
+                for termino in lote:
+                    self._cache[termino] = encontrados.get(termino, 0)
+        return {t: self._cache[t] for t in terminos}
+
+    def idf(self, terminos):
+        """IDF suavizado: log((1 + N) / (1 + df)) + 1"""
+        n = self.n_documentos
+        return {t: math.log((1 + n) / (1 + df)) + 1 for t, df in self.frecuencias(terminos).items()}
+
+    def cerrar(self):
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    perfilado.activar_desde_argv()
+    if len(sys.argv) != 3:
+        print("Uso: python indice_df.py <carpeta_corpus> <indice_df.sqlite> [--profile [perfil.json]]")
+        sys.exit(1)
+
+    carpeta, salida = sys.argv[1], sys.argv[2]
+    if not os.path.isdir(carpeta):
+        print(f"Error: La carpeta del corpus no existe: {carpeta}")
+        sys.exit(1)
+
+    with perfilado.etapa('construir_indice') as etapa:
+        n_docs, n_terminos = construir_indice(carpeta, salida)
+        etapa.items = n_docs
+    print(f"✅ Índice DF generado: {salida}")
+    print(f"   Documentos: {n_docs} | Términos: {n_terminos}")
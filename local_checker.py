@@ -2,7 +2,8 @@ import os
 import docx
 import PyPDF2
 import sys
-import nltk
+
+import perfilado
 
 BIBLIOGRAPHY_MARKERS = [
     'Referencias:', 'Referencias',
@@ -11,14 +12,14 @@ BIBLIOGRAPHY_MARKERS = [
 ]
 
 def download_nltk_resource(resource):
+    import nltk
     try:
         nltk.data.find(resource)
     except LookupError:
         print(f"Descargando el recurso '{resource.split('/')[-1]}' de NLTK...")
         nltk.download(resource.split('/')[-1], quiet=True)
 
-download_nltk_resource('tokenizers/punkt')
-
+@perfilado.medir_extraccion
 def extract_text(filepath):
     print(f"Extrayendo texto de: {filepath}")
     _, file_extension = os.path.splitext(filepath)
@@ -50,13 +51,16 @@ def remove_bibliography(text):
 
 
 if __name__ == "__main__":
+    perfilado.activar_desde_argv()
     if len(sys.argv) != 2:
-        print("Uso: python3 local_checker_clean.py \"/ruta/al/archivo.txt\"")
+        print("Uso: python3 local_checker_clean.py \"/ruta/al/archivo.txt\" [--profile [perfil.json]]")
         sys.exit(1)
     file_path = os.path.abspath(sys.argv[1])
     if not os.path.exists(file_path):
         print(f"Error: El archivo no se encuentra en la ruta: {file_path}")
         sys.exit(1)
+    # Solo al usarlo como script: importarlo (pipeline_escritura, benchmark) no descarga nada
+    download_nltk_resource('tokenizers/punkt')
     text_content = extract_text(file_path)
     if text_content:
         print("\nTexto extraído con éxito. Eliminando bibliografía...")
@@ -3,11 +3,15 @@ import docx
 import PyPDF2
 import time
 import sys
-import torch
-import torch.nn as nn
-from transformers import AutoTokenizer, AutoModel, AutoConfig, PreTrainedModel, AutoModelForSequenceClassification
 import json
-import nltk
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+
+import detectores
+import perfilado
+import segmentacion
+import servidor_detectores
+from detectores import MODELOS
 
 os.environ['TOKENIZERS_PARALLELISM'] = 'false'
 
@@ -17,33 +21,7 @@ BIBLIOGRAPHY_MARKERS = [
     'References:', 'References'
 ]
 
-def download_nltk_resource(resource):
-    try:
-        nltk.data.find(resource)
-    except LookupError:
-        print(f"Descargando el recurso '{resource.split('/')[-1]}' de NLTK...")
-        nltk.download(resource.split('/')[-1], quiet=True)
-
-download_nltk_resource('tokenizers/punkt')
-
-class DesklibAIDetectionModel(PreTrainedModel):
-    config_class = AutoConfig
-    def __init__(self, config):
-        super().__init__(config)
-        self.model = AutoModel.from_config(config)
-        self.classifier = nn.Linear(config.hidden_size, 1)
-        self.init_weights()
-
-    def forward(self, input_ids, attention_mask=None, labels=None, **kwargs):
-        outputs = self.model(input_ids, attention_mask=attention_mask)
-        last_hidden_state = outputs[0]
-        input_mask_expanded = attention_mask.unsqueeze(-1).expand(last_hidden_state.size()).float()
-        sum_embeddings = torch.sum(last_hidden_state * input_mask_expanded, dim=1)
-        sum_mask = torch.clamp(input_mask_expanded.sum(dim=1), min=1e-9)
-        pooled_output = sum_embeddings / sum_mask
-        logits = self.classifier(pooled_output)
-        return {"logits": logits}
-
+@perfilado.medir_extraccion
 def extract_text(filepath):
     print(f"Extrayendo texto de: {filepath}")
     _, file_extension = os.path.splitext(filepath)
@@ -73,100 +51,75 @@ def get_ensemble_verdict(scores):
         return "PROBABLEMENTE IA", "Todos los modelos coinciden en una alta probabilidad."
     return "RESULTADO AMBIGUO (Revisión Manual Sugerida)", "Los modelos ofrecen resultados contradictorios o intermedios."
 
-def analyze_chunk_subprocess(chunk_text):
-    scores = {}
-    # Desklib
-    try:
-        temp_script_path = "_temp_runner.py"
-        with open(temp_script_path, "w", encoding="utf-8") as f:
-            f.write('''
-import sys, torch, torch.nn as nn
-from transformers import AutoTokenizer, AutoModel, AutoConfig, PreTrainedModel
-class D(PreTrainedModel):
-    config_class=AutoConfig
-    def __init__(self,c):super().__init__(c);self.model=AutoModel.from_config(c);self.classifier=nn.Linear(c.hidden_size,1);self.init_weights()
-    def forward(self,input_ids,attention_mask=None,**kwargs):o=self.model(input_ids,attention_mask=attention_mask);lhs=o[0];ime=attention_mask.unsqueeze(-1).expand(lhs.size()).float();se=torch.sum(lhs*ime,dim=1);sm=torch.clamp(ime.sum(dim=1),min=1e-9);po=se/sm;l=self.classifier(po);return{"logits":l}
-model_name="desklib/ai-text-detector-v1.01";text=sys.argv[1]
-try:
-    tok=AutoTokenizer.from_pretrained(model_name);conf=AutoConfig.from_pretrained(model_name);model=D.from_pretrained(model_name,config=conf);model.eval()
-    inputs=tok(text,return_tensors="pt",truncation=True,max_length=512,padding="max_length")
-    with torch.no_grad():p=torch.sigmoid(model(**inputs)["logits"]).item()
-    print(p*100)
-except Exception:print(-1)
-''')
-        desklib_python_path = "/Volumes/MainDrive/miniforge3/envs/desklib-detector/bin/python"
-        import subprocess
-        process = subprocess.run([desklib_python_path, temp_script_path, chunk_text], capture_output=True, text=True, encoding="utf-8")
-        scores['desklib'] = float(process.stdout.strip()) if process.returncode == 0 and process.stdout.strip() else -1
-    except Exception:
-        scores['desklib'] = -1
-    
-    # SuperAnnotate
+def run_detector_subprocess(name, texts):
+    """Puntúa todos los textos en un solo proceso del entorno del modelo (detectores/ejecutar.py)"""
     try:
-        temp_script_path = "_temp_runner.py"
-        with open(temp_script_path, "w", encoding="utf-8") as f:
-            f.write('''
-import sys, torch, torch.nn.functional as F
-from generated_text_detector.utils.model.roberta_classifier import RobertaClassifier
-from generated_text_detector.utils.preprocessing import preprocessing_text
-from transformers import AutoTokenizer
-text=sys.argv[1];model_name="SuperAnnotate/ai-detector"
-try:
-    model=RobertaClassifier.from_pretrained(model_name);tok=AutoTokenizer.from_pretrained(model_name);model.eval()
-    pt=preprocessing_text(text);tokens=tok.encode_plus(pt,add_special_tokens=True,max_length=512,padding='longest',truncation=True,return_token_type_ids=True,return_tensors="pt")
-    with torch.no_grad():_,l=model(**tokens);p=F.sigmoid(l).squeeze(1).item()
-    print(p*100)
-except Exception:print(-1)
-''')
-        conda_python_path = "/Volumes/MainDrive/miniforge3/envs/sa-detector/bin/python"
-        import subprocess
-        process = subprocess.run([conda_python_path, temp_script_path, chunk_text], capture_output=True, text=True, encoding="utf-8")
-        scores['superannotate'] = float(process.stdout.strip()) if process.returncode == 0 and process.stdout.strip() else -1
-    except Exception:
-        scores['superannotate'] = -1
-    
-    if os.path.exists("_temp_runner.py"): os.remove("_temp_runner.py")
-    return scores
+        with perfilado.etapa('subproceso', modelo=name) as etapa:
+            etapa.items = len(texts)
+            process = subprocess.run(detectores.comando('ejecutar', name), input=json.dumps(texts),
+                                     capture_output=True, text=True, encoding="utf-8", env=detectores.entorno())
+        stderr = perfilado.registrar_salida_hijo(process.stderr)
+        if process.returncode == 0 and process.stdout.strip():
+            return json.loads(process.stdout)
+        print(f"Error en el subproceso de {name}: {stderr.strip().splitlines()[-1] if stderr.strip() else process.returncode}")
+    except Exception as e:
+        print(f"Error en el subproceso de {name}: {e}")
+    return [-1] * len(texts)
+
+def analyze_chunks_subprocess(chunks):
+    """Los modelos corren en paralelo, cada uno en su entorno y sin archivos temporales compartidos"""
+    with ThreadPoolExecutor(max_workers=len(MODELOS)) as pool:
+        futures = {name: pool.submit(run_detector_subprocess, name, chunks) for name in MODELOS}
+    return {name: future.result() for name, future in futures.items()}
+
+def perform_server_analysis(text_for_ai):
+    """Troceado y ensamble en servidor_detectores.py, con los modelos ya cargados"""
+    print(f"\n[DEBUG] Analizando en el servidor de detectores ({servidor_detectores.URL_SERVIDOR})...")
+    with perfilado.etapa('servidor', modelos=len(MODELOS)) as etapa:
+        response = servidor_detectores.analizar_documento(text_for_ai, list(MODELOS))
+        etapa.items = len(response['trozos'])
+    for name, error in response['errores'].items():
+        print(f"Error en el modelo {name}: {error}")
+    print(f"[DEBUG] {len(response['trozos'])} trozos analizados.")
+    return {
+        model_id: {'scores_by_chunk': dict(zip(response['trozos'], response['puntuaciones'][name]))}
+        for name, model_id in MODELOS.items()
+    }
 
 def perform_full_analysis(text_for_ai):
-    tokenizer = AutoTokenizer.from_pretrained("openai-community/roberta-base-openai-detector")
-    max_length = 512
-    sentences = nltk.sent_tokenize(text_for_ai)
-    chunks = []
-    current_chunk_text = ""
-    for sentence in sentences:
-        test_chunk = current_chunk_text + " " + sentence if current_chunk_text else sentence
-        if len(tokenizer.encode(test_chunk, truncation=False)) <= max_length - 2:
-            current_chunk_text = test_chunk
-        else:
-            if current_chunk_text:
-                chunks.append(current_chunk_text)
-            current_chunk_text = sentence
-    if current_chunk_text:
-        chunks.append(current_chunk_text)
+    if servidor_detectores.activo(modelos=list(MODELOS)):
+        try:
+            return perform_server_analysis(text_for_ai)
+        except Exception as e:
+            print(f"Error en el servidor de detectores, se analiza localmente: {e}")
 
-    all_models_results = {
-        "desklib/ai-text-detector-v1.01": {'scores_by_chunk': {}},
-        "SuperAnnotate/ai-detector": {'scores_by_chunk': {}}
-    }
+    # transformers solo hace falta sin servidor; importarlo arriba lo cargaría también
+    # en cada proceso de segmentacion que reimporta __main__ (arranque spawn en macOS)
+    from transformers import AutoTokenizer
+    with perfilado.etapa('carga_tokenizador'):
+        tokenizer = AutoTokenizer.from_pretrained("openai-community/roberta-base-openai-detector")
+    max_length = 512
+    sentences = segmentacion.frases(text_for_ai)
+    with perfilado.etapa('troceado') as etapa:
+        chunks = segmentacion.trozos(sentences, tokenizer, max_length)
+        etapa.items = len(chunks)
 
     print(f"\n[DEBUG] Texto dividido en {len(chunks)} trozos. Analizando...")
 
-    for i, chunk in enumerate(chunks):
-        print(f"---\n[DEBUG] Procesando Trozo {i+1}/{len(chunks)}")
-        try:
-            sub_scores = analyze_chunk_subprocess(chunk)
-            all_models_results["desklib/ai-text-detector-v1.01"]['scores_by_chunk'][chunk] = sub_scores.get('desklib', -1)
-            all_models_results["SuperAnnotate/ai-detector"]['scores_by_chunk'][chunk] = sub_scores.get('superannotate', -1)
-        except Exception as e:
-            print(f"Error en subprocesos: {e}")
-            all_models_results["desklib/ai-text-detector-v1.01"]['scores_by_chunk'][chunk] = -1
-            all_models_results["SuperAnnotate/ai-detector"]['scores_by_chunk'][chunk] = -1
+    scores = analyze_chunks_subprocess(chunks) if chunks else {name: [] for name in MODELOS}
+    all_models_results = {
+        model_id: {'scores_by_chunk': dict(zip(chunks, scores[name]))}
+        for name, model_id in MODELOS.items()
+    }
 
     print("\n[DEBUG] Análisis completo de todos los trozos finalizado.")
     return all_models_results
 
 def display_report(file_path, analysis_results):
+    with perfilado.etapa('informe'):
+        _display_report(file_path, analysis_results)
+
+def _display_report(file_path, analysis_results):
     print("\n" + "="*40)
     print("  INFORME DE ANÁLISIS DE ORIGINALIDAD")
     print("="*40)
@@ -203,6 +156,7 @@ def display_report(file_path, analysis_results):
     print("\n" + "="*40)
 
 if __name__ == "__main__":
+    perfilado.activar_desde_argv()
     if len(sys.argv) != 2:
         print("Uso: python3 local_checker.py \"/ruta/al/archivo.txt\"")
         sys.exit(1)
@@ -210,6 +164,7 @@ if __name__ == "__main__":
     if not os.path.exists(file_path):
         print(f"Error: El archivo no se encuentra en la ruta: {file_path}")
         sys.exit(1)
+    segmentacion.descargar_modelo()
     text_content = extract_text(file_path)
     if text_content:
         print("\nTexto extraído con éxito. Iniciando análisis completo...")
@@ -6,14 +6,17 @@ import sys
 import subprocess
 import json
 import re
-import nltk
 import docx
 from PyPDF2 import PdfReader
-import textwrap
+
+import detectores
+import perfilado
+import segmentacion
+import servidor_detectores
 
 # --- CONFIGURACIÓN GLOBAL ---
 # Rutas a los entornos virtuales, obtenidas del CONFIG.txt
-SA_VENV_PATH = "/Volumes/MainDrive/miniforge3/envs/sa-detector/bin/python"
+# (el de SuperAnnotate está en detectores.PYTHON_MODELOS; se cambia con $SA_PYTHON)
 VENV_CHECKER_PATH = "/Volumes/MainDrive/venv_checker/bin/python" # Para NLTK y otros
 
 MODELS = {
@@ -26,17 +29,11 @@ BIBLIOGRAPHY_MARKERS = [
 ]
 
 PROBLEM_THRESHOLD = 30.0
-SENTENCE_DELIMITER = "|||---|||"
+MIN_SENTENCE_WORDS = 5
 
 # --- FUNCIONES DE UTILIDAD Y EXTRACCIÓN ---
 
-def download_nltk_resource(resource, resource_name):
-    try:
-        nltk.data.find(resource)
-    except LookupError:
-        print(f"Descargando recurso de NLTK '{resource_name}'...")
-        nltk.download(resource_name, quiet=True)
-
+@perfilado.medir_extraccion
 def extract_text(filepath):
     _, ext = os.path.splitext(filepath)
     ext = ext.lower()
@@ -67,74 +64,42 @@ def remove_bibliography(text):
 
 # --- FUNCIÓN DE ANÁLISIS POR MODELO (SUBPROCESO) ---
 
+def analyze_sentences_server(sentences=None, text=None):
+    """Frases y puntuaciones desde servidor_detectores.py (modelo ya cargado, lotes compartidos)"""
+    with perfilado.etapa('servidor', modelo='superannotate') as etapa:
+        response = servidor_detectores.analizar_frases(sentences, text, ['superannotate'], MIN_SENTENCE_WORDS)
+        etapa.items = len(response['frases'])
+    if response['errores']:
+        sys.stderr.write(f"Error en el servidor de detectores: {response['errores']['superannotate']}\n")
+    return response['frases'], response['puntuaciones']['superannotate']
+
 def analyze_sentences_superannotate(sentences):
-    model_id = MODELS["superannotate"]
-    python_executable = SA_VENV_PATH
-
-    # Código que se ejecutará en el subproceso para SuperAnnotate
-    runner_code = textwrap.dedent(f'''
-        import sys
-        import json
-        import torch
-        import torch.nn.functional as F
-        from generated_text_detector.utils.model.roberta_classifier import RobertaClassifier
-        from generated_text_detector.utils.preprocessing import preprocessing_text
-        from transformers import AutoTokenizer
-
-        def run_analysis(sentences_str, model_id):
-            try:
-                model = RobertaClassifier.from_pretrained(model_id)
-                tokenizer = AutoTokenizer.from_pretrained(model_id)
-                model.eval()
-                
-                sentences = sentences_str.split("{SENTENCE_DELIMITER}")
-                scores = []
-                
-                with torch.no_grad():
-                    for sentence in sentences:
-                        if not sentence.strip():
-                            scores.append(0.0)
-                            continue
-                        
-                        preprocessed_text = preprocessing_text(sentence)
-                        tokens = tokenizer.encode_plus(
-                            preprocessed_text,
-                            add_special_tokens=True,
-                            max_length=512,
-                            padding='longest',
-                            truncation=True,
-                            return_token_type_ids=True,
-                            return_tensors="pt"
-                        )
-                        
-                        _, logits = model(**tokens)
-                        probability = F.sigmoid(logits).squeeze(1).item()
-                        scores.append(probability * 100)
-                
-                print(json.dumps(scores))
-
-            except Exception as e:
-                error_message = f"ERROR: {{str(e)}}"
-                print(json.dumps([error_message] * len(sentences_str.split("{SENTENCE_DELIMITER}"))), file=sys.stderr)
-                sys.exit(1)
-
-        if __name__ == "__main__":
-            run_analysis(sys.argv[1], "{model_id}")
-    ''')
+    if servidor_detectores.activo(modelos=list(MODELS)):
+        try:
+            return analyze_sentences_server(sentences)[1]
+        except Exception as e:
+            print(f"Error en el servidor de detectores, se analiza localmente: {e}")
+    return analyze_sentences_subprocess(sentences)
+
+def analyze_sentences_subprocess(sentences):
+    python_executable = detectores.PYTHON_MODELOS['superannotate']
 
     if not os.path.exists(python_executable):
         print(f"ADVERTENCIA: No se encontró el entorno para SuperAnnotate en {python_executable}")
         return [-1.0] * len(sentences)
 
     try:
-        sentences_str = SENTENCE_DELIMITER.join(sentences)
-        process = subprocess.run(
-            [python_executable, "-c", runner_code, sentences_str],
-            capture_output=True, text=True, timeout=300
-        )
+        # Runner importable (detectores/ejecutar.py); las frases viajan por stdin
+        with perfilado.etapa('subproceso', modelo='superannotate', frases=len(sentences)):
+            process = subprocess.run(
+                detectores.comando('ejecutar', 'superannotate'),
+                input=json.dumps(sentences), capture_output=True, text=True, timeout=300,
+                env=detectores.entorno()
+            )
+        stderr = perfilado.registrar_salida_hijo(process.stderr)
         
         if process.returncode != 0:
-            sys.stderr.write(f"Error en subproceso de SuperAnnotate:\n{process.stderr}\n")
+            sys.stderr.write(f"Error en subproceso de SuperAnnotate:\n{stderr}\n")
             return [f"ERROR_SUBPROCESS"] * len(sentences)
 
         return json.loads(process.stdout)
@@ -144,23 +109,39 @@ def analyze_sentences_superannotate(sentences):
 
 # --- FUNCIÓN PRINCIPAL ---
 
-def main(filepath):
+def main(filepath, use_server=False):
     print("Iniciando micro-análisis de frases (v9 Human-Centric)...")
     
     text = extract_text(filepath)
     if not text: return
         
     text = remove_bibliography(text)
-    sentences = [s.strip() for s in nltk.sent_tokenize(text) if len(s.split()) >= 5]
+    sentences = superannotate_scores = None
+    if use_server:
+        # Segmentación y modelo ya cargados en el servidor
+        print(f"Analizando con SuperAnnotate en {servidor_detectores.URL_SERVIDOR}...")
+        try:
+            sentences, superannotate_scores = analyze_sentences_server(text=text)
+        except Exception as e:
+            print(f"Error en el servidor de detectores, se analiza localmente: {e}")
+            segmentacion.descargar_modelo()
+    if sentences is None:
+        sentences = segmentacion.frases(text, MIN_SENTENCE_WORDS)
     
     if not sentences:
         print("No se encontraron oraciones suficientemente largas para analizar.")
         return
 
-    print(f"Analizando {len(sentences)} oraciones con SuperAnnotate...")
-    
-    superannotate_scores = analyze_sentences_superannotate(sentences)
+    if superannotate_scores is None:
+        print(f"Analizando {len(sentences)} oraciones con SuperAnnotate...")
+        # Si el servidor acaba de fallar no se vuelve a intentar
+        analyze = analyze_sentences_subprocess if use_server else analyze_sentences_superannotate
+        superannotate_scores = analyze(sentences)
+
+    with perfilado.etapa('informe', frases=len(sentences)):
+        print_report(sentences, superannotate_scores)
 
+def print_report(sentences, superannotate_scores):
     print("\n" + "="*50)
     print("  INFORME DE MICRO-ANÁLISIS (SuperAnnotate)")
     print("="*50)
@@ -192,17 +173,19 @@ def main(filepath):
     print("\n" + "="*50)
 
 if __name__ == "__main__":
+    perfilado.activar_desde_argv()
     if len(sys.argv) != 2:
         print(f"Uso: {VENV_CHECKER_PATH} {sys.argv[0]} \"/ruta/al/archivo.txt\"")
         sys.exit(1)
         
-    # Usamos el venv principal para descargar nltk
-    # ya que el entorno de 'sa-detector' podría no tenerlo
-    subprocess.run([VENV_CHECKER_PATH, "-c", "import nltk; nltk.download('punkt', quiet=True)"])
+    # Con el servidor de detectores en marcha este proceso es solo un cliente
+    use_server = servidor_detectores.activo(modelos=list(MODELS))
+    if not use_server:
+        segmentacion.descargar_modelo()
 
     filepath = os.path.abspath(sys.argv[1])
     if not os.path.exists(filepath):
         print(f"Error: El archivo no se encuentra en la ruta: {filepath}")
         sys.exit(1)
         
-    main(filepath)
+    main(filepath, use_server)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+Instrumentación común por etapas para todas las herramientas
+
+    with perfilado.etapa('extraccion', archivo=ruta) as e:
+        texto = extract_text(ruta)
+        e.items = len(texto)
+
+Por cada etapa se registra tiempo de pared, tiempo de CPU (del hilo y de
+los subprocesos que terminaron dentro de ella), pico de RSS y número de
+elementos procesados. Desactivado no hace nada; con --profile [RUTA] en
+cualquier CLI se escribe al salir una traza JSON, o en formato Chrome
+trace-event (chrome://tracing, Perfetto) con --profile-formato chrome.
+"""
+
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+RUTA_POR_DEFECTO = "perfil.json"
+FORMATOS = ('json', 'chrome')
+# ru_maxrss está en bytes en macOS y en KiB en Linux
+_ESCALA_RSS = 1 if sys.platform == 'darwin' else 1024
+
+
+def _rss_pico_mb(quien=None):
+    if resource is None:
+        return None
+    uso = resource.getrusage(resource.RUSAGE_SELF if quien is None else quien)
+    return round(uso.ru_maxrss * _ESCALA_RSS / 2 ** 20, 1)
+
+
+def _cpu_hijos():
+    if resource is None:
+        return 0.0
+    uso = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return uso.ru_utime + uso.ru_stime
+
+
+class Etapa:
+    """Una etapa en curso; items y atributos se pueden completar dentro del bloque"""
+
+    __slots__ = ('nombre', 'atributos', 'items')
+
+    def __init__(self, nombre, atributos):
+        self.nombre = nombre
+        self.atributos = atributos
+        self.items = None
+
+
+class Perfilador:
+
+    def __init__(self):
+        self.activo = False
+        self.ruta = None
+        self.formato = 'json'
+        self.eventos = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._origen = time.perf_counter()
+        self._inicio = time.time()
+
+    def activar(self, ruta=RUTA_POR_DEFECTO, formato='json'):
+        if not self.activo:
+            atexit.register(self.escribir)
+        self.activo = True
+        self.ruta = ruta
+        self.formato = formato
+
+    def _agregar(self, evento):
+        with self._lock:
+            self.eventos.append(evento)
+
+    @contextmanager
+    def etapa(self, nombre, **atributos):
+        actual = Etapa(nombre, atributos)
+        if not self.activo:
+            yield actual
+            return
+
+        pila = self._local.__dict__.setdefault('pila', [])
+        pila.append(nombre)
+        inicio = time.perf_counter()
+        cpu = time.thread_time()
+        cpu_hijos = _cpu_hijos()
+        error = None
+        try:
+            yield actual
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            pila.pop()
+            evento = {
+                'nombre': nombre,
+                'inicio_s': round(inicio - self._origen, 6),
+                'duracion_s': round(time.perf_counter() - inicio, 6),
+                'cpu_s': round(time.thread_time() - cpu, 6),
+                'cpu_subprocesos_s': round(_cpu_hijos() - cpu_hijos, 6),
+                'rss_pico_mb': _rss_pico_mb(),
+                'items': actual.items,
+                'hilo': threading.current_thread().name,
+                'padre': pila[-1] if pila else None,
+            }
+            if atributos:
+                evento['atributos'] = {k: v if isinstance(v, (int, float, str, bool, type(None))) else str(v)
+                                       for k, v in atributos.items()}
+            if error:
+                evento['error'] = error
+            self._agregar(evento)
+
+    def registrar(self, nombre, duracion_s, items=None, **atributos):
+        """Etapa medida fuera de este proceso (p. ej. carga del modelo en un subproceso), terminada ahora"""
+        if not self.activo:
+            return
+        fin = time.perf_counter() - self._origen
+        pila = self._local.__dict__.get('pila') or []
+        self._agregar({
+            'nombre': nombre,
+            'inicio_s': round(fin - duracion_s, 6),
+            'duracion_s': round(duracion_s, 6),
+            'cpu_s': None,
+            'cpu_subprocesos_s': None,
+            'rss_pico_mb': atributos.pop('rss_pico_mb', None),
+            'items': items,
+            'hilo': threading.current_thread().name,
+            'padre': pila[-1] if pila else None,
+            'atributos': atributos,
+        })
+
+    def resumen(self):
+        por_etapa = {}
+        for e in self.eventos:
+            r = por_etapa.setdefault(e['nombre'], {'llamadas': 0, 'total_s': 0.0, 'cpu_s': 0.0, 'items': 0})
+            r['llamadas'] += 1
+            r['total_s'] = round(r['total_s'] + e['duracion_s'], 6)
+            r['cpu_s'] = round(r['cpu_s'] + (e['cpu_s'] or 0) + (e['cpu_subprocesos_s'] or 0), 6)
+            r['items'] += e['items'] or 0
+        return dict(sorted(por_etapa.items(), key=lambda kv: -kv[1]['total_s']))
+
+    def traza(self):
+        return {
+            'comando': sys.argv,
+            'inicio': time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self._inicio)),
+            'duracion_s': round(time.perf_counter() - self._origen, 6),
+            'rss_pico_mb': _rss_pico_mb(),
+            'rss_pico_subprocesos_mb': _rss_pico_mb(resource.RUSAGE_CHILDREN) if resource else None,
+            'resumen': self.resumen(),
+            'etapas': sorted(self.eventos, key=lambda e: e['inicio_s']),
+        }
+
+    def traza_chrome(self):
+        pid = os.getpid()
+        hilos = {}
+        eventos = []
+        for e in sorted(self.eventos, key=lambda e: e['inicio_s']):
+            tid = hilos.setdefault(e['hilo'], len(hilos) + 1)
+            args = {k: e[k] for k in ('cpu_s', 'cpu_subprocesos_s', 'rss_pico_mb', 'items') if e.get(k) is not None}
+            args.update(e.get('atributos') or {})
+            eventos.append({'name': e['nombre'], 'ph': 'X', 'pid': pid, 'tid': tid,
+                            'ts': round(e['inicio_s'] * 1e6), 'dur': round(e['duracion_s'] * 1e6), 'args': args})
+        eventos.extend({'name': 'thread_name', 'ph': 'M', 'pid': pid, 'tid': tid, 'args': {'name': nombre}}
+                       for nombre, tid in hilos.items())
+        return {'traceEvents': eventos, 'displayTimeUnit': 'ms'}
+
+    def escribir(self):
+        if not self.activo or not self.ruta:
+            return
+        datos = self.traza_chrome() if self.formato == 'chrome' else self.traza()
+        with open(self.ruta, 'w', encoding='utf-8') as f:
+            json.dump(datos, f, indent=None if self.formato == 'chrome' else 2, ensure_ascii=False)
+        print(f"⏱️  Perfil guardado en {self.ruta}", file=sys.stderr)
+
+
+perfil = Perfilador()
+etapa = perfil.etapa
+registrar = perfil.registrar
+
+
+# --- Integración con las CLI ---
+
+def agregar_argumentos(parser):
+    parser.add_argument('--profile', nargs='?', const=RUTA_POR_DEFECTO, metavar='RUTA',
+                        help=f'Guarda una traza de tiempos por etapa (por defecto {RUTA_POR_DEFECTO})')
+    parser.add_argument('--profile-formato', choices=FORMATOS, default='json',
+                        help='json: resumen y etapas; chrome: trace-event para chrome://tracing o Perfetto')
+
+
+def activar_desde_args(args):
+    if getattr(args, 'profile', None):
+        perfil.activar(args.profile, args.profile_formato)
+
+
+def activar_desde_argv(argv=None):
+    """
+    Para las CLI que leen sys.argv a mano: quita --profile[=RUTA] y
+    --profile-formato[=F] de argv (en el sitio) y activa el perfilado
+    """
+    argv = sys.argv if argv is None else argv
+    ruta, formato = None, 'json'
+    i = 1
+    while i < len(argv):
+        arg = argv[i]
+        if arg == '--profile' or arg.startswith('--profile='):
+            del argv[i]
+            if '=' in arg:
+                ruta = arg.split('=', 1)[1]
+            elif i < len(argv) and argv[i].endswith('.json') and not argv[i].startswith('-'):
+                ruta = argv.pop(i)
+            else:
+                ruta = RUTA_POR_DEFECTO
+        elif arg == '--profile-formato' or arg.startswith('--profile-formato='):
+            del argv[i]
+            if '=' in arg:
+                formato = arg.split('=', 1)[1]
+            elif i < len(argv):
+                formato = argv.pop(i)
+        else:
+            i += 1
+    if ruta:
+        perfil.activar(ruta, formato if formato in FORMATOS else 'json')
+    return argv
+
+
+def medir_extraccion(funcion):
+    """
+    Decorador para los extract_text(ruta) de las CLI: etapa 'extraccion'
+    con el archivo como atributo y los caracteres leídos como items
+    """
+    @functools.wraps(funcion)
+    def envoltura(ruta, *args, **kwargs):
+        with etapa('extraccion', archivo=os.path.basename(ruta)) as e:
+            texto = funcion(ruta, *args, **kwargs)
+            e.items = len(texto) if texto else 0
+        return texto
+    return envoltura
+
+
+def registrar_salida_hijo(stderr):
+    """
+    Registra las líneas 'PERFIL {json}' que los runners escriben en stderr
+    ({"etapa": ..., "duracion_s": ..., "items": ...}) y devuelve el resto
+    """
+    resto = []
+    for linea in (stderr or '').splitlines():
+        if linea.startswith('PERFIL '):
+            try:
+                datos = json.loads(linea[7:])
+                registrar(datos.pop('etapa'), datos.pop('duracion_s'), datos.pop('items', None), **datos)
+                continue
+            except (ValueError, KeyError):
+                pass
+        resto.append(linea)
+    return '\n'.join(resto)
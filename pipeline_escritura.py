@@ -0,0 +1,389 @@
+#!/usr/bin/env python3
+"""
+Pipeline completo de revisión de un trabajo académico
+
+Modela las herramientas del repositorio como un grafo de etapas:
+
+    extraer → quitar_referencias → segmentar → puntuacion_frases ─┐
+                      │  ├──────→ escaneo_heuristico ─────────────┼→ informe
+                      │  └──────→ ensamble_ia ────────────────────┘
+                      └─────────→ docx
+
+Cada artefacto intermedio se guarda en caché con una clave que combina el
+hash de sus entradas, su configuración y el código de la etapa; una
+etapa solo se vuelve a ejecutar si algo de eso cambió, y las etapas
+independientes corren en paralelo.
+
+Uso:
+    python pipeline_escritura.py trabajo.txt --salida revision/ --bibliografia bib.txt
+    python pipeline_escritura.py trabajo.docx --etapas informe --sin-modelos
+"""
+
+import hashlib
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import date
+from pathlib import Path
+
+import perfilado
+
+CARPETA_REPO = Path(__file__).resolve().parent
+RUTA_CACHE = os.getenv("PIPELINE_CACHE") or os.path.expanduser("~/.cache/pinokio-academic-pipeline/artefactos")
+MAX_PARALELO = 4
+MIN_PALABRAS_FRASE = 5  # mismo filtro que micro_analyzer.py
+
+
+# --- Etapas ---
+
+def etapa_extraer(config, entrada):
+    from local_checker import extract_text
+    texto = extract_text(entrada)
+    if texto is None:
+        raise ValueError(f"no se pudo extraer texto de {entrada}")
+    return texto
+
+
+def etapa_quitar_referencias(config, extraer):
+    from local_checker import remove_bibliography
+    return remove_bibliography(extraer)
+
+
+def etapa_segmentar(config, quitar_referencias):
+    import segmentacion
+    return segmentacion.frases(quitar_referencias)
+
+
+def etapa_escaneo_heuristico(config, quitar_referencias):
+    from anti_plagio_optimizer import AntiPlagioOptimizer
+    optimizer = AntiPlagioOptimizer(quitar_referencias, config.get('indice_df'))
+    optimizer.generar_ecuaciones_documento()
+    for i, frase in enumerate(optimizer.frases):
+        optimizer.analizar_plagio_frase(i, frase)
+    reporte = optimizer.generar_reporte()
+    del reporte['fecha_analisis']  # el artefacto solo depende del texto
+    return reporte
+
+
+def etapa_puntuacion_frases(config, segmentar):
+    from micro_analyzer import analyze_sentences_superannotate
+    frases = [f for f in segmentar if len(f.split()) >= MIN_PALABRAS_FRASE]
+    puntuaciones = analyze_sentences_superannotate(frases) if frases else []
+    if any(not isinstance(p, (int, float)) or p < 0 for p in puntuaciones):
+        raise RuntimeError(f"el detector SuperAnnotate falló: {puntuaciones[:1]}")
+    return [{'frase': f, 'superannotate': p} for f, p in zip(frases, puntuaciones)]
+
+
+def etapa_ensamble_ia(config, quitar_referencias):
+    from local_checker_final_working_version import get_ensemble_verdict, perform_full_analysis
+    resultados = perform_full_analysis(quitar_referencias)
+    maximos = [max(d['scores_by_chunk'].values()) if d['scores_by_chunk'] else -1 for d in resultados.values()]
+    if any(m < 0 for m in maximos):
+        raise RuntimeError("uno o más modelos del ensamble fallaron")
+    veredicto, explicacion = get_ensemble_verdict(maximos)
+    return {
+        'veredicto': veredicto,
+        'explicacion': explicacion,
+        'modelos': {nombre: max(d['scores_by_chunk'].values()) for nombre, d in resultados.items() if d['scores_by_chunk']},
+    }
+
+
+def etapa_informe(config, escaneo_heuristico, puntuacion_frases=None, ensamble_ia=None):
+    umbral = config.get('umbral_frases', 30.0)
+    return {
+        'archivo': config['nombre_entrada'],
+        'heuristico': {k: v for k, v in escaneo_heuristico.items() if k != 'frases_detalladas'},
+        'frases_alto_riesgo': [r for r in escaneo_heuristico['frases_detalladas'] if r['riesgo_turnitin'] == 'ALTO'],
+        'frases_ia': [p for p in (puntuacion_frases or []) if p['superannotate'] > umbral],
+        'ensamble_ia': ensamble_ia,
+        'modelos_omitidos': [n for n, v in (('puntuacion_frases', puntuacion_frases), ('ensamble_ia', ensamble_ia)) if v is None],
+    }
+
+
+def contenido_apa7(texto):
+    """
+    Texto en el formato que entiende el generador APA 7: solo se publica lo
+    que está bajo un "## Sección", así que un trabajo sin títulos Markdown
+    (extraído de .docx o .pdf) va entero a la introducción
+    """
+    from generate_apa7_doc_UNIMINUTO import INTRO_SECTION, parse_content
+    if not any(e[0] == 'section' for e in parse_content(texto.splitlines())):
+        texto = f"## {INTRO_SECTION}\n\n{texto}"
+    if not any(e[0] == 'paragraph' for e in parse_content(texto.splitlines())):
+        raise ValueError("el texto no tiene párrafos para el documento APA 7")
+    return texto
+
+
+def etapa_docx(config, quitar_referencias):
+    import tempfile
+    from generate_apa7_doc_UNIMINUTO import create_apa7_uniminuto_document
+    with tempfile.TemporaryDirectory() as tmp:
+        contenido = os.path.join(tmp, 'contenido.txt')
+        salida = os.path.join(tmp, 'documento.docx')
+        with open(contenido, 'w', encoding='utf-8') as f:
+            f.write(contenido_apa7(quitar_referencias))
+        if create_apa7_uniminuto_document(contenido, salida, config.get('imagen'), config.get('bibliografia'),
+                                          config.get('metadatos'), writer='stream') is None:
+            raise RuntimeError("no se pudo generar el documento APA 7")
+        with open(salida, 'rb') as f:
+            return f.read()
+
+
+class Etapa:
+
+    def __init__(self, nombre, funcion, dependencias=(), opcionales=(), modulos=(), config=(), archivos=(), modelo=False):
+        """
+        Args:
+            dependencias: etapas cuyo artefacto es obligatorio
+            opcionales: etapas que pueden faltar (fallidas u omitidas); se recibe None
+            modulos: archivos del repositorio cuyo código forma parte de la clave
+            config: claves de configuración que afectan al resultado
+            archivos: claves de configuración que son rutas; su contenido forma parte de la clave
+            modelo: usa detectores externos (se omite con --sin-modelos)
+        """
+        self.nombre = nombre
+        self.funcion = funcion
+        self.dependencias = tuple(dependencias)
+        self.opcionales = tuple(opcionales)
+        self.modulos = tuple(modulos)
+        self.config = tuple(config)
+        self.archivos = tuple(archivos)
+        self.modelo = modelo
+
+    @property
+    def entradas(self):
+        return self.dependencias + self.opcionales
+
+
+ETAPAS = [
+    # 'entrada' es la ruta del trabajo; su hash es el de su contenido
+    Etapa('extraer', etapa_extraer, ['entrada'], modulos=('local_checker.py',)),
+    Etapa('quitar_referencias', etapa_quitar_referencias, ['extraer'], modulos=('local_checker.py',)),
+    Etapa('segmentar', etapa_segmentar, ['quitar_referencias'], modulos=('segmentacion.py',)),
+    Etapa('escaneo_heuristico', etapa_escaneo_heuristico, ['quitar_referencias'],
+          modulos=('anti_plagio_optimizer.py', 'indice_df.py'), archivos=('indice_df',)),
+    Etapa('puntuacion_frases', etapa_puntuacion_frases, ['segmentar'], modulos=('micro_analyzer.py',), modelo=True),
+    Etapa('ensamble_ia', etapa_ensamble_ia, ['quitar_referencias'], modulos=('local_checker_final_working_version.py',), modelo=True),
+    Etapa('informe', etapa_informe, ['escaneo_heuristico'], ['puntuacion_frases', 'ensamble_ia'],
+          config=('nombre_entrada', 'umbral_frases')),
+    Etapa('docx', etapa_docx, ['quitar_referencias'],
+          modulos=('generate_apa7_doc_UNIMINUTO.py', 'apa7_docx_stream.py', 'apa7_images.py', 'apa7_fragment_cache.py'),
+          config=('metadatos', 'fecha'), archivos=('imagen', 'bibliografia')),
+]
+
+
+# --- Caché de artefactos ---
+
+_hashes_archivos = {}
+
+
+def hash_archivo(ruta):
+    """SHA-256 del contenido de un archivo, memorizado por ruta, tamaño y fecha"""
+    stat = os.stat(ruta)
+    clave = (os.path.abspath(ruta), stat.st_size, stat.st_mtime_ns)
+    if clave not in _hashes_archivos:
+        digest = hashlib.sha256()
+        with open(ruta, 'rb') as f:
+            for bloque in iter(lambda: f.read(1 << 20), b''):
+                digest.update(bloque)
+        _hashes_archivos[clave] = digest.hexdigest()
+    return _hashes_archivos[clave]
+
+
+def hash_valor(valor):
+    if isinstance(valor, bytes):
+        return hashlib.sha256(valor).hexdigest()
+    return hashlib.sha256(json.dumps(valor, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+class CacheArtefactos:
+    """Un archivo por artefacto: <clave>.json o <clave>.bin (bytes)"""
+
+    def __init__(self, carpeta=RUTA_CACHE):
+        self.carpeta = Path(carpeta)
+        self.carpeta.mkdir(parents=True, exist_ok=True)
+
+    def leer(self, clave):
+        ruta = self.carpeta / f"{clave}.bin"
+        if ruta.exists():
+            return True, ruta.read_bytes()
+        ruta = self.carpeta / f"{clave}.json"
+        if ruta.exists():
+            with open(ruta, 'r', encoding='utf-8') as f:
+                return True, json.load(f)
+        return False, None
+
+    def guardar(self, clave, valor):
+        if isinstance(valor, bytes):
+            destino, datos = self.carpeta / f"{clave}.bin", valor
+        else:
+            destino, datos = self.carpeta / f"{clave}.json", json.dumps(valor, ensure_ascii=False).encode('utf-8')
+        # Escritura atómica: otra ejecución puede estar leyendo la misma clave
+        tmp = destino.with_suffix(f".{os.getpid()}.tmp")
+        tmp.write_bytes(datos)
+        os.replace(tmp, destino)
+
+
+# --- Ejecución del grafo ---
+
+class Pipeline:
+
+    def __init__(self, etapas=ETAPAS, cache=None, max_paralelo=MAX_PARALELO):
+        self.etapas = {e.nombre: e for e in etapas}
+        self.cache = cache or CacheArtefactos()
+        self.max_paralelo = max_paralelo
+
+    def _necesarias(self, objetivos, omitidas):
+        """Etapas a ejecutar para producir los objetivos, sin las omitidas"""
+        necesarias = set()
+        pendientes = list(objetivos)
+        while pendientes:
+            nombre = pendientes.pop()
+            if nombre in necesarias or nombre in omitidas or nombre not in self.etapas:
+                continue
+            necesarias.add(nombre)
+            pendientes.extend(self.etapas[nombre].entradas)
+        return necesarias
+
+    def _clave(self, etapa, config, hashes):
+        partes = {
+            'etapa': etapa.nombre,
+            # Las funciones de las etapas viven en este archivo
+            'codigo': [hash_archivo(CARPETA_REPO / m) for m in ('pipeline_escritura.py', *etapa.modulos)],
+            'config': {k: config.get(k) for k in etapa.config},
+            'archivos': {k: hash_archivo(config[k]) if config.get(k) and os.path.exists(config[k]) else None
+                         for k in etapa.archivos},
+            'entradas': {d: hashes.get(d) for d in etapa.entradas},
+        }
+        return hash_valor(partes)
+
+    def _ejecutar_etapa(self, etapa, config, artefactos, hashes):
+        clave = self._clave(etapa, config, hashes)
+        encontrado, valor = self.cache.leer(clave)
+        inicio = time.perf_counter()
+        if not encontrado:
+            kwargs = {d: artefactos.get(d) for d in etapa.entradas}
+            with perfilado.etapa(etapa.nombre, modelo=etapa.modelo) as medida:
+                valor = etapa.funcion(config, **kwargs)
+                if isinstance(valor, (list, dict)):
+                    medida.items = len(valor)
+            self.cache.guardar(clave, valor)
+        return valor, encontrado, time.perf_counter() - inicio
+
+    def ejecutar(self, entrada, config=None, objetivos=('informe', 'docx'), sin_modelos=False):
+        """
+        Ejecuta las etapas necesarias para los objetivos
+
+        Returns:
+            (artefactos, estado) con estado[etapa] = 'cache' | 'ejecutada' | 'fallida: ...' | 'omitida'
+        """
+        config = dict(config or {})
+        config.setdefault('nombre_entrada', os.path.basename(entrada))
+        # La portada lleva la fecha del día si los metadatos no fijan otra
+        config.setdefault('fecha', date.today().isoformat())
+        omitidas = {n for n, e in self.etapas.items() if e.modelo and sin_modelos}
+        necesarias = self._necesarias(objetivos, omitidas)
+
+        artefactos = {'entrada': entrada}
+        hashes = {'entrada': hash_archivo(entrada)}
+        estado = {n: 'omitida' for n in omitidas}
+        dependencias = {n: set(self.etapas[n].entradas) & necesarias for n in necesarias}
+
+        with ThreadPoolExecutor(max_workers=self.max_paralelo) as pool:
+            en_curso = {}
+            while len(estado) - len(omitidas) < len(necesarias) or en_curso:
+                for nombre in sorted(necesarias):
+                    if nombre in estado or nombre in en_curso.values():
+                        continue
+                    etapa = self.etapas[nombre]
+                    if not dependencias[nombre] <= set(estado):
+                        continue
+                    faltantes = [d for d in etapa.dependencias if d not in artefactos]
+                    if faltantes:
+                        estado[nombre] = f"omitida: falta {', '.join(faltantes)}"
+                        continue
+                    en_curso[pool.submit(self._ejecutar_etapa, etapa, config, artefactos, dict(hashes))] = nombre
+
+                if not en_curso:
+                    continue
+                listos, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in listos:
+                    nombre = en_curso.pop(futuro)
+                    try:
+                        valor, de_cache, duracion = futuro.result()
+                    except Exception as e:
+                        estado[nombre] = f"fallida: {e}"
+                        print(f"✗ {nombre}: {e}", file=sys.stderr)
+                        continue
+                    artefactos[nombre] = valor
+                    hashes[nombre] = hash_valor(valor)
+                    estado[nombre] = 'cache' if de_cache else 'ejecutada'
+                    print(f"✓ {nombre} ({estado[nombre]}, {duracion:.2f} s)")
+
+        del artefactos['entrada']
+        return artefactos, estado
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Revisión completa de un trabajo: extracción, detectores, informe y documento APA 7.')
+    parser.add_argument('entrada', help='Trabajo en .txt, .docx o .pdf')
+    parser.add_argument('--salida', default='revision', help='Carpeta para informe.json y documento.docx')
+    parser.add_argument('--etapas', nargs='+', default=['informe', 'docx'], help='Etapas objetivo (y todo lo que necesitan)')
+    parser.add_argument('--bibliografia', help='Bibliografía en HTML CSL para el documento APA 7')
+    parser.add_argument('--imagen', help='Figura de la sección Desarrollo')
+    parser.add_argument('--metadatos', help='JSON con los datos de portada (title_line_1, author, ...)')
+    parser.add_argument('--indice-df', help='Índice DF (indice_df.py) para el escaneo heurístico')
+    parser.add_argument('--sin-modelos', action='store_true', help='Omite los detectores de IA externos')
+    parser.add_argument('--max-paralelo', type=int, default=MAX_PARALELO)
+    parser.add_argument('--cache', default=RUTA_CACHE, help='Carpeta de artefactos en caché')
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    desconocidas = [e for e in args.etapas if e not in {e.nombre for e in ETAPAS}]
+    if desconocidas:
+        parser.error(f"etapas desconocidas: {', '.join(desconocidas)}")
+    if not os.path.exists(args.entrada):
+        print(f"Error: El archivo no se encuentra en la ruta: {args.entrada}")
+        sys.exit(1)
+
+    config = {
+        'bibliografia': args.bibliografia,
+        'imagen': args.imagen,
+        'indice_df': args.indice_df,
+    }
+    if args.metadatos:
+        with open(args.metadatos, 'r', encoding='utf-8') as f:
+            config['metadatos'] = json.load(f)
+
+    pipeline = Pipeline(cache=CacheArtefactos(args.cache), max_paralelo=args.max_paralelo)
+    inicio = time.perf_counter()
+    artefactos, estado = pipeline.ejecutar(args.entrada, config, args.etapas, args.sin_modelos)
+
+    salida = Path(args.salida)
+    salida.mkdir(parents=True, exist_ok=True)
+    for nombre in args.etapas:
+        if nombre not in artefactos:
+            continue
+        valor = artefactos[nombre]
+        destino = salida / (f"documento.docx" if nombre == 'docx' else f"{nombre}.json")
+        if isinstance(valor, bytes):
+            destino.write_bytes(valor)
+        else:
+            with open(destino, 'w', encoding='utf-8') as f:
+                json.dump(valor, f, indent=2, ensure_ascii=False)
+        print(f"💾 {destino}")
+
+    fallidas = [n for n in args.etapas if n not in artefactos]
+    print(f"\nPipeline completado en {time.perf_counter() - inicio:.2f} s: "
+          f"{sum(e == 'ejecutada' for e in estado.values())} etapas ejecutadas, "
+          f"{sum(e == 'cache' for e in estado.values())} desde caché.")
+    sys.exit(1 if fallidas else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Segmentación en frases compartida por todas las herramientas
+
+Carga una sola vez el modelo Punkt de NLTK para español y segmenta párrafo
+a párrafo (los separa una línea en blanco). Los textos grandes se reparten
+en bloques de párrafos entre varios procesos. El resultado son
+desplazamientos (inicio, fin) sobre el texto original, no copias, y se
+memoriza por hash del texto. Sin NLTK o sin el modelo descargado se corta
+por puntuación final.
+
+    spans = segmentacion.segmentar(texto)     # ((0, 42), (43, 97), ...)
+    frases = segmentacion.frases(texto, 5)    # frases de al menos 5 palabras
+    trozos = segmentacion.trozos(frases, tokenizador)  # frases agrupadas hasta 512 tokens
+
+Uso:
+    python segmentacion.py trabajo.txt [--json]
+"""
+
+import hashlib
+import os
+import re
+import sys
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import perfilado
+
+IDIOMA = 'spanish'
+MAX_MEMO = 256             # textos cuya segmentación se recuerda
+MIN_PARALELO = 200_000     # caracteres a partir de los cuales se segmenta en varios procesos
+TAMANO_BLOQUE = 50_000     # caracteres por tarea en paralelo, cortados en límite de párrafo
+
+PATRON_PARRAFOS = re.compile(r'\n\s*\n')
+PATRON_FRASES = re.compile(r'\S.*?(?:[.!?…]+(?=\s|\Z)|\Z)', re.DOTALL)
+
+_memo = OrderedDict()
+_lock = threading.Lock()
+_pool = None
+
+
+# --- Modelo ---
+
+@lru_cache(maxsize=None)
+def cargar_punkt(idioma=IDIOMA):
+    """Tokenizador Punkt del idioma, o None si no está disponible"""
+    try:
+        import nltk
+    except ImportError:
+        return None
+    try:
+        from nltk.tokenize import PunktTokenizer  # NLTK ≥ 3.8.2 (punkt_tab)
+        return PunktTokenizer(idioma)
+    except (ImportError, LookupError, OSError):
+        pass
+    try:
+        return nltk.data.load(f'tokenizers/punkt/{idioma}.pickle')
+    except Exception:
+        # LookupError si falta; las versiones recientes rechazan además los pickle
+        return None
+
+
+def descargar_modelo(idioma=IDIOMA):
+    """Descarga el modelo Punkt si falta; devuelve True si queda disponible"""
+    if cargar_punkt(idioma) is not None:
+        return True
+    try:
+        import nltk
+    except ImportError:
+        return False
+    print("Descargando el modelo Punkt de NLTK...")
+    for paquete in ('punkt_tab', 'punkt'):
+        nltk.download(paquete, quiet=True)
+    cargar_punkt.cache_clear()
+    with _lock:
+        _memo.clear()
+    return cargar_punkt(idioma) is not None
+
+
+# --- Segmentación ---
+
+def _parrafos(texto):
+    inicio = 0
+    for m in PATRON_PARRAFOS.finditer(texto):
+        yield inicio, m.start()
+        inicio = m.end()
+    yield inicio, len(texto)
+
+
+def _spans_puntuacion(parrafo):
+    for m in PATRON_FRASES.finditer(parrafo):
+        yield m.start(), m.start() + len(m.group().rstrip())
+
+
+def _segmentar_bloque(texto, desplazamiento=0):
+    tokenizador = cargar_punkt()
+    spans = []
+    for a, b in _parrafos(texto):
+        parrafo = texto[a:b]
+        if not parrafo.strip():
+            continue
+        partes = tokenizador.span_tokenize(parrafo) if tokenizador is not None else _spans_puntuacion(parrafo)
+        spans.extend((desplazamiento + a + i, desplazamiento + a + j) for i, j in partes)
+    return spans
+
+
+def _bloques(texto, tamano=TAMANO_BLOQUE):
+    """(inicio, fin) de bloques de unos `tamano` caracteres que terminan en un límite de párrafo"""
+    inicio = 0
+    while inicio < len(texto):
+        corte = PATRON_PARRAFOS.search(texto, inicio + tamano)
+        if corte is None:
+            yield inicio, len(texto)
+            return
+        yield inicio, corte.start()
+        inicio = corte.end()
+
+
+def _pool_procesos():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+        return _pool
+
+
+def _descartar_pool(pool):
+    """Cierra un pool roto y lo retira, salvo que otro hilo ya lo haya sustituido"""
+    global _pool
+    pool.shutdown(wait=False, cancel_futures=True)
+    with _lock:
+        if _pool is pool:
+            _pool = None
+
+
+def segmentar(texto, memo=True):
+    """Desplazamientos (inicio, fin) de cada frase de `texto`, en orden"""
+    clave = hashlib.sha1(texto.encode('utf-8', 'surrogatepass')).digest()
+    if memo:
+        with _lock:
+            if clave in _memo:
+                _memo.move_to_end(clave)
+                return _memo[clave]
+
+    with perfilado.etapa('segmentacion') as etapa:
+        spans = None
+        # El corte por puntuación es una expresión regular: solo Punkt compensa repartirlo
+        if len(texto) >= MIN_PARALELO and (os.cpu_count() or 1) > 1 and cargar_punkt() is not None:
+            bloques = list(_bloques(texto))
+            pool = None
+            try:
+                pool = _pool_procesos()
+                partes = pool.map(_segmentar_bloque, [texto[a:b] for a, b in bloques], [a for a, _ in bloques])
+                spans = tuple(s for parte in partes for s in parte)
+            except (OSError, RuntimeError):
+                # Sin procesos disponibles (p. ej. en un entorno restringido) o pool roto
+                # (BrokenProcessPool): en este proceso; el siguiente texto grande crea otro pool
+                if pool is not None:
+                    _descartar_pool(pool)
+                spans = None
+        if spans is None:
+            spans = tuple(_segmentar_bloque(texto))
+        etapa.items = len(spans)
+
+    if memo:
+        with _lock:
+            _memo[clave] = spans
+            while len(_memo) > MAX_MEMO:
+                _memo.popitem(last=False)
+    return spans
+
+
+def frases(texto, min_palabras=0):
+    """Las frases como cadenas, opcionalmente solo las de al menos min_palabras palabras"""
+    resultado = (texto[a:b] for a, b in segmentar(texto))
+    if min_palabras:
+        return [f for f in resultado if len(f.split()) >= min_palabras]
+    return list(resultado)
+
+
+# --- Trozos para los modelos ---
+
+def trozos(frases, tokenizador, max_tokens=512):
+    """
+    Agrupa frases consecutivas en trozos que caben en max_tokens tokens del
+    modelo (contando los dos especiales). Basta un tokenizador con encode().
+    """
+    resultado = []
+    actual = ""
+    for frase in frases:
+        prueba = actual + " " + frase if actual else frase
+        if len(tokenizador.encode(prueba, truncation=False)) <= max_tokens - 2:
+            actual = prueba
+        else:
+            if actual:
+                resultado.append(actual)
+            actual = frase
+    if actual:
+        resultado.append(actual)
+    return resultado
+
+
+def main():
+    import argparse
+    import json
+    import time
+
+    parser = argparse.ArgumentParser(description='Segmenta un texto en frases (Punkt para español).')
+    parser.add_argument('archivo', help='Archivo .txt')
+    parser.add_argument('--json', action='store_true', help='Escribe los desplazamientos [inicio, fin] en JSON')
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    with open(args.archivo, 'r', encoding='utf-8') as f:
+        texto = f.read()
+    inicio = time.perf_counter()
+    spans = segmentar(texto)
+    duracion = time.perf_counter() - inicio
+
+    if args.json:
+        json.dump([list(s) for s in spans], sys.stdout)
+        print()
+    else:
+        modelo = 'Punkt' if cargar_punkt() is not None else 'puntuación (sin modelo Punkt)'
+        print(f"✓ {len(spans)} frases en {duracion * 1000:.1f} ms ({modelo})")
+
+
+if __name__ == "__main__":
+    main()
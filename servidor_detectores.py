@@ -0,0 +1,390 @@
+#!/usr/bin/env python3
+"""
+Servidor local que mantiene cargados los detectores de IA
+
+Cada modelo corre en un proceso trabajador de su propio entorno
+(python -m detectores.trabajador) que carga el modelo una sola vez. Los
+textos de peticiones concurrentes se agrupan en lotes compartidos: un lote
+sale en cuanto reúne MAX_LOTE textos o cuando vence el plazo
+ESPERA_LOTE_MS desde que llegó el primero.
+
+Endpoints (JSON, solo en localhost):
+    POST /analizar-frases     {"frases": [...]} o {"texto": ..., "min_palabras": 5}, "modelos": [...]
+    POST /analizar-documento  {"texto": ..., "modelos": [...]}, en trozos de ≤ 512 tokens
+    GET  /metricas            profundidad de cola, lotes, rendimiento y latencias
+    GET  /salud
+
+micro_analyzer.py y local_checker_final_working_version.py lo usan si
+está en marcha; si no, lanzan los modelos como antes.
+
+Uso:
+    python servidor_detectores.py --modelos desklib superannotate
+"""
+
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FuturoVencido
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import perfilado
+import segmentacion
+import detectores
+from detectores import MODELOS, PYTHON_MODELOS
+
+HOST = "127.0.0.1"
+PUERTO = int(os.getenv("DETECTORES_PUERTO") or 8765)
+URL_SERVIDOR = os.getenv("DETECTORES_URL") or f"http://{HOST}:{PUERTO}"
+MAX_LOTE = 32
+ESPERA_LOTE_MS = 20
+TIMEOUT_CLIENTE = 600
+TIMEOUT_PUNTUACION = 540   # espera máxima por las puntuaciones de una petición; menor que la del cliente
+TIMEOUT_SALUD = 0.5
+MAX_LATENCIAS = 1000   # peticiones recientes para los percentiles
+TOKENIZADOR_TROZOS = "openai-community/roberta-base-openai-detector"  # el de perform_full_analysis
+MAX_TOKENS_TROZO = 512
+
+
+# --- Procesos de los modelos ---
+
+class Trabajador:
+    """Un detector cargado en un subproceso de su entorno; lo usa un solo hilo"""
+
+    def __init__(self, nombre, python=None):
+        self.nombre = nombre
+        self.python = python or PYTHON_MODELOS[nombre]
+        self.proceso = None
+        self.carga_s = None
+
+    def iniciar(self):
+        self.proceso = subprocess.Popen(
+            detectores.comando('trabajador', self.nombre, self.python),
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True, encoding='utf-8', env=detectores.entorno()
+        )
+        respuesta = self._leer()
+        if 'error' in respuesta:
+            self.cerrar()
+            raise RuntimeError(respuesta['error'])
+        self.carga_s = respuesta.get('carga_s')
+
+    def _leer(self):
+        linea = self.proceso.stdout.readline()
+        if not linea:
+            codigo = self.proceso.wait()
+            self.proceso = None
+            raise RuntimeError(f"el proceso de {self.nombre} terminó (código {codigo})")
+        return json.loads(linea)
+
+    def puntuar(self, textos):
+        if self.proceso is None or self.proceso.poll() is not None:
+            self.iniciar()
+        self.proceso.stdin.write(json.dumps({'textos': textos}) + "\n")
+        self.proceso.stdin.flush()
+        respuesta = self._leer()
+        if 'error' in respuesta:
+            raise RuntimeError(respuesta['error'])
+        return respuesta['puntuaciones']
+
+    def cerrar(self):
+        if self.proceso is not None:
+            self.proceso.stdin.close()
+            try:
+                self.proceso.wait(timeout=5)
+            except subprocess.TimeoutExpired:
+                self.proceso.kill()
+            self.proceso = None
+
+
+class Lotes:
+    """
+    Cola de textos de un modelo; un hilo la vacía en lotes de como máximo
+    max_lote textos, esperando hasta espera_s a que se llene cada uno
+    """
+
+    def __init__(self, trabajador, max_lote=MAX_LOTE, espera_s=ESPERA_LOTE_MS / 1000):
+        self.trabajador = trabajador
+        self.max_lote = max_lote
+        self.espera_s = espera_s
+        self.cola = queue.Queue()
+        self.cola_max = 0
+        self.lotes = 0
+        self.textos = 0
+        self.forward_s = 0.0
+        self.error = None
+        threading.Thread(target=self._bucle, name=f"lotes-{trabajador.nombre}", daemon=True).start()
+
+    def encolar(self, textos):
+        futuros = []
+        for texto in textos:
+            futuro = Future()
+            self.cola.put((texto, futuro))
+            futuros.append(futuro)
+        self.cola_max = max(self.cola_max, self.cola.qsize())
+        return futuros
+
+    def _bucle(self):
+        # El modelo se carga al arrancar, no con la primera petición
+        try:
+            self.trabajador.iniciar()
+            print(f"✓ {self.trabajador.nombre} cargado en {self.trabajador.carga_s} s")
+        except Exception as e:
+            self.error = str(e)
+            print(f"✗ {self.trabajador.nombre}: {e}", file=sys.stderr)
+
+        while True:
+            lote = [self.cola.get()]
+            limite = time.monotonic() + self.espera_s
+            while len(lote) < self.max_lote:
+                restante = limite - time.monotonic()
+                try:
+                    lote.append(self.cola.get(timeout=restante) if restante > 0 else self.cola.get_nowait())
+                except queue.Empty:
+                    break
+            self._procesar(lote)
+
+    def _procesar(self, lote):
+        inicio = time.perf_counter()
+        try:
+            with perfilado.etapa('lote', modelo=self.trabajador.nombre) as etapa:
+                etapa.items = len(lote)
+                puntuaciones = self.trabajador.puntuar([texto for texto, _ in lote])
+            if len(puntuaciones) != len(lote):
+                raise RuntimeError(f"{self.trabajador.nombre} devolvió {len(puntuaciones)} puntuaciones para {len(lote)} textos")
+            self.error = None
+        except Exception as e:
+            self.error = str(e)
+            for _, futuro in lote:
+                futuro.set_exception(e)
+            return
+        finally:
+            self.lotes += 1
+            self.textos += len(lote)
+            self.forward_s += time.perf_counter() - inicio
+        for (_, futuro), puntuacion in zip(lote, puntuaciones):
+            futuro.set_result(puntuacion)
+
+    def metricas(self):
+        return {
+            'cola': self.cola.qsize(),
+            'cola_max': self.cola_max,
+            'lotes': self.lotes,
+            'textos': self.textos,
+            'tamano_medio_lote': round(self.textos / self.lotes, 2) if self.lotes else None,
+            'textos_por_s': round(self.textos / self.forward_s, 1) if self.forward_s else None,
+            'carga_s': self.trabajador.carga_s,
+            'error': self.error,
+        }
+
+
+# --- Servicio ---
+
+class ServidorDetectores:
+
+    def __init__(self, modelos=tuple(MODELOS), max_lote=MAX_LOTE, espera_ms=ESPERA_LOTE_MS):
+        self.lotes = {m: Lotes(Trabajador(m), max_lote, espera_ms / 1000) for m in modelos}
+        self.inicio = time.monotonic()
+        self.peticiones = 0
+        self.en_curso = 0
+        self.latencias = deque(maxlen=MAX_LATENCIAS)
+        self._lock = threading.Lock()
+        self._tokenizador = None
+
+    def _modelos(self, pedidos):
+        pedidos = list(pedidos or self.lotes)
+        desconocidos = [m for m in pedidos if m not in self.lotes]
+        if desconocidos:
+            raise ValueError(f"modelos no disponibles: {', '.join(desconocidos)}")
+        return pedidos
+
+    def puntuar(self, textos, modelos):
+        """Encola los textos en todos los modelos a la vez; un modelo que falla puntúa -1"""
+        futuros = {m: self.lotes[m].encolar(textos) for m in modelos}
+        limite = time.monotonic() + TIMEOUT_PUNTUACION
+        puntuaciones, errores = {}, {}
+        for modelo, pendientes in futuros.items():
+            try:
+                # Un trabajador atascado hace fallar la petición en vez de colgarla
+                puntuaciones[modelo] = [f.result(timeout=max(0.0, limite - time.monotonic())) for f in pendientes]
+            except FuturoVencido:
+                puntuaciones[modelo] = [-1.0] * len(textos)
+                errores[modelo] = f"sin respuesta del modelo en {TIMEOUT_PUNTUACION} s"
+            except Exception as e:
+                puntuaciones[modelo] = [-1.0] * len(textos)
+                errores[modelo] = str(e)
+        return puntuaciones, errores
+
+    def frases(self, texto, min_palabras=0):
+        return segmentacion.frases(texto, min_palabras)
+
+    def trozos(self, texto):
+        with self._lock:
+            if self._tokenizador is None:
+                from transformers import AutoTokenizer
+                self._tokenizador = AutoTokenizer.from_pretrained(TOKENIZADOR_TROZOS)
+        return segmentacion.trozos(self.frases(texto), self._tokenizador, MAX_TOKENS_TROZO)
+
+    def analizar_frases(self, datos):
+        modelos = self._modelos(datos.get('modelos'))
+        frases = datos['frases'] if 'frases' in datos else self.frases(datos['texto'], datos.get('min_palabras', 0))
+        puntuaciones, errores = self.puntuar(frases, modelos)
+        return {'frases': frases, 'puntuaciones': puntuaciones, 'errores': errores}
+
+    def analizar_documento(self, datos):
+        modelos = self._modelos(datos.get('modelos'))
+        trozos = self.trozos(datos['texto'])
+        puntuaciones, errores = self.puntuar(trozos, modelos)
+        return {'trozos': trozos, 'puntuaciones': puntuaciones, 'errores': errores}
+
+    def atender(self, funcion, datos):
+        with self._lock:
+            self.peticiones += 1
+            self.en_curso += 1
+        inicio = time.perf_counter()
+        try:
+            return funcion(datos)
+        finally:
+            with self._lock:
+                self.en_curso -= 1
+                self.latencias.append(time.perf_counter() - inicio)
+
+    def metricas(self):
+        activo = time.monotonic() - self.inicio
+        latencias = sorted(self.latencias)
+        percentil = lambda p: round(latencias[min(len(latencias) - 1, int(len(latencias) * p))] * 1000, 1) if latencias else None
+        textos = sum(l.textos for l in self.lotes.values())
+        return {
+            'activo_s': round(activo, 1),
+            'peticiones': self.peticiones,
+            'en_curso': self.en_curso,
+            'latencia_p50_ms': percentil(0.5),
+            'latencia_p95_ms': percentil(0.95),
+            'textos_por_s': round(textos / activo, 2) if activo else None,
+            'modelos': {m: l.metricas() for m, l in self.lotes.items()},
+        }
+
+    def cerrar(self):
+        for lotes in self.lotes.values():
+            lotes.trabajador.cerrar()
+
+
+def crear_manejador(servicio):
+
+    class Manejador(BaseHTTPRequestHandler):
+        RUTAS_POST = {
+            '/analizar-frases': servicio.analizar_frases,
+            '/analizar-documento': servicio.analizar_documento,
+        }
+
+        def _responder(self, codigo, datos):
+            cuerpo = json.dumps(datos, ensure_ascii=False).encode('utf-8')
+            self.send_response(codigo)
+            self.send_header('Content-Type', 'application/json; charset=utf-8')
+            self.send_header('Content-Length', str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def do_GET(self):
+            if self.path == '/salud':
+                self._responder(200, {'ok': True, 'modelos': list(servicio.lotes)})
+            elif self.path == '/metricas':
+                self._responder(200, servicio.metricas())
+            else:
+                self._responder(404, {'error': f"ruta desconocida: {self.path}"})
+
+        def do_POST(self):
+            funcion = self.RUTAS_POST.get(self.path)
+            if funcion is None:
+                self._responder(404, {'error': f"ruta desconocida: {self.path}"})
+                return
+            try:
+                datos = json.loads(self.rfile.read(int(self.headers.get('Content-Length') or 0)) or b'{}')
+                self._responder(200, servicio.atender(funcion, datos))
+            except (ValueError, KeyError, TypeError) as e:
+                self._responder(400, {'error': f"{type(e).__name__}: {e}"})
+            except Exception as e:
+                self._responder(500, {'error': f"{type(e).__name__}: {e}"})
+
+        def log_message(self, formato, *args):
+            pass
+
+    return Manejador
+
+
+# --- Cliente ---
+
+def activo(url=URL_SERVIDOR, modelos=None):
+    """
+    True si el servidor responde y sirve todos los `modelos` pedidos; las CLI
+    lo consultan antes de lanzar los modelos ellas mismas
+    """
+    try:
+        with urllib.request.urlopen(url.rstrip('/') + '/salud', timeout=TIMEOUT_SALUD) as respuesta:
+            salud = json.load(respuesta)
+    except (urllib.error.URLError, OSError, ValueError):
+        return False
+    return bool(salud.get('ok')) and set(modelos or ()).issubset(salud.get('modelos', ()))
+
+
+def _post(ruta, datos, url):
+    peticion = urllib.request.Request(url.rstrip('/') + ruta, data=json.dumps(datos).encode('utf-8'),
+                                      headers={'Content-Type': 'application/json'}, method='POST')
+    with urllib.request.urlopen(peticion, timeout=TIMEOUT_CLIENTE) as respuesta:
+        return json.load(respuesta)
+
+
+def analizar_frases(frases=None, texto=None, modelos=None, min_palabras=0, url=URL_SERVIDOR):
+    """
+    Puntúa frases ya segmentadas, o segmenta `texto` en el servidor
+
+    Returns:
+        {'frases': [...], 'puntuaciones': {modelo: [...]}, 'errores': {modelo: mensaje}}
+    """
+    datos = {'frases': frases} if frases is not None else {'texto': texto, 'min_palabras': min_palabras}
+    if modelos:
+        datos['modelos'] = list(modelos)
+    return _post('/analizar-frases', datos, url)
+
+
+def analizar_documento(texto, modelos=None, url=URL_SERVIDOR):
+    """Trocea el texto en fragmentos de ≤ 512 tokens y los puntúa: {'trozos', 'puntuaciones', 'errores'}"""
+    datos = {'texto': texto}
+    if modelos:
+        datos['modelos'] = list(modelos)
+    return _post('/analizar-documento', datos, url)
+
+
+def main():
+    import argparse
+
+    parser = argparse.ArgumentParser(description='Servidor local que mantiene cargados los detectores de IA y agrupa sus peticiones en lotes.')
+    parser.add_argument('--host', default=HOST)
+    parser.add_argument('--puerto', type=int, default=PUERTO)
+    parser.add_argument('--modelos', nargs='+', choices=sorted(MODELOS), default=list(MODELOS))
+    parser.add_argument('--max-lote', type=int, default=MAX_LOTE, help='Textos por forward como máximo')
+    parser.add_argument('--espera-ms', type=float, default=ESPERA_LOTE_MS, help='Plazo para llenar un lote desde el primer texto')
+    perfilado.agregar_argumentos(parser)
+    args = parser.parse_args()
+    perfilado.activar_desde_args(args)
+
+    servicio = ServidorDetectores(args.modelos, args.max_lote, args.espera_ms)
+    servidor = ThreadingHTTPServer((args.host, args.puerto), crear_manejador(servicio))
+    servidor.daemon_threads = True
+    print(f"✓ Escuchando en http://{args.host}:{args.puerto} ({', '.join(args.modelos)})")
+    try:
+        servidor.serve_forever()
+    except KeyboardInterrupt:
+        print("\nDeteniendo el servidor...")
+    finally:
+        servidor.server_close()
+        servicio.cerrar()
+
+
+if __name__ == "__main__":
+    main()
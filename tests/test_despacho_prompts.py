@@ -0,0 +1,153 @@
+import json
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import despacho_prompts
+from despacho_prompts import BackendHTTP, archivos_de_prompts, despachar, leer_prompts
+
+
+class ModeloFalso:
+    """
+    Endpoint /chat/completions que responde según el prompt:
+    '429 <n> <s>' da n veces 429 con Retry-After s, '503 <n>' da n veces 503,
+    '400' siempre 400; el resto responde 'eco: <prompt>' tras `demora` segundos
+    """
+
+    def __init__(self, demora=0.0):
+        self.demora = demora
+        self.intentos = Counter()
+        self.en_vuelo = 0
+        self.max_en_vuelo = 0
+        self.lock = threading.Lock()
+
+    def responder(self, prompt):
+        with self.lock:
+            self.intentos[prompt] += 1
+            intento = self.intentos[prompt]
+            self.en_vuelo += 1
+            self.max_en_vuelo = max(self.max_en_vuelo, self.en_vuelo)
+        try:
+            time.sleep(self.demora)
+            partes = prompt.split()
+            if partes[0] == '429' and intento <= int(partes[1]):
+                return 429, {'Retry-After': partes[2]}, {'error': 'rate limit'}
+            if partes[0] == '503' and intento <= int(partes[1]):
+                return 503, {}, {'error': 'no disponible'}
+            if partes[0] == '400':
+                return 400, {}, {'error': 'petición inválida'}
+            return 200, {}, {'choices': [{'message': {'content': f'eco: {prompt}'}}]}
+        finally:
+            with self.lock:
+                self.en_vuelo -= 1
+
+
+@pytest.fixture
+def modelo():
+    falso = ModeloFalso()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_POST(self):
+            datos = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+            estado, cabeceras, cuerpo = falso.responder(datos['messages'][0]['content'])
+            contenido = json.dumps(cuerpo).encode()
+            self.send_response(estado)
+            for clave, valor in cabeceras.items():
+                self.send_header(clave, valor)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(contenido)))
+            self.end_headers()
+            self.wfile.write(contenido)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    falso.url = f"http://127.0.0.1:{servidor.server_address[1]}/v1"
+    yield falso
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture(autouse=True)
+def espera_corta(monkeypatch):
+    # El backoff exponencial sin Retry-After no debe alargar las pruebas
+    monkeypatch.setattr(despacho_prompts, 'ESPERA_BASE', 0.01)
+
+
+def leer_metricas(carpeta):
+    with open(carpeta / 'metricas.json', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_max_en_vuelo_acota_las_peticiones_abiertas(modelo, tmp_path):
+    modelo.demora = 0.1
+    trabajos = ((f'p{i}.txt', f'prompt {i}') for i in range(12))
+    metricas = despachar(trabajos, BackendHTTP(modelo.url), tmp_path, max_en_vuelo=3)
+
+    assert modelo.max_en_vuelo == 3
+    assert len(metricas) == 12 and all(m['ok'] for m in metricas)
+    assert (tmp_path / '0008_p7.respuesta.txt').read_text(encoding='utf-8') == 'eco: prompt 7'
+
+
+def test_429_respeta_retry_after(modelo, tmp_path):
+    inicio = time.perf_counter()
+    metricas = despachar([('lento.txt', '429 2 0.3')], BackendHTTP(modelo.url), tmp_path)
+
+    assert time.perf_counter() - inicio >= 0.6
+    assert modelo.intentos['429 2 0.3'] == 3
+    assert metricas[0]['ok']
+    assert (tmp_path / '0001_lento.respuesta.txt').read_text(encoding='utf-8') == 'eco: 429 2 0.3'
+
+
+def test_5xx_se_reintenta_hasta_el_maximo(modelo, tmp_path):
+    backend = BackendHTTP(modelo.url, max_reintentos=2)
+    metricas = despachar([('recupera.txt', '503 2'), ('cae.txt', '503 5')], backend, tmp_path)
+
+    resultado = {m['prompt']: m for m in metricas}
+    assert resultado['recupera.txt']['ok']
+    assert modelo.intentos['503 2'] == 3
+    assert not resultado['cae.txt']['ok']
+    assert '503' in resultado['cae.txt']['error']
+    assert modelo.intentos['503 5'] == 3   # el intento inicial y 2 reintentos
+
+
+def test_metricas_json_cuenta_exitos_y_fallos(modelo, tmp_path):
+    trabajos = [('a.txt', 'hola'), ('b.txt', '400'), ('c.txt', '503 1'), ('d.txt', 'adiós')]
+    despachar(trabajos, BackendHTTP(modelo.url), tmp_path, max_en_vuelo=2)
+
+    resumen = leer_metricas(tmp_path)
+    assert resumen['backend'] == 'http'
+    assert resumen['total'] == 4
+    assert resumen['fallidos'] == 1
+    assert resumen['max_en_vuelo'] == 2
+    assert resumen['p50_ms'] is not None
+    por_prompt = {m['prompt']: m for m in resumen['prompts']}
+    assert set(por_prompt) == {'a.txt', 'b.txt', 'c.txt', 'd.txt'}
+    assert not por_prompt['b.txt']['ok'] and '400' in por_prompt['b.txt']['error']
+    assert modelo.intentos['400'] == 1     # un 400 no se reintenta
+    assert por_prompt['c.txt']['ok']
+    assert por_prompt['a.txt']['respuesta'].endswith('0001_a.respuesta.txt')
+
+
+def test_cola_txt_y_nombres_repetidos(modelo, tmp_path):
+    for carpeta, texto in (('a', 'primero'), ('b', 'segundo')):
+        (tmp_path / carpeta).mkdir()
+        (tmp_path / carpeta / 'p.txt').write_text(texto, encoding='utf-8')
+    cola = tmp_path / 'cola.txt'
+    cola.write_text(f"{tmp_path / 'a' / 'p.txt'}\n\n{tmp_path / 'b' / 'p.txt'}\n", encoding='utf-8')
+
+    # Sin --cola un .txt es un prompt; con --cola, una ruta por línea
+    assert list(archivos_de_prompts(str(cola))) == [cola]
+    archivos = list(archivos_de_prompts(str(cola), cola=True))
+    assert archivos == [tmp_path / 'a' / 'p.txt', tmp_path / 'b' / 'p.txt']
+
+    salida = tmp_path / 'respuestas'
+    metricas = despachar(leer_prompts(archivos), BackendHTTP(modelo.url), salida)
+    assert all(m['ok'] for m in metricas)
+    assert (salida / '0001_p.respuesta.txt').read_text(encoding='utf-8') == 'eco: primero'
+    assert (salida / '0002_p.respuesta.txt').read_text(encoding='utf-8') == 'eco: segundo'
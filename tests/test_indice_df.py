@@ -0,0 +1,49 @@
+import math
+
+import pytest
+
+from anti_plagio_optimizer import AntiPlagioOptimizer
+from indice_df import IndiceDF, construir_indice, tokenizar
+
+CORPUS = {
+    'a.txt': "La metodología cualitativa se apoya en entrevistas.",
+    'b.md': "Las entrevistas y la metodología del estudio.",
+    'c.txt': "Metodología general.",
+    'sub/d.txt': "Otra metodología distinta.",
+    'ignorado.pdf': "entrevistas entrevistas",
+}
+
+
+@pytest.fixture
+def indice(tmp_path):
+    for nombre, texto in CORPUS.items():
+        ruta = tmp_path / 'corpus' / nombre
+        ruta.parent.mkdir(parents=True, exist_ok=True)
+        ruta.write_text(texto, encoding='utf-8')
+    ruta_indice = tmp_path / 'indice.sqlite'
+    assert construir_indice(tmp_path / 'corpus', ruta_indice)[0] == 4
+    indice = IndiceDF(ruta_indice)
+    yield indice
+    indice.cerrar()
+
+
+def test_tokenizar_quita_stopwords_y_numeros():
+    assert tokenizar("La Metodología de 2024 y las entrevistas") == ['metodología', 'entrevistas']
+
+
+def test_frecuencias_e_idf(indice):
+    assert indice.n_documentos == 4
+    assert indice.frecuencias(['metodología', 'entrevistas', 'cualitativa', 'muestreo']) == {
+        'metodología': 4, 'entrevistas': 2, 'cualitativa': 1, 'muestreo': 0}
+    idf = indice.idf(['metodología', 'muestreo'])
+    assert idf['metodología'] == pytest.approx(1.0)
+    assert idf['muestreo'] == pytest.approx(math.log(5) + 1)
+
+
+def test_ecuaciones_por_ranking_tf_idf(indice):
+    frases = ["El muestreo, la metodología cualitativa y las entrevistas con entrevistas.", "Sí."]
+    optimizador = AntiPlagioOptimizer(" ".join(frases), indice)
+    # tf·idf: entrevistas 2·1.51 > muestreo 2.61 > cualitativa 1.92 > metodología 1.0
+    assert optimizador.generar_ecuaciones_documento(frases, k=2, k_contexto=1) == [
+        "(entrevistas OR muestreo) AND (cualitativa)", ""]
+    assert optimizador.generar_ecuacion_busqueda(frases[0]) == "(entrevistas OR muestreo) AND (cualitativa)"
@@ -0,0 +1,126 @@
+import io
+import zipfile
+
+import pytest
+
+from pipeline_escritura import CacheArtefactos, Etapa, Pipeline, contenido_apa7, etapa_docx
+
+CONFIG = {'metadatos': {'date': '1 de Enero de 2025'}}
+
+
+def documento_xml(docx_bytes):
+    with zipfile.ZipFile(io.BytesIO(docx_bytes)) as z:
+        return z.read('word/document.xml').decode('utf-8')
+
+
+def test_texto_sin_titulos_llega_al_documento():
+    texto = "Primer párrafo del trabajo sin títulos.\nSegundo párrafo con más texto."
+    xml = documento_xml(etapa_docx(CONFIG, texto))
+    assert "Primer párrafo del trabajo sin títulos." in xml
+    assert "Segundo párrafo con más texto." in xml
+
+
+def test_texto_con_secciones_se_respeta():
+    texto = "## Introducción\nTexto de la introducción.\n## Desarrollo\nTexto del desarrollo."
+    assert contenido_apa7(texto) == texto
+    xml = documento_xml(etapa_docx(CONFIG, texto))
+    assert "Texto de la introducción." in xml
+    assert "Texto del desarrollo." in xml
+
+
+def test_texto_sin_parrafos_falla():
+    with pytest.raises(ValueError):
+        contenido_apa7("## Introducción\n\n")
+
+
+# --- Grafo de etapas ---
+
+def etapas_de_prueba(llamadas, fallar=()):
+    """leer -> mayusculas -> contar, y resumen con 'modelo' opcional (un detector simulado)"""
+    def registrar(nombre, funcion):
+        def etapa(config, **entradas):
+            llamadas.append(nombre)
+            if nombre in fallar:
+                raise RuntimeError(f"{nombre} roto")
+            return funcion(config, **entradas)
+        return etapa
+
+    return [
+        Etapa('leer', registrar('leer', lambda c, entrada: open(entrada, encoding='utf-8').read()), ['entrada']),
+        Etapa('mayusculas', registrar('mayusculas', lambda c, leer: leer.upper() if c.get('mayus', True) else leer),
+              ['leer'], config=('mayus',)),
+        Etapa('contar', registrar('contar', lambda c, mayusculas: len(mayusculas.split())), ['mayusculas']),
+        Etapa('modelo', registrar('modelo', lambda c, leer: 50.0), ['leer'], modelo=True),
+        Etapa('resumen', registrar('resumen', lambda c, contar, modelo=None: {'palabras': contar, 'ia': modelo,
+                                                                              'sufijo': c.get('sufijo')}),
+              ['contar'], ['modelo'], config=('sufijo',)),
+    ]
+
+
+@pytest.fixture
+def entrada(tmp_path):
+    ruta = tmp_path / 'trabajo.txt'
+    ruta.write_text("uno dos tres", encoding='utf-8')
+    return ruta
+
+
+def ejecutar(llamadas, entrada, cache, config=None, fallar=(), **kwargs):
+    pipeline = Pipeline(etapas_de_prueba(llamadas, fallar), cache=cache, max_paralelo=2)
+    return pipeline.ejecutar(str(entrada), config, objetivos=('resumen',), **kwargs)
+
+
+def test_pipeline_ejecuta_en_orden_y_luego_usa_la_cache(entrada, tmp_path):
+    cache, llamadas = CacheArtefactos(tmp_path / 'cache'), []
+    artefactos, estado = ejecutar(llamadas, entrada, cache)
+    assert set(estado.values()) == {'ejecutada'} and len(estado) == 5
+    assert llamadas.index('leer') < llamadas.index('mayusculas') < llamadas.index('contar') < llamadas.index('resumen')
+    assert artefactos['resumen'] == {'palabras': 3, 'ia': 50.0, 'sufijo': None}
+
+    llamadas.clear()
+    artefactos, estado = ejecutar(llamadas, entrada, cache)
+    assert set(estado.values()) == {'cache'}
+    assert llamadas == []
+    assert artefactos['resumen']['palabras'] == 3
+
+
+def test_pipeline_solo_repite_las_etapas_afectadas(entrada, tmp_path):
+    cache, llamadas = CacheArtefactos(tmp_path / 'cache'), []
+    ejecutar(llamadas, entrada, cache)
+
+    # Configuración que solo lee la última etapa
+    llamadas.clear()
+    _, estado = ejecutar(llamadas, entrada, cache, {'sufijo': 'x'})
+    assert llamadas == ['resumen']
+    assert estado['resumen'] == 'ejecutada' and estado['contar'] == 'cache'
+
+    # Cambia un artefacto intermedio: se repite lo que depende de él, y se corta
+    # la propagación donde el resultado no cambia (contar sigue dando 3)
+    llamadas.clear()
+    _, estado = ejecutar(llamadas, entrada, cache, {'sufijo': 'x', 'mayus': False})
+    assert llamadas == ['mayusculas', 'contar']
+    assert estado['leer'] == estado['modelo'] == estado['resumen'] == 'cache'
+
+    # Cambia la entrada: se repite todo
+    llamadas.clear()
+    entrada.write_text("uno dos tres cuatro", encoding='utf-8')
+    artefactos, estado = ejecutar(llamadas, entrada, cache, {'sufijo': 'x'})
+    assert set(estado.values()) == {'ejecutada'}
+    assert artefactos['resumen']['palabras'] == 4
+
+
+def test_pipeline_propaga_fallos_y_omisiones(entrada, tmp_path):
+    cache, llamadas = CacheArtefactos(tmp_path / 'cache'), []
+    artefactos, estado = ejecutar(llamadas, entrada, cache, fallar=('mayusculas',))
+    assert estado['mayusculas'] == 'fallida: mayusculas roto'
+    assert estado['contar'] == 'omitida: falta mayusculas'
+    assert estado['resumen'] == 'omitida: falta contar'
+    assert estado['modelo'] == 'ejecutada'
+    assert 'resumen' not in artefactos
+
+    # Una dependencia opcional omitida llega como None; el fallo anterior no quedó en caché
+    llamadas.clear()
+    artefactos, estado = ejecutar(llamadas, entrada, cache, sin_modelos=True)
+    assert estado['modelo'] == 'omitida'
+    assert estado['mayusculas'] == 'ejecutada' and estado['leer'] == 'cache'
+    assert 'modelo' not in llamadas
+    assert artefactos['resumen'] == {'palabras': 3, 'ia': None, 'sufijo': None}
@@ -0,0 +1,52 @@
+import threading
+
+import servidor_detectores
+from servidor_detectores import Lotes, ServidorDetectores
+
+
+class TrabajadorFalso:
+    """Sustituto de Trabajador sin subproceso: puntúa con una función"""
+
+    def __init__(self, nombre, puntuar):
+        self.nombre = nombre
+        self.carga_s = 0.0
+        self._puntuar = puntuar
+
+    def iniciar(self):
+        pass
+
+    def puntuar(self, textos):
+        return self._puntuar(textos)
+
+
+def servidor_con(**puntuadores):
+    servidor = ServidorDetectores(modelos=())
+    servidor.lotes = {nombre: Lotes(TrabajadorFalso(nombre, f), espera_s=0.01) for nombre, f in puntuadores.items()}
+    return servidor
+
+
+def test_puntua_cada_texto_en_cada_modelo():
+    servidor = servidor_con(a=lambda textos: [float(len(t)) for t in textos], b=lambda textos: [1.0] * len(textos))
+    puntuaciones, errores = servidor.puntuar(['uno', 'cuatro'], ['a', 'b'])
+    assert puntuaciones == {'a': [3.0, 6.0], 'b': [1.0, 1.0]}
+    assert errores == {}
+
+
+def test_menos_puntuaciones_que_textos_falla_el_lote():
+    servidor = servidor_con(corto=lambda textos: [50.0] * (len(textos) - 1))
+    puntuaciones, errores = servidor.puntuar(['a', 'b', 'c'], ['corto'])
+    assert puntuaciones == {'corto': [-1.0, -1.0, -1.0]}
+    assert '2 puntuaciones para 3 textos' in errores['corto']
+
+
+def test_trabajador_atascado_no_cuelga_la_peticion(monkeypatch):
+    monkeypatch.setattr(servidor_detectores, 'TIMEOUT_PUNTUACION', 0.2)
+    liberar = threading.Event()
+    servidor = servidor_con(lento=lambda textos: liberar.wait() and [0.0] * len(textos),
+                            rapido=lambda textos: [9.0] * len(textos))
+    try:
+        puntuaciones, errores = servidor.puntuar(['a'], ['lento', 'rapido'])
+    finally:
+        liberar.set()
+    assert puntuaciones == {'lento': [-1.0], 'rapido': [9.0]}
+    assert list(errores) == ['lento']
@@ -0,0 +1,85 @@
+import threading
+import time
+
+import pytest
+
+import zotero_cliente
+from zotero_cliente import ClienteZotero
+
+
+class Respuesta:
+    def __init__(self, estado, cabeceras=None):
+        self.status_code = estado
+        self.headers = cabeceras or {}
+
+
+class ErrorHTTP(Exception):
+    pass
+
+
+class ClienteFalso:
+    """Sustituto de zotero.Zotero: cada llamada consume la siguiente respuesta del guion compartido"""
+
+    def __init__(self, guion, envios):
+        self.guion = guion
+        self.envios = envios
+        self.request = None
+
+    def _responder(self, metodo):
+        self.envios.append((metodo, time.monotonic()))
+        estado, cabeceras = self.guion.pop(0) if self.guion else (200, {})
+        self.request = Respuesta(estado, cabeceras) if estado else None
+        if estado is None:
+            raise ConnectionError("conexión rechazada")
+        if estado >= 400 and estado != 429:
+            raise ErrorHTTP(f"HTTP {estado}")
+        return [{'key': 'A'}]
+
+    def items(self, **kwargs):
+        return self._responder('items')
+
+    def create_items(self, items):
+        return self._responder('create_items')
+
+
+@pytest.fixture
+def cliente(monkeypatch):
+    monkeypatch.setattr(zotero_cliente, 'ESPERA_BASE', 0.01)
+    zot = ClienteZotero('1', 'user', 'clave', tam_pool=2)
+    zot.guion, zot.envios = [], []
+    zot._crear_cliente = lambda: ClienteFalso(zot.guion, zot.envios)
+    return zot
+
+
+def test_lecturas_reintentan_5xx_y_red(cliente):
+    cliente.guion.extend([(503, {}), (None, {}), (200, {})])
+    assert cliente.items() == [{'key': 'A'}]
+    assert len(cliente.envios) == 3
+    assert cliente.metricas()['items']['reintentos'] == 2
+
+
+def test_escrituras_solo_reintentan_429(cliente):
+    cliente.guion.append((503, {}))
+    with pytest.raises(ErrorHTTP):
+        cliente.create_items([{}])
+    assert len(cliente.envios) == 1
+
+    cliente.guion.extend([(429, {'Retry-After': '0.1'}), (200, {})])
+    assert cliente.create_items([{}]) == [{'key': 'A'}]
+    assert len(cliente.envios) == 3
+    assert cliente.envios[2][1] - cliente.envios[1][1] >= 0.1
+
+
+def test_backoff_de_un_cliente_pausa_todo_el_pool(cliente):
+    # El Backoff que recibe un cliente frena también a los demás clientes del pool
+    cliente.guion.append((200, {'Backoff': '0.3'}))
+    assert cliente.items(q='uno') == [{'key': 'A'}]
+    recibido = time.monotonic()
+
+    hilos = [threading.Thread(target=cliente.items, kwargs={'q': f'p{i}'}) for i in range(4)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(cliente.envios) == 5
+    assert all(momento >= recibido + 0.25 for _, momento in cliente.envios[1:])
@@ -0,0 +1,141 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+from zotero_cliente import ClienteZotero
+from zotero_espejo import EspejoZotero
+
+
+def item(key, version, titulo, padre=None, fecha='2025-01-01T00:00:00Z'):
+    data = {'key': key, 'version': version, 'title': titulo, 'dateModified': fecha}
+    if padre:
+        data['parentItem'] = padre
+    return {'key': key, 'version': version, 'data': data}
+
+
+class BibliotecaFalsa:
+    """Lo mínimo de la API de Zotero que usa el espejo: /items y /deleted"""
+
+    def __init__(self):
+        self.version = 0
+        self.items = {}
+        self.borrados = {}      # key -> versión en que se borró
+        self.peticiones = []
+
+    def guardar(self, *nuevos):
+        self.version += 1
+        for it in nuevos:
+            it['version'] = it['data']['version'] = self.version
+            self.items[it['key']] = it
+
+    def borrar(self, *keys):
+        self.version += 1
+        for key in keys:
+            del self.items[key]
+            self.borrados[key] = self.version
+
+    def responder(self, ruta, parametros):
+        self.peticiones.append((ruta, parametros))
+        desde = int(parametros.get('since', 0))
+        if ruta.endswith('/deleted'):
+            return {'items': [k for k, v in self.borrados.items() if v > desde]}, None
+        cambiados = [it for it in self.items.values() if it['version'] > desde]
+        inicio = int(parametros.get('start', 0))
+        limite = int(parametros.get('limit', 100))
+        return cambiados[inicio:inicio + limite], len(cambiados)
+
+
+@pytest.fixture
+def biblioteca():
+    falsa = BibliotecaFalsa()
+
+    class Manejador(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            parametros = {k: v[-1] for k, v in parse_qs(url.query).items()}
+            cuerpo, total = falsa.responder(url.path, parametros)
+            datos = json.dumps(cuerpo).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Last-Modified-Version', str(falsa.version))
+            if total is not None:
+                self.send_header('Total-Results', str(total))
+            self.send_header('Content-Length', str(len(datos)))
+            self.end_headers()
+            self.wfile.write(datos)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Manejador)
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    falsa.url = f"http://127.0.0.1:{servidor.server_address[1]}"
+    yield falsa
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def espejo(biblioteca, tmp_path):
+    zot = ClienteZotero('1', 'user', 'clave', endpoint=biblioteca.url)
+    espejo = EspejoZotero(zot, str(tmp_path / 'espejo.sqlite'))
+    yield espejo
+    espejo.cerrar()
+
+
+def peticiones_items(biblioteca):
+    return [p for ruta, p in biblioteca.peticiones if ruta.endswith('/items') and p.get('limit') != '1']
+
+
+def test_primera_sincronizacion_descarga_todo(biblioteca, espejo):
+    # Más de una página (ITEMS_POR_PAGINA = 100) para recorrer la paginación
+    biblioteca.guardar(*(item(f'A{i:04d}', 0, f'Obra {i}') for i in range(250)))
+    biblioteca.guardar(item('NOTA0001', 0, 'Nota', padre='A0000'))
+
+    assert espejo.sincronizar() == 251
+    assert espejo.version == biblioteca.version == 2
+    assert espejo.total() == 251
+    assert espejo.item('A0007')['data']['title'] == 'Obra 7'
+    assert set(espejo.items(['A0001', 'A0249', 'NOEXISTE'])) == {'A0001', 'A0249'}
+    top = list(espejo.top())
+    assert len(top) == 250
+    assert 'NOTA0001' not in {it['key'] for it in top}
+    assert all('since' not in p for p in peticiones_items(biblioteca))
+
+
+def test_sincronizacion_incremental_actualiza_cambios(biblioteca, espejo):
+    biblioteca.guardar(item('A', 0, 'Original'), item('B', 0, 'Sin cambios'))
+    espejo.sincronizar()
+    biblioteca.peticiones.clear()
+
+    biblioteca.guardar(item('A', 0, 'Corregido'), item('C', 0, 'Nuevo'))
+    assert espejo.sincronizar() == 2
+    assert espejo.version == biblioteca.version == 2
+    assert espejo.item('A')['data']['title'] == 'Corregido'
+    assert espejo.item('A')['version'] == 2
+    assert espejo.item('B')['data']['title'] == 'Sin cambios'
+    assert set(espejo.items(['A', 'B', 'C'])) == {'A', 'B', 'C'}
+    assert {it['key'] for it in espejo.top()} == {'A', 'B', 'C'}
+    assert [p['since'] for p in peticiones_items(biblioteca)] == ['1']
+
+    # Sin cambios remotos no se descarga nada
+    biblioteca.peticiones.clear()
+    assert espejo.sincronizar() == 0
+    assert peticiones_items(biblioteca) == []
+
+
+def test_sincronizacion_aplica_borrados(biblioteca, espejo):
+    biblioteca.guardar(item('A', 0, 'Se queda'), item('B', 0, 'Se borra'), item('C', 0, 'También'))
+    espejo.sincronizar()
+
+    biblioteca.borrar('B', 'C')
+    assert espejo.sincronizar() == 2
+    assert espejo.version == biblioteca.version == 2
+    assert espejo.item('B') is None
+    assert set(espejo.items(['A', 'B', 'C'])) == {'A'}
+    assert [it['key'] for it in espejo.top()] == ['A']
+    assert espejo.total() == 1
+    assert [p['since'] for ruta, p in biblioteca.peticiones if ruta.endswith('/deleted')] == ['1']
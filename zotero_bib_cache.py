@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Caché persistente de entradas de bibliografía ya formateadas (CSL)
+Clave: item + estilo, válida mientras la versión del item no cambie
+
+Las versiones se leen del espejo local (o de zotero.sqlite), así que solo
+se pide al servidor el formateo de las entradas nuevas o modificadas.
+"""
+
+import html
+import os
+import re
+import sqlite3
+import time
+
+RUTA_CACHE_BIB = os.getenv("ZOTERO_BIB_CACHE") or os.path.expanduser("~/.cache/pinokio-academic-pipeline/zotero_bib.sqlite")
+MAX_ENTRADAS = 5000
+MAX_CLAVES_POR_PETICION = 50  # límite de itemKey= en la API de Zotero
+
+PATRON_ENTRADA = re.compile(r'<div class="csl-entry">.*?</div>', re.DOTALL)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS bib (
+    key TEXT NOT NULL,
+    estilo TEXT NOT NULL,
+    version INTEGER NOT NULL,
+    entrada TEXT NOT NULL,
+    ultimo_uso REAL NOT NULL,
+    PRIMARY KEY (key, estilo)
+);
+CREATE INDEX IF NOT EXISTS bib_lru ON bib (ultimo_uso);
+"""
+
+
+def texto_plano(entrada):
+    """Quita las etiquetas HTML de una entrada CSL"""
+    return html.unescape(re.sub(r'<[^>]+>', '', entrada)).strip()
+
+
+class CacheBibliografia:
+
+    def __init__(self, zot, fuente, ruta_db=RUTA_CACHE_BIB, max_entradas=MAX_ENTRADAS):
+        """
+        Args:
+            zot: Cliente de la API (solo se usa para formatear entradas vencidas)
+            fuente: Espejo o ZoteroLocal del que se leen las versiones actuales
+        """
+        self.zot = zot
+        self.fuente = fuente
+        self.max_entradas = max_entradas
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.conn = sqlite3.connect(ruta_db)
+        self.conn.executescript(ESQUEMA)
+
+    def _en_cache(self, keys, estilo):
+        encontrados = {}
+        for i in range(0, len(keys), 500):
+            lote = keys[i:i + 500]
+            consulta = f"SELECT key, version, entrada FROM bib WHERE estilo = ? AND key IN ({','.join('?' * len(lote))})"
+            for key, version, entrada in self.conn.execute(consulta, [estilo, *lote]):
+                encontrados[key] = (version, entrada)
+        return encontrados
+
+    def _formatear_en_servidor(self, keys, estilo):
+        """Pide al servidor las entradas de varias claves por petición"""
+        nuevas = {}
+        for i in range(0, len(keys), MAX_CLAVES_POR_PETICION):
+            lote = keys[i:i + MAX_CLAVES_POR_PETICION]
+            for item in self.zot.items(itemKey=",".join(lote), include='bib', style=estilo, limit=len(lote)):
+                m = PATRON_ENTRADA.search(item.get('bib', ''))
+                if m:
+                    nuevas[item['key']] = (item['version'], m.group(0))
+        return nuevas
+
+    def _desalojar(self):
+        """Elimina las entradas menos usadas recientemente por encima del máximo"""
+        sobrantes = self.conn.execute("SELECT COUNT(*) FROM bib").fetchone()[0] - self.max_entradas
+        if sobrantes > 0:
+            self.conn.execute(
+                "DELETE FROM bib WHERE rowid IN (SELECT rowid FROM bib ORDER BY ultimo_uso LIMIT ?)", (sobrantes,))
+
+    def referencias(self, keys, estilo='apa'):
+        """
+        Devuelve las entradas formateadas de varias claves, en el mismo orden
+
+        Solo se piden al servidor las que faltan o cuya versión cambió;
+        None para claves que no existen en la biblioteca. Si la fuente es el
+        espejo en línea, una clave en caché que ya no está en él se borró de
+        la biblioteca: se devuelve None y se quita de la caché. Si es
+        zotero.sqlite (puede ir por detrás del servidor) se sirve de la caché.
+        """
+        keys_unicas = list(dict.fromkeys(keys))
+        versiones = {k: item['version'] for k, item in self.fuente.items(keys_unicas).items()}
+        cache = self._en_cache(keys_unicas, estilo)
+
+        borradas = {k for k in cache if k not in versiones} if self.fuente.EN_LINEA else set()
+        for k in borradas:
+            del cache[k]
+
+        # La versión guardada es la que devolvió el servidor junto con la entrada
+        vencidas = [k for k in keys_unicas if k not in borradas
+                    and (k not in cache or versiones.get(k, cache[k][0]) != cache[k][0])]
+        nuevas = self._formatear_en_servidor(vencidas, estilo) if vencidas else {}
+
+        ahora = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO bib VALUES (?, ?, ?, ?, ?)",
+                [(k, estilo, version, entrada, ahora) for k, (version, entrada) in nuevas.items()])
+            self.conn.executemany(
+                "DELETE FROM bib WHERE key = ? AND estilo = ?", [(k, estilo) for k in borradas])
+            self.conn.executemany(
+                "UPDATE bib SET ultimo_uso = ? WHERE key = ? AND estilo = ?",
+                [(ahora, k, estilo) for k in keys_unicas if k in cache and k not in nuevas])
+            self._desalojar()
+
+        entradas = {k: entrada for k, (_, entrada) in cache.items()}
+        entradas.update((k, entrada) for k, (_, entrada) in nuevas.items())
+        return [entradas.get(k) for k in keys]
+
+    def escribir_bibliografia(self, keys, archivo_salida, estilo='apa'):
+        """
+        Escribe la lista de referencias (orden alfabético) en el formato
+        HTML CSL que consume generate_apa7_doc_UNIMINUTO.py
+        """
+        entradas = [e for e in self.referencias(keys, estilo) if e]
+        entradas.sort(key=lambda e: texto_plano(e).lower())
+        with open(archivo_salida, 'w', encoding='utf-8') as f:
+            f.write("\n".join(entradas) + "\n")
+        return len(entradas)
+
+    def cerrar(self):
+        self.conn.close()
@@ -4,34 +4,71 @@ Crear citas en Zotero con número de página específico
 Compatible con Mac M4 + Gemini CLI
 """
 
-from pyzotero import zotero
+import copy
+import csv
+import json
 import os
+import re
+import sys
+import time
+
+import perfilado
+from zotero_bib_cache import CacheBibliografia
+from zotero_cliente import ClienteZotero
+from zotero_espejo import EspejoZotero, RUTA_ESPEJO, recorrer_paginas
+from zotero_local import ZoteroLocal
 
 # Credenciales
 library_id = os.getenv("ZOTERO_USER_ID") or "18642371"
 api_key = os.getenv("ZOTERO_API_KEY") or "DSNYsHOsNXAx5YRPfYGN36zM"
 library_type = 'user'
 
-# Inicializa conexión
-zot = zotero.Zotero(library_id, library_type, api_key)
+FORMATOS_EXPORTACION = ('txt', 'csv', 'ndjson')
+MAX_CLAVES_POR_PETICION = 50  # límite de itemKey= en la API de Zotero
+MAX_ITEMS_POR_ESCRITURA = 50  # límite de create_items en la API de Zotero
 
-def crear_item_con_pagina(titulo, autores, paginas, tipo="journalArticle", publicacion=""):
-    """
-    Crea item en Zotero con información de página específica
-    
-    Args:
-        titulo: Título del artículo/libro
-        autores: Lista de autores ["Apellido, Nombre", ...]
-        paginas: Número de página o rango (ej: "45", "45-47", "p. 123")
-        tipo: Tipo de item (journalArticle, book, bookSection, etc.)
-        publicacion: Nombre de la publicación
-    """
+# Cliente con pool de conexiones y reintentos; no conecta hasta la primera llamada
+zot = ClienteZotero(library_id, library_type, api_key)
+
+# Espejo local: se sincroniza una vez por ejecución y sirve todas las lecturas.
+# Con ZOTERO_SQLITE (o --zotero_sqlite) se lee directamente la base del
+# cliente de escritorio, sin red.
+_espejo = None
+
+def usar_zotero_local(ruta_db):
+    """Sirve las lecturas desde zotero.sqlite en lugar del espejo sincronizado"""
+    global _espejo
+    _espejo = ZoteroLocal(ruta_db, library_type, library_id if library_type == 'group' else None)
+    return _espejo
+
+def obtener_espejo():
+    """Devuelve el origen local de lecturas (espejo sincronizado o zotero.sqlite)"""
+    global _espejo
+    if _espejo is None:
+        if os.getenv("ZOTERO_SQLITE"):
+            return usar_zotero_local(os.getenv("ZOTERO_SQLITE"))
+        _espejo = EspejoZotero(zot, RUTA_ESPEJO)
+        _espejo.sincronizar()
+    return _espejo
+
+# Plantillas de item por tipo: se piden una sola vez por ejecución
+_plantillas = {}
+
+def plantilla_item(tipo):
+    """Devuelve una copia de la plantilla de item para el tipo dado"""
+    if tipo not in _plantillas:
+        _plantillas[tipo] = zot.item_template(tipo)
+    return copy.deepcopy(_plantillas[tipo])
+
+def construir_item(titulo, autores, paginas, tipo="journalArticle", publicacion=""):
+    """Construye el dict del item (sin crearlo) a partir de la plantilla del tipo"""
     
     # Crea estructura del item
-    template = zot.item_template(tipo)
+    template = plantilla_item(tipo)
     
     template['title'] = titulo
-    template['publicationTitle'] = publicacion
+    if 'publicationTitle' in template:
+        template['publicationTitle'] = publicacion
     
     # Añade autores
     template['creators'] = []
@@ -46,7 +83,24 @@ def crear_item_con_pagina(titulo, autores, paginas, tipo="journalArticle", publi
     
     # CRÍTICO: Añade el locator (página) en el campo "extra"
     # Este campo es flexible y acepta metadatos personalizados
-    template['extra'] = f"Cited page(s): {paginas}"
+    if paginas:
+        template['extra'] = f"Cited page(s): {paginas}"
+    
+    return template
+
+def crear_item_con_pagina(titulo, autores, paginas, tipo="journalArticle", publicacion=""):
+    """
+    Crea item en Zotero con información de página específica
+    
+    Args:
+        titulo: Título del artículo/libro
+        autores: Lista de autores ["Apellido, Nombre", ...]
+        paginas: Número de página o rango (ej: "45", "45-47", "p. 123")
+        tipo: Tipo de item (journalArticle, book, bookSection, etc.)
+        publicacion: Nombre de la publicación
+    """
+    
+    template = construir_item(titulo, autores, paginas, tipo, publicacion)
     
     # Crea el item
     resp = zot.create_items([template])
@@ -57,6 +111,51 @@ def crear_item_con_pagina(titulo, autores, paginas, tipo="journalArticle", publi
     
     return resp
 
+def _año(data):
+    """Año de publicación; la fecha puede venir libre ('mayo 2019') o ISO"""
+    m = re.search(r'\b\d{4}\b', data.get('date', ''))
+    return m.group(0) if m else "s.f."
+
+def _formatear_cita(item, paginas):
+    """Construye la cita APA en texto con el locator de página"""
+    # Nota: La API de Zotero no soporta directamente añadir locators
+    # Hay que construir la cita manualmente
+    
+    autores = item['data']['creators']
+    # Los autores institucionales (fieldMode de un solo campo) usan 'name'
+    autor_texto = (autores[0].get('lastName') or autores[0].get('name')) if autores else "Autor Desconocido"
+    año = _año(item['data'])
+    
+    # Construye cita APA con página
+    if not paginas:
+        cita = f"({autor_texto}, {año})"
+    elif "-" in str(paginas) or "," in str(paginas):
+        cita = f"({autor_texto}, {año}, pp. {paginas})"
+    else:
+        cita = f"({autor_texto}, {año}, p. {paginas})"
+    
+    return cita
+
+def obtener_items(item_keys):
+    """
+    Devuelve {key: item} para todas las claves pedidas
+    
+    Se sirven del espejo local; las que falten se piden al servidor en
+    peticiones multi-clave (itemKey=A,B,C) de hasta MAX_CLAVES_POR_PETICION,
+    salvo si se lee zotero.sqlite (modo sin conexión).
+    """
+    espejo = obtener_espejo()
+    items = espejo.items(item_keys)
+    faltantes = [k for k in dict.fromkeys(item_keys) if k not in items] if espejo.EN_LINEA else []
+    
+    for i in range(0, len(faltantes), MAX_CLAVES_POR_PETICION):
+        lote = faltantes[i:i + MAX_CLAVES_POR_PETICION]
+        recibidos = zot.items(itemKey=",".join(lote), limit=len(lote))
+        espejo.guardar_items(recibidos)
+        items.update((item['key'], item) for item in recibidos)
+    
+    return items
+
 def generar_cita_apa_con_pagina(item_key, paginas):
     """
     Genera cita APA con número de página específico
@@ -66,64 +165,183 @@ def generar_cita_apa_con_pagina(item_key, paginas):
         paginas: Página(s) a citar
     """
     
-    # Obtiene el item
-    item = zot.item(item_key)
-    
-    # Obtiene la cita base en formato APA
-    # Nota: La API de Zotero no soporta directamente añadir locators
-    # Hay que construir la cita manualmente
-    
-    autores = item['data']['creators']
-    autor_texto = autores[0]['lastName'] if autores else "Autor Desconocido"
-    año = item['data']['date'][:4] if 'date' in item['data'] else "s.f."
+    # Obtiene el item (del espejo local; si aún no está, del servidor)
+    item = obtener_items([item_key]).get(item_key)
+    if item is None:
+        print(f"✗ Item no encontrado: {item_key}", file=sys.stderr)
+        return None
     
-    # Construye cita APA con página
-    if "-" in str(paginas) or "," in str(paginas):
-        cita = f"({autor_texto}, {año}, pp. {paginas})"
-    else:
-        cita = f"({autor_texto}, {año}, p. {paginas})"
+    cita = _formatear_cita(item, paginas)
     
     print(f"\n📝 Cita APA generada:")
     print(f"   {cita}\n")
     
     return cita
 
-def exportar_bibliografia_con_paginas(archivo_salida="bibliografia_con_paginas.txt"):
+def leer_pares_cita(origen):
+    """
+    Lee pares (item_key, paginas) de un archivo o de stdin ('-')
+    
+    Una cita por línea: la clave y, opcionalmente, las páginas separadas
+    por espacio o tabulador. Las líneas vacías o que empiezan con # se ignoran.
+    """
+    if origen == '-':
+        lineas = sys.stdin.read().splitlines()
+    else:
+        with open(origen, 'r', encoding='utf-8') as f:
+            lineas = f.read().splitlines()
+    
+    pares = []
+    for linea in lineas:
+        linea = linea.strip()
+        if not linea or linea.startswith('#'):
+            continue
+        partes = linea.split(None, 1)
+        pares.append((partes[0], partes[1].strip() if len(partes) > 1 else None))
+    return pares
+
+def generar_citas_apa_lote(pares):
+    """
+    Genera las citas APA de muchos pares (item_key, paginas) en una sola ejecución
+    
+    Returns:
+        Lista de citas en el mismo orden que los pares; None si la clave no existe
+    """
+    items = obtener_items([key for key, _ in pares])
+    
+    citas = []
+    for key, paginas in pares:
+        item = items.get(key)
+        cita = _formatear_cita(item, paginas) if item else None
+        if cita is None:
+            print(f"✗ Item no encontrado: {key}", file=sys.stderr)
+        citas.append(cita)
+    
+    return citas
+
+def _paginas_citadas(extra):
+    """Extrae el locator guardado por crear_item_con_pagina en el campo extra"""
+    for linea in extra.splitlines():
+        if linea.startswith("Cited page"):
+            return linea.split(":", 1)[-1].strip()
+    return ""
+
+def _fila_exportacion(item):
+    data = item['data']
+    autores = "; ".join(
+        ", ".join(p for p in (c.get('lastName', c.get('name', '')), c.get('firstName', '')) if p)
+        for c in data.get('creators', [])
+    )
+    return {
+        'key': item['key'],
+        'titulo': data.get('title', 'Sin título'),
+        'autores': autores,
+        'año': _año(data),
+        'paginas_citadas': _paginas_citadas(data.get('extra', '')),
+        'extra': data.get('extra', ''),
+    }
+
+def exportar_bibliografia_con_paginas(archivo_salida="bibliografia_con_paginas.txt", formato="txt", usar_espejo=True):
     """
     Exporta todas las referencias con sus páginas citadas
+    
+    Args:
+        archivo_salida: Ruta del archivo a generar
+        formato: 'txt', 'csv' o 'ndjson'
+        usar_espejo: Si es False recorre la API página a página (con
+            peticiones concurrentes) en lugar de leer el espejo local
     """
+    if formato not in FORMATOS_EXPORTACION:
+        raise ValueError(f"Formato no soportado: {formato} (usa {', '.join(FORMATOS_EXPORTACION)})")
     
-    items = zot.top(limit=100)
+    inicio = time.perf_counter()
+    if usar_espejo:
+        items = obtener_espejo().top()
+    else:
+        items = recorrer_paginas(zot, 'top')
     
-    with open(archivo_salida, 'w', encoding='utf-8') as f:
-        f.write("BIBLIOGRAFÍA CON PÁGINAS CITADAS\n")
-        f.write("="*70 + "\n\n")
+    total = 0
+    with open(archivo_salida, 'w', encoding='utf-8', newline='') as f:
+        if formato == "txt":
+            f.write("BIBLIOGRAFÍA CON PÁGINAS CITADAS\n")
+            f.write("="*70 + "\n\n")
+        elif formato == "csv":
+            escritor = csv.DictWriter(f, fieldnames=['key', 'titulo', 'autores', 'año', 'paginas_citadas', 'extra'])
+            escritor.writeheader()
         
         for item in items:
-            titulo = item['data'].get('title', 'Sin título')
-            extra = item['data'].get('extra', '')
-            
-            f.write(f"Título: {titulo}\n")
-            
-            if "Cited page" in extra:
-                f.write(f"{extra}\n")
-            
-            f.write("-"*70 + "\n\n")
+            if formato == "txt":
+                titulo = item['data'].get('title', 'Sin título')
+                extra = item['data'].get('extra', '')
+                
+                f.write(f"Título: {titulo}\n")
+                
+                if "Cited page" in extra:
+                    f.write(f"{extra}\n")
+                
+                f.write("-"*70 + "\n\n")
+            elif formato == "csv":
+                escritor.writerow(_fila_exportacion(item))
+            else:
+                f.write(json.dumps(_fila_exportacion(item), ensure_ascii=False) + "\n")
+            total += 1
     
+    duracion = time.perf_counter() - inicio
     print(f"✅ Bibliografía exportada: {archivo_salida}")
+    print(f"   {total} referencias en {duracion:.2f} s ({total / duracion if duracion else 0:.0f} items/s)")
+    return total
 
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser(description="Generar citas APA con número de página desde Zotero.")
-    parser.add_argument('--item_id', required=True, help='La clave del ítem en Zotero.')
+    parser.add_argument('--item_id', required=False, help='La clave del ítem en Zotero.')
     parser.add_argument('--paginas', required=False, default=None, help='El número de página o rango a citar.')
+    parser.add_argument('--lote', required=False, metavar='ARCHIVO', help='Archivo con pares "item_key páginas" por línea (- para stdin).')
+    parser.add_argument('--referencias', required=False, metavar='ARCHIVO', help='Con --lote, escribe la lista de referencias APA de esas claves.')
+    parser.add_argument('--exportar', required=False, metavar='ARCHIVO', help='Exporta toda la biblioteca con sus páginas citadas.')
+    parser.add_argument('--formato', choices=FORMATOS_EXPORTACION, default='txt', help='Formato de la exportación.')
+    parser.add_argument('--sin_espejo', action='store_true', help='Exporta leyendo la API página a página en lugar del espejo local.')
+    parser.add_argument('--zotero_sqlite', required=False, metavar='RUTA', help='Lee la biblioteca de zotero.sqlite local (sin conexión).')
+    parser.add_argument('--metricas', action='store_true', help='Muestra al final la latencia por endpoint de la API.')
+    perfilado.agregar_argumentos(parser)
     args = parser.parse_args()
+    perfilado.activar_desde_args(args)
     
-    if args.paginas:
+    codigo = 0
+    if args.zotero_sqlite:
+        usar_zotero_local(args.zotero_sqlite)
+    
+    if args.exportar:
+        with perfilado.etapa('exportacion', formato=args.formato) as etapa:
+            etapa.items = exportar_bibliografia_con_paginas(args.exportar, args.formato, usar_espejo=not args.sin_espejo)
+    elif args.lote:
+        pares = leer_pares_cita(args.lote)
+        with perfilado.etapa('citas_lote') as etapa:
+            citas = generar_citas_apa_lote(pares)
+            etapa.items = len(pares)
+        for (key, _), cita in zip(pares, citas):
+            if cita:
+                print(f"{key}\t{cita}")
+        if None in citas:
+            codigo = 1
+        if args.referencias:
+            cache = CacheBibliografia(zot, obtener_espejo())
+            n = cache.escribir_bibliografia([key for key, _ in pares], args.referencias)
+            print(f"✅ Referencias escritas: {args.referencias} ({n})", file=sys.stderr)
+    elif not args.item_id:
+        parser.error("se requiere --item_id (o --lote / --exportar)")
+    elif args.paginas:
         generar_cita_apa_con_pagina(args.item_id, args.paginas)
     else:
         # Si no se proporcionan páginas, simplemente obtenemos la bibliografía del ítem
-        zot.add_parameters(content='bib', style='apa')
-        bib = zot.item(args.item_id)
-        # La salida es una lista de strings HTML, así que las unimos
-        print("\n".join(bib))
+        # (de la caché; solo se pide al servidor si el item cambió)
+        entrada = CacheBibliografia(zot, obtener_espejo()).referencias([args.item_id])[0]
+        if entrada is None:
+            print(f"✗ Item no encontrado: {args.item_id}", file=sys.stderr)
+            codigo = 1
+        else:
+            print(entrada)
+    
+    if args.metricas:
+        print(json.dumps(zot.metricas(), indent=2), file=sys.stderr)
+    sys.exit(codigo)
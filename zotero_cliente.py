@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Cliente de la API de Zotero con pool de conexiones, reintentos y métricas
+
+Envuelve pyzotero sin cambiar su interfaz: zot.item(key), zot.items(...),
+zot.create_items(...) siguen funcionando igual, pero cada llamada:
+- toma prestado un cliente del pool (cada uno mantiene su sesión keep-alive),
+- las lecturas se reintentan con espera exponencial ante 5xx y errores de red,
+- las escrituras solo se reintentan ante 429 (no son idempotentes),
+- se fusiona con una lectura idéntica que ya esté en curso,
+- registra su latencia por endpoint.
+
+Los 429 de las lecturas los reintenta pyzotero (≥ 1.16), pero cada cliente
+de pyzotero solo respeta su propio Backoff / Retry-After. Aquí el plazo que
+pide el servidor se comparte: ningún cliente del pool envía nada hasta que
+vence.
+
+No se crea ninguna conexión (ni se importa pyzotero) hasta la primera llamada.
+"""
+
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+TAM_POOL = 4
+MAX_REINTENTOS = 5
+ESPERA_BASE = 0.5   # segundos; se duplica en cada reintento
+ESPERA_MAXIMA = 60.0
+ESTADOS_REINTENTABLES = {500, 502, 503, 504}  # solo lecturas
+ERRORES_RED = {'ConnectError', 'ConnectTimeout', 'ReadTimeout', 'ReadError', 'RemoteProtocolError', 'ConnectionError', 'Timeout'}
+
+# Solo estas llamadas son lecturas idempotentes que se pueden fusionar
+METODOS_LECTURA = {
+    'item', 'items', 'top', 'children', 'deleted', 'item_template',
+    'last_modified_version', 'num_items', 'count_items', 'collections',
+}
+
+
+def _segundos_cabecera(respuesta):
+    """Lee Backoff o Retry-After (en segundos) de una respuesta, si existe"""
+    cabeceras = getattr(respuesta, 'headers', None) or {}
+    valor = cabeceras.get('Backoff') or cabeceras.get('Retry-After')
+    try:
+        return float(valor) if valor is not None else None
+    except ValueError:
+        return None
+
+
+def _es_reintentable(metodo, error, respuesta):
+    estado = getattr(respuesta, 'status_code', None)
+    if metodo not in METODOS_LECTURA:
+        # Una escritura con 5xx o sin respuesta puede haberse aplicado: no se repite
+        return estado == 429
+    if estado is not None:
+        return estado in ESTADOS_REINTENTABLES
+    # Sin respuesta: fallo de red o timeout
+    return isinstance(error, (OSError, TimeoutError)) or type(error).__name__ in ERRORES_RED
+
+
+class ClienteZotero:
+    """Sustituto de zotero.Zotero seguro para usar desde varios hilos"""
+
+    def __init__(self, library_id, library_type, api_key, tam_pool=TAM_POOL, max_reintentos=MAX_REINTENTOS, endpoint=None):
+        self.library_id = library_id
+        self.tipo_biblioteca = library_type   # 'user' o 'group'
+        self.api_key = api_key
+        self.endpoint = endpoint
+        self.tam_pool = tam_pool
+        self.max_reintentos = max_reintentos
+
+        self._libres = queue.LifoQueue()
+        self._creados = 0
+        self._lock = threading.Lock()
+        self._en_curso = {}
+        self._pausa_hasta = 0.0
+        self._metricas = {}
+
+    # --- Pool ---
+
+    def _crear_cliente(self):
+        from pyzotero import zotero
+        cliente = zotero.Zotero(self.library_id, self.tipo_biblioteca, self.api_key)
+        if self.endpoint:
+            cliente.endpoint = self.endpoint
+        return cliente
+
+    def _tomar(self):
+        with self._lock:
+            if self._libres.empty() and self._creados < self.tam_pool:
+                self._creados += 1
+                return self._crear_cliente()
+        return self._libres.get()
+
+    def _devolver(self, cliente):
+        self._libres.put(cliente)
+
+    # --- Espera por límite de peticiones ---
+
+    def _esperar_pausa(self):
+        # Otro hilo puede alargar la pausa mientras se duerme
+        while True:
+            restante = self._pausa_hasta - time.monotonic()
+            if restante <= 0:
+                return
+            time.sleep(restante)
+
+    def _pausar(self, segundos):
+        with self._lock:
+            self._pausa_hasta = max(self._pausa_hasta, time.monotonic() + segundos)
+
+    # --- Métricas ---
+
+    def _registrar(self, endpoint, duracion, error=False, reintentos=0):
+        with self._lock:
+            m = self._metricas.setdefault(endpoint, {'latencias': [], 'errores': 0, 'reintentos': 0, 'fusionadas': 0})
+            m['latencias'].append(duracion)
+            m['errores'] += int(error)
+            m['reintentos'] += reintentos
+
+    def metricas(self):
+        """Resumen por endpoint: llamadas, errores, reintentos, fusiones y latencias (ms)"""
+        resumen = {}
+        with self._lock:
+            for endpoint, m in self._metricas.items():
+                lat = sorted(m['latencias'])
+                if not lat:
+                    continue
+                resumen[endpoint] = {
+                    'llamadas': len(lat),
+                    'errores': m['errores'],
+                    'reintentos': m['reintentos'],
+                    'fusionadas': m['fusionadas'],
+                    'p50_ms': round(lat[len(lat) // 2] * 1000, 1),
+                    'p95_ms': round(lat[min(len(lat) - 1, int(len(lat) * 0.95))] * 1000, 1),
+                    'max_ms': round(lat[-1] * 1000, 1),
+                }
+        return resumen
+
+    # --- Ejecución ---
+
+    def _ejecutar(self, metodo, args, kwargs, con_total):
+        reintentos = 0
+        inicio = time.perf_counter()
+        self._esperar_pausa()
+        # El mismo cliente para todos los intentos
+        cliente = self._tomar()
+        try:
+            while True:
+                cliente.request = None
+                try:
+                    resultado = getattr(cliente, metodo)(*args, **kwargs)
+                    if getattr(cliente.request, 'status_code', None) == 429:
+                        # pyzotero no lanza ante un 429 con Retry-After: el cuerpo no es el resultado
+                        raise RuntimeError("429 Too Many Requests")
+                except Exception as e:
+                    respuesta = cliente.request
+                    espera = _segundos_cabecera(respuesta)
+                    if espera:
+                        self._pausar(espera)
+                    if not _es_reintentable(metodo, e, respuesta) or reintentos >= self.max_reintentos:
+                        self._registrar(metodo, time.perf_counter() - inicio, error=True, reintentos=reintentos)
+                        raise
+                    if espera is None and getattr(respuesta, 'status_code', None) != 429:
+                        # 5xx o red sin indicación del servidor: espera exponencial para todo el pool
+                        self._pausar(min(ESPERA_MAXIMA, ESPERA_BASE * 2 ** reintentos) * (1 + random.random() * 0.25))
+                    self._esperar_pausa()
+                    reintentos += 1
+                    continue
+                # Un Backoff en una respuesta correcta también frena al resto del pool
+                espera = _segundos_cabecera(cliente.request)
+                if espera:
+                    self._pausar(espera)
+                total = None
+                if con_total:
+                    cabeceras = getattr(cliente.request, 'headers', None) or {}
+                    total = int(cabeceras.get('Total-Results', len(resultado)))
+                self._registrar(metodo, time.perf_counter() - inicio, reintentos=reintentos)
+                return (resultado, total) if con_total else resultado
+        finally:
+            self._devolver(cliente)
+
+    def _llamar(self, metodo, args, kwargs, con_total=False):
+        clave = None
+        if metodo in METODOS_LECTURA:
+            try:
+                clave = (metodo, con_total, args, tuple(sorted(kwargs.items())))
+                hash(clave)
+            except TypeError:
+                clave = None
+
+        if clave is None:
+            return self._ejecutar(metodo, args, kwargs, con_total)
+
+        # Fusión de lecturas idénticas en curso: la segunda espera a la primera
+        with self._lock:
+            futuro = self._en_curso.get(clave)
+            propio = futuro is None
+            if propio:
+                futuro = self._en_curso[clave] = Future()
+            else:
+                self._metricas.setdefault(metodo, {'latencias': [], 'errores': 0, 'reintentos': 0, 'fusionadas': 0})['fusionadas'] += 1
+
+        if not propio:
+            return futuro.result()
+
+        try:
+            futuro.set_result(self._ejecutar(metodo, args, kwargs, con_total))
+        except Exception as e:
+            futuro.set_exception(e)
+        finally:
+            with self._lock:
+                del self._en_curso[clave]
+        return futuro.result()
+
+    def listar(self, metodo, **parametros):
+        """Ejecuta un listado paginado y devuelve (items, Total-Results)"""
+        return self._llamar(metodo, (), parametros, con_total=True)
+
+    def __getattr__(self, metodo):
+        if metodo.startswith('_'):
+            raise AttributeError(metodo)
+        return lambda *args, **kwargs: self._llamar(metodo, args, kwargs)
@@ -0,0 +1,212 @@
+#!/usr/bin/env python3
+"""
+Espejo local (SQLite) de la biblioteca de Zotero
+Sincronización incremental con la versión de biblioteca (parámetro since=)
+
+Uso:
+    python zotero_espejo.py            # sincroniza y muestra el estado
+"""
+
+import json
+import os
+import sqlite3
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+RUTA_ESPEJO = os.getenv("ZOTERO_ESPEJO") or os.path.expanduser("~/.cache/pinokio-academic-pipeline/zotero_espejo.sqlite")
+LOTE_CONSULTA = 500
+ITEMS_POR_PAGINA = 100  # máximo que admite la API de Zotero
+MAX_PAGINAS_CONCURRENTES = 4
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS items (
+    key TEXT PRIMARY KEY,
+    version INTEGER NOT NULL,
+    padre TEXT,
+    en_papelera INTEGER NOT NULL DEFAULT 0,
+    fecha_modificacion TEXT,
+    datos TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS items_top ON items (padre, en_papelera, fecha_modificacion);
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor TEXT NOT NULL);
+"""
+
+
+def recorrer_paginas(zot, metodo='items', max_concurrentes=MAX_PAGINAS_CONCURRENTES, **parametros):
+    """
+    Itera todos los items de un listado paginado de la API, en orden
+
+    La primera página se pide sola para conocer Total-Results; el resto se
+    piden con un pool acotado de hilos y se entregan en orden a medida que
+    llegan, sin retener más de unas pocas páginas.
+
+    Args:
+        zot: ClienteZotero (admite llamadas concurrentes)
+        metodo: Método de listado del cliente ('items', 'top', ...)
+        max_concurrentes: Peticiones de página simultáneas como máximo
+        **parametros: Parámetros de la consulta (since, includeTrashed, ...)
+    """
+    def pedir_pagina(inicio):
+        pagina, _ = zot.listar(metodo, start=inicio, limit=ITEMS_POR_PAGINA, **parametros)
+        return pagina
+
+    pagina, total = zot.listar(metodo, start=0, limit=ITEMS_POR_PAGINA, **parametros)
+    yield from pagina
+
+    inicios = iter(range(ITEMS_POR_PAGINA, total, ITEMS_POR_PAGINA))
+    with ThreadPoolExecutor(max_workers=max_concurrentes) as pool:
+        pendientes = deque(pool.submit(pedir_pagina, i) for _, i in zip(range(max_concurrentes * 2), inicios))
+        while pendientes:
+            pagina = pendientes.popleft().result()
+            siguiente = next(inicios, None)
+            if siguiente is not None:
+                pendientes.append(pool.submit(pedir_pagina, siguiente))
+            yield from pagina
+
+
+class EspejoZotero:
+    """
+    Copia local de los items de una biblioteca de Zotero
+
+    La primera sincronización descarga la biblioteca completa; las siguientes
+    solo piden los items modificados y borrados desde la última versión vista.
+    Todas las lecturas (item, items, top) se sirven desde SQLite.
+    """
+
+    EN_LINEA = True
+
+    def __init__(self, zot, ruta_db=RUTA_ESPEJO):
+        self.zot = zot
+        self.ruta = ruta_db
+        carpeta = os.path.dirname(ruta_db)
+        if carpeta:
+            os.makedirs(carpeta, exist_ok=True)
+        self.conn = sqlite3.connect(ruta_db)
+        self.conn.executescript(ESQUEMA)
+        self._verificar_biblioteca()
+
+    # --- Metadatos ---
+
+    def _meta(self, clave, defecto=None):
+        fila = self.conn.execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()
+        return fila[0] if fila else defecto
+
+    def _set_meta(self, clave, valor):
+        self.conn.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)", (clave, str(valor)))
+
+    def _verificar_biblioteca(self):
+        """Vacía el espejo si pertenece a otra biblioteca"""
+        biblioteca = f"{self.zot.tipo_biblioteca}/{self.zot.library_id}"
+        if self._meta('biblioteca') != biblioteca:
+            with self.conn:
+                self.conn.execute("DELETE FROM items")
+                self.conn.execute("DELETE FROM meta")
+                self._set_meta('biblioteca', biblioteca)
+
+    @property
+    def version(self):
+        return int(self._meta('version_biblioteca', 0))
+
+    # --- Sincronización ---
+
+    def _descargar(self, desde):
+        """Descarga los items (incluida la papelera) modificados desde una versión"""
+        parametros = {'includeTrashed': 1}
+        if desde:
+            parametros['since'] = desde
+        return recorrer_paginas(self.zot, 'items', **parametros)
+
+    def guardar_items(self, items):
+        """Guarda (en bloques) cualquier iterable de items de la API"""
+        filas = []
+        total = 0
+        for item in items:
+            data = item['data']
+            filas.append((
+                item['key'],
+                item.get('version', data.get('version', 0)),
+                data.get('parentItem'),
+                1 if data.get('deleted') else 0,
+                data.get('dateModified', ''),
+                json.dumps(item, ensure_ascii=False),
+            ))
+            if len(filas) >= LOTE_CONSULTA:
+                self._insertar(filas)
+                total += len(filas)
+                filas = []
+        self._insertar(filas)
+        return total + len(filas)
+
+    def _insertar(self, filas):
+        with self.conn:
+            self.conn.executemany("INSERT OR REPLACE INTO items VALUES (?, ?, ?, ?, ?, ?)", filas)
+
+    def sincronizar(self):
+        """
+        Trae al espejo los cambios de la biblioteca remota
+
+        Returns:
+            Número de items actualizados o borrados
+        """
+        local = self.version
+        remota = self.zot.last_modified_version()
+        if local and remota == local:
+            return 0
+
+        actualizados = self.guardar_items(self._descargar(local))
+
+        borrados = []
+        if local:
+            borrados = self.zot.deleted(since=local).get('items', [])
+        with self.conn:
+            for i in range(0, len(borrados), LOTE_CONSULTA):
+                lote = borrados[i:i + LOTE_CONSULTA]
+                self.conn.execute(f"DELETE FROM items WHERE key IN ({','.join('?' * len(lote))})", lote)
+            self._set_meta('version_biblioteca', remota)
+
+        return actualizados + len(borrados)
+
+    # --- Lecturas ---
+
+    def item(self, key):
+        """Devuelve el item con la misma forma que zot.item(key), o None"""
+        fila = self.conn.execute("SELECT datos FROM items WHERE key = ?", (key,)).fetchone()
+        return json.loads(fila[0]) if fila else None
+
+    def items(self, keys):
+        """Devuelve {key: item} para las claves presentes en el espejo"""
+        keys = list(dict.fromkeys(keys))
+        encontrados = {}
+        for i in range(0, len(keys), LOTE_CONSULTA):
+            lote = keys[i:i + LOTE_CONSULTA]
+            consulta = f"SELECT key, datos FROM items WHERE key IN ({','.join('?' * len(lote))})"
+            for key, datos in self.conn.execute(consulta, lote):
+                encontrados[key] = json.loads(datos)
+        return encontrados
+
+    def top(self):
+        """Itera los items de primer nivel fuera de la papelera, como zot.top()"""
+        consulta = ("SELECT datos FROM items WHERE padre IS NULL AND en_papelera = 0 "
+                    "ORDER BY fecha_modificacion DESC")
+        for (datos,) in self.conn.execute(consulta):
+            yield json.loads(datos)
+
+    def total(self):
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def cerrar(self):
+        self.conn.close()
+
+
+if __name__ == "__main__":
+    import perfilado
+    from zotero_cita_con_pagina import zot
+
+    perfilado.activar_desde_argv()
+    espejo = EspejoZotero(zot)
+    with perfilado.etapa('sincronizacion') as etapa:
+        cambios = espejo.sincronizar()
+        etapa.items = cambios
+    print(f"✅ Espejo sincronizado: {espejo.ruta}")
+    print(f"   Versión de biblioteca: {espejo.version}")
+    print(f"   Cambios aplicados: {cambios} | Items en espejo: {espejo.total()}")
@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de referencias a Zotero desde BibTeX o CSV
+Escribe en lotes de create_items y reporta cada fallo con su fila de origen
+
+Uso:
+    python zotero_importador.py lecturas.bib
+    python zotero_importador.py lecturas.csv
+
+CSV: columnas titulo, autores ("Apellido, Nombre; Apellido, Nombre"),
+paginas, tipo, publicacion y, opcionalmente, cualquier campo de Zotero
+(date, DOI, url, volume, ...).
+"""
+
+import csv
+import os
+import re
+import sys
+import time
+
+import perfilado
+from zotero_cita_con_pagina import zot, construir_item, MAX_ITEMS_POR_ESCRITURA
+
+TIPOS_BIBTEX = {
+    'article': 'journalArticle',
+    'book': 'book',
+    'inbook': 'bookSection',
+    'incollection': 'bookSection',
+    'inproceedings': 'conferencePaper',
+    'conference': 'conferencePaper',
+    'phdthesis': 'thesis',
+    'mastersthesis': 'thesis',
+    'techreport': 'report',
+    'online': 'webpage',
+    'misc': 'document',
+}
+
+# Campo BibTeX -> campos de Zotero candidatos (se usa el que exista en la plantilla)
+CAMPOS_BIBTEX = {
+    'year': ('date',),
+    'date': ('date',),
+    'booktitle': ('bookTitle', 'proceedingsTitle'),
+    'publisher': ('publisher',),
+    'institution': ('institution',),
+    'school': ('university',),
+    'volume': ('volume',),
+    'number': ('issue', 'reportNumber'),
+    'pages': ('pages',),
+    'edition': ('edition',),
+    'address': ('place',),
+    'doi': ('DOI',),
+    'url': ('url',),
+    'isbn': ('ISBN',),
+    'issn': ('ISSN',),
+    'abstract': ('abstractNote',),
+    'language': ('language',),
+}
+
+COLUMNAS_BASE = ('titulo', 'autores', 'paginas', 'tipo', 'publicacion')
+
+
+class Registro:
+    """Una referencia de entrada con la ubicación que se reporta si falla"""
+
+    def __init__(self, origen, titulo, autores, paginas, tipo, publicacion, campos):
+        self.origen = origen
+        self.titulo = titulo
+        self.autores = autores
+        self.paginas = paginas
+        self.tipo = tipo
+        self.publicacion = publicacion
+        self.campos = campos
+
+
+# --- Lectura de BibTeX ---
+
+def _valor_bibtex(texto, i):
+    """Lee un valor entre llaves (anidadas), comillas o sin delimitar desde la posición i"""
+    if i >= len(texto):
+        raise ValueError("valor sin terminar al final del archivo")
+    if texto[i] == '{':
+        nivel, inicio = 0, i
+        while i < len(texto):
+            if texto[i] == '{':
+                nivel += 1
+            elif texto[i] == '}':
+                nivel -= 1
+                if nivel == 0:
+                    return texto[inicio + 1:i], i + 1
+            i += 1
+        raise ValueError("llave sin cerrar")
+    if texto[i] == '"':
+        fin = texto.index('"', i + 1)
+        return texto[i + 1:fin], fin + 1
+    m = re.compile(r'[^,}\s]+').match(texto, i)
+    if m is None:
+        raise ValueError("campo sin valor")
+    return m.group(0), m.end()
+
+
+def _limpiar_bibtex(valor):
+    return re.sub(r'\s+', ' ', valor.replace('{', '').replace('}', '')).strip()
+
+
+def _autores_bibtex(valor):
+    """'Apellido, Nombre and Nombre Apellido' -> ['Apellido, Nombre', ...]"""
+    autores = []
+    for autor in re.split(r'\s+and\s+', _limpiar_bibtex(valor)):
+        if ',' in autor:
+            apellido, nombre = autor.split(',', 1)
+        elif ' ' in autor:
+            nombre, apellido = autor.rsplit(' ', 1)
+        else:
+            apellido, nombre = autor, ''
+        autores.append(f"{apellido.strip()}, {nombre.strip()}")
+    return autores
+
+
+def leer_bibtex(ruta):
+    with open(ruta, 'r', encoding='utf-8') as f:
+        texto = f.read()
+
+    registros = []
+    for m in re.finditer(r'@(\w+)\s*\{\s*([^,\s]*)\s*,', texto):
+        tipo_bib = m.group(1).lower()
+        if tipo_bib in ('comment', 'string', 'preamble'):
+            continue
+        linea = texto.count('\n', 0, m.start()) + 1
+        origen = f"{os.path.basename(ruta)}:{linea} ({m.group(2) or tipo_bib})"
+
+        campos, i = {}, m.end()
+        try:
+            while True:
+                c = re.compile(r'\s*(?:,\s*)?(\w[\w-]*)\s*=\s*|\s*,?\s*\}').match(texto, i)
+                if c is None or c.group(1) is None:
+                    break
+                campos[c.group(1).lower()], i = _valor_bibtex(texto, c.end())
+        except ValueError as e:
+            print(f"✗ {origen}: entrada BibTeX mal formada ({e})", file=sys.stderr)
+            continue
+
+        extra = {}
+        for campo_bib, valor in campos.items():
+            if campo_bib in CAMPOS_BIBTEX:
+                extra[CAMPOS_BIBTEX[campo_bib]] = _limpiar_bibtex(valor).replace('--', '-')
+
+        registros.append(Registro(
+            origen=origen,
+            titulo=_limpiar_bibtex(campos.get('title', '')),
+            autores=_autores_bibtex(campos['author']) if 'author' in campos else [],
+            paginas=_limpiar_bibtex(campos.get('citedpages', campos.get('paginas', ''))),
+            tipo=TIPOS_BIBTEX.get(tipo_bib, 'document'),
+            publicacion=_limpiar_bibtex(campos.get('journal', campos.get('journaltitle', ''))),
+            campos=extra,
+        ))
+    return registros
+
+
+# --- Lectura de CSV ---
+
+def leer_csv(ruta):
+    registros = []
+    with open(ruta, 'r', encoding='utf-8-sig', newline='') as f:
+        for n, fila in enumerate(csv.DictReader(f), start=2):
+            fila = {k.strip(): (v or '').strip() for k, v in fila.items() if k}
+            autores = [a.strip() for a in fila.get('autores', '').split(';') if a.strip()]
+            registros.append(Registro(
+                origen=f"{os.path.basename(ruta)} fila {n}",
+                titulo=fila.get('titulo', ''),
+                autores=autores,
+                paginas=fila.get('paginas', ''),
+                tipo=fila.get('tipo') or 'journalArticle',
+                publicacion=fila.get('publicacion', ''),
+                campos={(k,): v for k, v in fila.items() if k not in COLUMNAS_BASE and v},
+            ))
+    return registros
+
+
+# --- Escritura por lotes ---
+
+def _item_desde_registro(registro):
+    item = construir_item(registro.titulo, registro.autores, registro.paginas,
+                          registro.tipo, registro.publicacion)
+    for candidatos, valor in registro.campos.items():
+        campo = next((c for c in candidatos if c in item), None)
+        if campo:
+            item[campo] = valor
+    return item
+
+
+def importar_registros(registros):
+    """
+    Crea los items en Zotero en lotes de MAX_ITEMS_POR_ESCRITURA
+
+    Returns:
+        (creados, fallos): lista de (registro, key) y lista de (registro, mensaje)
+    """
+    creados, fallos = [], []
+    preparados = []
+    for registro in registros:
+        try:
+            preparados.append((registro, _item_desde_registro(registro)))
+        except Exception as e:
+            fallos.append((registro, f"plantilla '{registro.tipo}': {e}"))
+
+    for inicio in range(0, len(preparados), MAX_ITEMS_POR_ESCRITURA):
+        lote = preparados[inicio:inicio + MAX_ITEMS_POR_ESCRITURA]
+        try:
+            resp = zot.create_items([item for _, item in lote])
+        except Exception as e:
+            fallos.extend((registro, f"lote rechazado: {e}") for registro, _ in lote)
+            continue
+
+        # Las respuestas se indexan por la posición del item dentro del lote
+        for indice, (registro, _) in enumerate(lote):
+            clave = str(indice)
+            if clave in resp.get('successful', {}):
+                creados.append((registro, resp['successful'][clave]['key']))
+            elif clave in resp.get('unchanged', {}):
+                creados.append((registro, resp['unchanged'][clave]))
+            else:
+                error = resp.get('failed', {}).get(clave, {})
+                fallos.append((registro, f"{error.get('code', '?')}: {error.get('message', 'sin respuesta')}"))
+
+    return creados, fallos
+
+
+# --- MAIN ---
+if __name__ == "__main__":
+    perfilado.activar_desde_argv()
+    if len(sys.argv) != 2:
+        print("Uso: python zotero_importador.py <archivo.bib|archivo.csv> [--profile [perfil.json]]")
+        sys.exit(1)
+
+    ruta = sys.argv[1]
+    if not os.path.exists(ruta):
+        print(f"Error: El archivo no se encuentra en la ruta: {ruta}")
+        sys.exit(1)
+
+    ext = os.path.splitext(ruta)[1].lower()
+    if ext == '.bib':
+        registros = leer_bibtex(ruta)
+    elif ext == '.csv':
+        registros = leer_csv(ruta)
+    else:
+        print(f"Error: Formato '{ext}' no soportado.")
+        sys.exit(1)
+
+    inicio = time.perf_counter()
+    with perfilado.etapa('importacion', registros=len(registros)) as etapa:
+        creados, fallos = importar_registros(registros)
+        etapa.items = len(creados)
+    duracion = time.perf_counter() - inicio
+
+    print(f"✅ Items creados: {len(creados)} de {len(registros)} en {duracion:.2f} s")
+    for registro, mensaje in fallos:
+        print(f"✗ {registro.origen} — {registro.titulo or 'Sin título'}: {mensaje}", file=sys.stderr)
+
+    sys.exit(1 if fallos else 0)
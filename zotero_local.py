@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+"""
+Lectura sin conexión de la base zotero.sqlite del cliente de escritorio
+Sustituye al espejo sincronizado (zotero_espejo.py) cuando Zotero está instalado
+
+Uso:
+    python zotero_local.py [ruta/a/zotero.sqlite] ITEM_KEY
+"""
+
+import os
+import re
+import sqlite3
+from pathlib import Path
+
+RUTA_ZOTERO_SQLITE = os.getenv("ZOTERO_SQLITE") or os.path.expanduser("~/Zotero/zotero.sqlite")
+LOTE_CONSULTA = 500
+
+# Las fechas se guardan como "AAAA-MM-DD original" (multipart de Zotero)
+PATRON_FECHA_MULTIPARTE = re.compile(r'^\d{4}-\d{2}-\d{2} (.*)$')
+
+
+def _fecha_api(valor):
+    """'2024-01-31 10:20:30' -> '2024-01-31T10:20:30Z', como la devuelve la API web"""
+    return valor.replace(' ', 'T') + 'Z' if valor else ''
+
+
+class ZoteroLocal:
+    """
+    Backend de solo lectura sobre zotero.sqlite con la misma interfaz de
+    lectura que EspejoZotero (item, items, top), sin acceso a la red
+
+    La base se abre en modo immutable: no se toman bloqueos, así que puede
+    leerse con el cliente de escritorio abierto.
+    """
+
+    EN_LINEA = False
+
+    def __init__(self, ruta_db=RUTA_ZOTERO_SQLITE, library_type='user', library_id=None):
+        self.ruta = ruta_db
+        uri = Path(ruta_db).resolve().as_uri() + "?mode=ro&immutable=1"
+        self.conn = sqlite3.connect(uri, uri=True)
+        self.library_id = self._library_id(library_type, library_id)
+
+        tablas = {fila[0] for fila in self.conn.execute("SELECT name FROM sqlite_master WHERE type IN ('table', 'view')")}
+        # Las vistas *Combined incluyen los campos y tipos personalizados
+        self._tabla_campos = 'fieldsCombined' if 'fieldsCombined' in tablas else 'fields'
+        self._tabla_tipos = 'itemTypesCombined' if 'itemTypesCombined' in tablas else 'itemTypes'
+        # itemAnnotations solo existe desde Zotero 6
+        hijos = [f"SELECT itemID, parentItemID FROM {t}" for t in ('itemAttachments', 'itemNotes', 'itemAnnotations') if t in tablas]
+        self._sql_padres = " UNION ALL ".join(hijos)
+
+    def _library_id(self, library_type, library_id):
+        if library_type == 'group':
+            fila = self.conn.execute("SELECT libraryID FROM groups WHERE groupID = ?", (int(library_id),)).fetchone()
+        else:
+            fila = self.conn.execute("SELECT libraryID FROM libraries WHERE type = 'user'").fetchone()
+        if fila is None:
+            raise ValueError(f"Biblioteca no encontrada en {self.ruta}: {library_type} {library_id or ''}")
+        return fila[0]
+
+    # --- Interfaz común con EspejoZotero ---
+
+    def sincronizar(self):
+        """La base local ya está al día: no hay nada que sincronizar"""
+        return 0
+
+    def guardar_items(self, items):
+        return 0
+
+    def item(self, key):
+        return self.items([key]).get(key)
+
+    def items(self, keys):
+        """Devuelve {key: item} para las claves presentes en la base local"""
+        keys = list(dict.fromkeys(keys))
+        ids = []
+        for i in range(0, len(keys), LOTE_CONSULTA):
+            lote = keys[i:i + LOTE_CONSULTA]
+            consulta = (f"SELECT itemID FROM items WHERE libraryID = ? AND key IN ({','.join('?' * len(lote))}) "
+                        "AND itemID NOT IN (SELECT itemID FROM deletedItems)")
+            ids.extend(fila[0] for fila in self.conn.execute(consulta, [self.library_id, *lote]))
+        return {item['key']: item for item in self._cargar(ids)}
+
+    def top(self):
+        """Itera los items de primer nivel fuera de la papelera, por fecha de modificación"""
+        consulta = "SELECT itemID FROM items WHERE libraryID = ? AND itemID NOT IN (SELECT itemID FROM deletedItems)"
+        if self._sql_padres:
+            consulta += f" AND itemID NOT IN (SELECT itemID FROM ({self._sql_padres}) WHERE parentItemID IS NOT NULL)"
+        consulta += " ORDER BY dateModified DESC"
+        ids = [fila[0] for fila in self.conn.execute(consulta, (self.library_id,))]
+        for i in range(0, len(ids), LOTE_CONSULTA):
+            yield from self._cargar(ids[i:i + LOTE_CONSULTA])
+
+    def total(self):
+        return self.conn.execute("SELECT COUNT(*) FROM items WHERE libraryID = ?", (self.library_id,)).fetchone()[0]
+
+    def cerrar(self):
+        self.conn.close()
+
+    # --- Construcción de items con la forma de la API ---
+
+    def _cargar(self, ids):
+        """Arma los items de una lista de itemID con una consulta indexada por tabla, en el mismo orden"""
+        if not ids:
+            return []
+        marcas = ','.join('?' * len(ids))
+
+        items = {}
+        consulta = (f"SELECT i.itemID, i.key, i.version, t.typeName, i.dateAdded, i.dateModified "
+                    f"FROM items i JOIN {self._tabla_tipos} t USING (itemTypeID) WHERE i.itemID IN ({marcas})")
+        for item_id, key, version, tipo, agregado, modificado in self.conn.execute(consulta, ids):
+            items[item_id] = {
+                'key': key,
+                'version': version,
+                'library': {},
+                'data': {
+                    'key': key,
+                    'version': version,
+                    'itemType': tipo,
+                    'creators': [],
+                    'dateAdded': _fecha_api(agregado),
+                    'dateModified': _fecha_api(modificado),
+                },
+            }
+
+        consulta = (f"SELECT d.itemID, f.fieldName, v.value FROM itemData d "
+                    f"JOIN {self._tabla_campos} f USING (fieldID) JOIN itemDataValues v USING (valueID) "
+                    f"WHERE d.itemID IN ({marcas})")
+        for item_id, campo, valor in self.conn.execute(consulta, ids):
+            if campo == 'date' and isinstance(valor, str):
+                m = PATRON_FECHA_MULTIPARTE.match(valor)
+                valor = m.group(1) if m else valor
+            items[item_id]['data'][campo] = valor
+
+        consulta = (f"SELECT ic.itemID, ct.creatorType, c.firstName, c.lastName, c.fieldMode FROM itemCreators ic "
+                    f"JOIN creators c USING (creatorID) JOIN creatorTypes ct USING (creatorTypeID) "
+                    f"WHERE ic.itemID IN ({marcas}) ORDER BY ic.itemID, ic.orderIndex")
+        for item_id, tipo, nombre, apellido, modo in self.conn.execute(consulta, ids):
+            if modo == 1:
+                creador = {'creatorType': tipo, 'name': apellido}
+            else:
+                creador = {'creatorType': tipo, 'firstName': nombre, 'lastName': apellido}
+            items[item_id]['data']['creators'].append(creador)
+
+        if self._sql_padres:
+            consulta = (f"SELECT h.itemID, p.key FROM ({self._sql_padres}) h JOIN items p ON p.itemID = h.parentItemID "
+                        f"WHERE h.itemID IN ({marcas})")
+            for item_id, key_padre in self.conn.execute(consulta, ids):
+                items[item_id]['data']['parentItem'] = key_padre
+
+        return [items[i] for i in ids if i in items]
+
+
+if __name__ == "__main__":
+    import json
+    import sys
+
+    import perfilado
+
+    perfilado.activar_desde_argv()
+    if len(sys.argv) not in (2, 3):
+        print("Uso: python zotero_local.py [ruta/a/zotero.sqlite] ITEM_KEY [--profile [perfil.json]]")
+        sys.exit(1)
+
+    ruta = sys.argv[1] if len(sys.argv) == 3 else RUTA_ZOTERO_SQLITE
+    local = ZoteroLocal(ruta)
+    with perfilado.etapa('consulta', item=sys.argv[-1]):
+        item = local.item(sys.argv[-1])
+    if item is None:
+        print(f"✗ Item no encontrado: {sys.argv[-1]}")
+        sys.exit(1)
+    print(json.dumps(item, indent=2, ensure_ascii=False))